@@ -1,22 +1,8 @@
 -- Расширенная сводная (отделы, успешность, месяцы)
+-- Отдел вычисляется при записи файла по правилам этой сводной
+-- (processed_files.department_legacy, см. LEGACY_DEPARTMENT_RULES в path_dimensions.py)
 SELECT 
-    CASE 
-        WHEN LOWER(file_full_path) LIKE '%огдип%' THEN 'ОГДиП'
-        WHEN LOWER(file_full_path) LIKE '%окг%' THEN 'ОКГ'
-        WHEN LOWER(file_full_path) LIKE '%эо%' THEN 'ЭО'
-        WHEN LOWER(file_full_path) LIKE '%огифт%' THEN 'ОГиФТ'
-        WHEN LOWER(file_full_path) LIKE '%сгм%' THEN 'СГМ'
-        WHEN LOWER(file_full_path) LIKE '%юр. отдел%' OR LOWER(file_full_path) LIKE '%юо%' THEN 'ЮО'
-        WHEN LOWER(file_full_path) LIKE '%илц%' THEN 'ИЛЦ'
-        WHEN LOWER(file_full_path) LIKE '%сго%' THEN 'СГО'
-        WHEN LOWER(file_full_path) LIKE '%окс%' OR LOWER(file_full_path) LIKE '%конктракт%' THEN 'ОКС'
-        WHEN LOWER(file_full_path) LIKE '%охоимтс%' THEN 'охоимтс'
-        WHEN LOWER(file_full_path) LIKE '%оодц%' THEN 'ООДЦ'
-        WHEN LOWER(file_full_path) LIKE '%бухгалтерия%' THEN 'бухгалтерия'
-        WHEN LOWER(file_full_path) LIKE '%кадры%' OR LOWER(file_full_path) LIKE '%отдел кадров%' OR LOWER(file_full_path) LIKE '%ок%' THEN 'ОК'
-        WHEN LOWER(file_full_path) LIKE '%администрация%' THEN 'администрация'
-        ELSE 'Другое'
-    END as "Отдел",
+    COALESCE(department_legacy, 'не определен') as "Отдел",
     CASE 
         WHEN is_successful = 1 THEN 'Успешно'
         ELSE 'Не успешно'
@@ -29,23 +15,7 @@ SELECT
     ROUND(MAX(file_compression_kbites / 1024.0), 3) as "Максимальный объем сжатия, МБ"
 FROM processed_files
 GROUP BY 
-    CASE 
-        WHEN LOWER(file_full_path) LIKE '%огдип%' THEN 'ОГДиП'
-        WHEN LOWER(file_full_path) LIKE '%окг%' THEN 'ОКГ'
-        WHEN LOWER(file_full_path) LIKE '%эо%' THEN 'ЭО'
-        WHEN LOWER(file_full_path) LIKE '%огифт%' THEN 'ОГиФТ'
-        WHEN LOWER(file_full_path) LIKE '%сгм%' THEN 'СГМ'
-        WHEN LOWER(file_full_path) LIKE '%юр. отдел%' OR LOWER(file_full_path) LIKE '%юо%' THEN 'ЮО'
-        WHEN LOWER(file_full_path) LIKE '%илц%' THEN 'ИЛЦ'
-        WHEN LOWER(file_full_path) LIKE '%сго%' THEN 'СГО'
-        WHEN LOWER(file_full_path) LIKE '%окс%' OR LOWER(file_full_path) LIKE '%конктракт%' THEN 'ОКС'
-        WHEN LOWER(file_full_path) LIKE '%охоимтс%' THEN 'охоимтс'
-        WHEN LOWER(file_full_path) LIKE '%оодц%' THEN 'ООДЦ'
-        WHEN LOWER(file_full_path) LIKE '%бухгалтерия%' THEN 'бухгалтерия'
-        WHEN LOWER(file_full_path) LIKE '%кадры%' OR LOWER(file_full_path) LIKE '%отдел кадров%' OR LOWER(file_full_path) LIKE '%ок%' THEN 'ОК'
-        WHEN LOWER(file_full_path) LIKE '%администрация%' THEN 'администрация'
-        ELSE 'Другое'
-    END,
+    department_legacy,
     is_successful,
     strftime('%Y-%m', processed_date)
 ORDER BY "Дата сжатия, мес." DESC, "Отдел", "Сжатие успешно" DESC;
\ No newline at end of file
@@ -0,0 +1,284 @@
+# benchmarks/bench_compress.py
+"""
+Бенчмарк сжатия на синтетическом корпусе.
+
+Запуск из папки программы:
+    python -m benchmarks.bench_compress                      # весь корпус, все доступные методы
+    python -m benchmarks.bench_compress --quick --methods 1 6 --levels 2
+    python -m benchmarks.bench_compress --save-baseline      # сохранить результат как эталон
+
+Для каждого метода и уровня сжатия выводятся файлы/сек, МБ/сек, степень сжатия,
+p50/p95 времени на файл и пиковая память внешних процессов. Результат пишется в JSON;
+при наличии эталона (baseline.json) метрики сравниваются с ним и отклонения
+хуже порога помечаются как регрессия.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.corpus import CORPUS_SPEC, QUICK_CORPUS, generate_corpus
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CORPUS_DIR = os.path.join(BENCH_DIR, "corpus")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "last_run.json")
+
+# Методы, результат которых зависит от уровня сжатия (Ghostscript и OCR + Ghostscript)
+LEVEL_METHODS = {1, 2, 3, 5}
+OCR_METHODS = {4, 5}
+LEVELS = (1, 2, 3)
+
+# Допустимое ухудшение относительно эталона
+REGRESSION_THRESHOLD = 0.10
+
+
+def percentile(values, fraction):
+    """Перцентиль с линейной интерполяцией (fraction от 0 до 1)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def self_peak_rss_mb():
+    """Пиковая память процесса бенчмарка (OCR частично работает внутри процесса)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдает КБ, macOS - байты
+    return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+
+def ghostscript_version():
+    for command in ("gs", "gswin64c"):
+        try:
+            result = subprocess.run([command, "--version"], capture_output=True, text=True)
+            if result.returncode == 0:
+                return result.stdout.strip()
+        except OSError:
+            pass
+    return None
+
+
+def create_headless_app(work_dir):
+    """
+    Окно программы без отображения: БД и журналы бенчмарка лежат во временной папке,
+    рабочая БД pdf_compressor.db не затрагивается
+    """
+    os.environ["PDF_COMPRESSOR_DB_URL"] = f"sqlite:///{os.path.join(work_dir, 'bench.db')}"
+    import tkinter as tk
+    from compressor_app import PDFCompressor
+    from log_sink import AsyncLogSink
+
+    root = tk.Tk()
+    root.withdraw()
+    app = PDFCompressor(root)
+    app.log_sink.close()
+    app.log_sink = AsyncLogSink(os.path.join(work_dir, "logs"))
+    os.makedirs(app.log_sink.logs_dir, exist_ok=True)
+    app.log_sink.open_log()
+    # Порог экономии не должен отбрасывать результат: замеряется само сжатие
+    app.min_saving_threshold.set(0)
+    app.prepare_processing()
+    return root, app
+
+
+def select_method(app, method_id, level):
+    for value in app.method_combo['values']:
+        if value.split(':')[0] == str(method_id):
+            app.method_combo.set(value)
+            break
+    else:
+        raise ValueError(f"Метод {method_id} не найден")
+    app.on_method_changed()
+    if level is not None:
+        app.compression_level.set(level)
+
+
+def run_case(root, app, corpus, method_id, level, out_dir):
+    """Сжимает все файлы корпуса одним методом и уровнем, возвращает метрики"""
+    select_method(app, method_id, level)
+    child_results = []
+    app.process_supervisor.on_finish = child_results.append
+
+    latencies = []
+    input_bytes = 0
+    output_bytes = 0
+    ok_input_bytes = 0
+    failures = 0
+    started = time.perf_counter()
+    for name, info in corpus.items():
+        output_path = os.path.join(out_dir, name)
+        file_started = time.perf_counter()
+        success, _ = app.compress_pdf(info["path"], output_path)
+        latencies.append(time.perf_counter() - file_started)
+        input_bytes += info["size_bytes"]
+        if os.path.exists(output_path) and app.is_valid_pdf_output(output_path):
+            output_bytes += os.path.getsize(output_path)
+            ok_input_bytes += info["size_bytes"]
+            os.remove(output_path)
+        else:
+            failures += 1
+        root.update()  # разбираем очередь событий интерфейса, чтобы журнал не копился
+    wall_secs = time.perf_counter() - started
+    app.process_supervisor.on_finish = None
+
+    peak_rss_kb = max((result.peak_rss_kb or 0 for result in child_results), default=0)
+    return {
+        "method_id": method_id,
+        "level": level,
+        "files": len(corpus),
+        "failures": failures,
+        "input_mb": input_bytes / (1024 * 1024),
+        "wall_secs": wall_secs,
+        "files_per_sec": len(corpus) / wall_secs if wall_secs else None,
+        "mb_per_sec": input_bytes / (1024 * 1024) / wall_secs if wall_secs else None,
+        "ratio": output_bytes / ok_input_bytes if ok_input_bytes else None,
+        "p50_secs": percentile(latencies, 0.50),
+        "p95_secs": percentile(latencies, 0.95),
+        "child_processes": len(child_results),
+        "child_cpu_secs": sum(result.cpu_seconds or 0 for result in child_results),
+        "child_peak_rss_mb": peak_rss_kb / 1024.0 if peak_rss_kb else None,
+        "self_peak_rss_mb": self_peak_rss_mb(),
+        "per_file_secs": dict(zip(corpus, latencies))
+    }
+
+
+def case_key(method_id, level):
+    return f"{method_id}:{level if level is not None else '-'}"
+
+
+def compare_with_baseline(results, baseline):
+    """Список строк-предупреждений о регрессиях относительно эталона"""
+    if baseline.get("corpus_sha256") != results.get("corpus_sha256"):
+        return ["Корпус отличается от эталонного - сравнение невозможно"]
+    regressions = []
+    for key, case in results["cases"].items():
+        reference = baseline["cases"].get(key)
+        if not reference:
+            continue
+        # Метрики, где больше - лучше
+        for metric in ("files_per_sec", "mb_per_sec"):
+            current, previous = case.get(metric), reference.get(metric)
+            if current and previous and current < previous * (1 - REGRESSION_THRESHOLD):
+                regressions.append(f"{key} {metric}: {previous:.3f} -> {current:.3f}")
+        # Метрики, где меньше - лучше
+        for metric in ("p50_secs", "p95_secs", "ratio", "child_peak_rss_mb"):
+            current, previous = case.get(metric), reference.get(metric)
+            if current and previous and current > previous * (1 + REGRESSION_THRESHOLD):
+                regressions.append(f"{key} {metric}: {previous:.3f} -> {current:.3f}")
+        if case["failures"] > reference.get("failures", 0):
+            regressions.append(f"{key} failures: {reference.get('failures', 0)} -> {case['failures']}")
+    return regressions
+
+
+def print_table(cases):
+    print(f"{'метод:ур':<9} {'файл/с':>8} {'МБ/с':>8} {'сжатие':>7} {'p50 с':>8} {'p95 с':>8} "
+          f"{'пик МБ':>8} {'ошибок':>6}")
+
+    def fmt(value, pattern):
+        return pattern.format(value) if value is not None else "-"
+
+    for key, case in cases.items():
+        print(f"{key:<9} {fmt(case['files_per_sec'], '{:.3f}'):>8} {fmt(case['mb_per_sec'], '{:.2f}'):>8} "
+              f"{fmt(case['ratio'], '{:.1%}'):>7} {fmt(case['p50_secs'], '{:.2f}'):>8} "
+              f"{fmt(case['p95_secs'], '{:.2f}'):>8} {fmt(case['child_peak_rss_mb'], '{:.0f}'):>8} "
+              f"{case['failures']:>6}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк сжатия PDF на синтетическом корпусе")
+    parser.add_argument("--corpus-dir", default=DEFAULT_CORPUS_DIR, help="папка корпуса (создается при отсутствии)")
+    parser.add_argument("--quick", action="store_true", help="только небольшие файлы корпуса")
+    parser.add_argument("--files", nargs="+", choices=sorted(CORPUS_SPEC), help="выбранные файлы корпуса")
+    parser.add_argument("--methods", nargs="+", type=int, help="id методов сжатия (по умолчанию все доступные)")
+    parser.add_argument("--levels", nargs="+", type=int, choices=LEVELS, default=list(LEVELS))
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSON с результатами запуска")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="эталон для сравнения")
+    parser.add_argument("--save-baseline", action="store_true", help="сохранить результат как эталон")
+    parser.add_argument("--generate-only", action="store_true", help="только создать корпус")
+    args = parser.parse_args(argv)
+
+    names = args.files or (QUICK_CORPUS if args.quick else list(CORPUS_SPEC))
+    print(f"Подготовка корпуса в {args.corpus_dir}...")
+    corpus = generate_corpus(args.corpus_dir, names)
+    for name, info in corpus.items():
+        print(f"  {name}: {info['size_bytes'] / (1024 * 1024):.2f} МБ")
+    if args.generate_only:
+        return 0
+
+    work_dir = tempfile.mkdtemp(prefix="pdf_bench_")
+    try:
+        root, app = create_headless_app(work_dir)
+        available = [int(value.split(':')[0]) for value in app.method_combo['values']
+                     if "НЕ ДОСТУПЕН" not in value]
+        methods = args.methods or available
+        if not app.check_ghostscript():
+            print("Ghostscript не найден - бенчмарк невозможен")
+            return 1
+
+        out_dir = os.path.join(work_dir, "out")
+        os.makedirs(out_dir, exist_ok=True)
+        cases = {}
+        for method_id in methods:
+            if method_id not in available:
+                print(f"Метод {method_id} недоступен, пропуск")
+                continue
+            for level in (args.levels if method_id in LEVEL_METHODS else [None]):
+                key = case_key(method_id, level)
+                print(f"Метод {key}...")
+                cases[key] = run_case(root, app, corpus, method_id, level, out_dir)
+        root.destroy()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    # Отпечаток корпуса: эталоны сравниваются только на одинаковом наборе файлов
+    corpus_sha256 = ",".join(f"{name}={info['sha256']}" for name, info in sorted(corpus.items()))
+    results = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "ghostscript": ghostscript_version(),
+        "cpu_count": os.cpu_count(),
+        "corpus": {name: {"size_bytes": info["size_bytes"], "sha256": info["sha256"]}
+                   for name, info in corpus.items()},
+        "corpus_sha256": corpus_sha256,
+        "cases": cases
+    }
+
+    print()
+    print_table(cases)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\nРезультаты записаны в {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"Эталон сохранен: {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare_with_baseline(results, json.load(f))
+        if regressions:
+            print("\n⚠️ Регрессии относительно эталона:")
+            for line in regressions:
+                print(f"  {line}")
+            return 2
+        print("\nРегрессий относительно эталона нет")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+# benchmarks/bench_copy.py
+"""
+Бенчмарк копирования крупных файлов: fast_copy против shutil.copy2.
+
+    python -m benchmarks.bench_copy --size-mb 1024
+    python -m benchmarks.bench_copy --source-dir //server/share/tmp --dest-dir C:/Temp --workers 4
+
+Файл создается в --source-dir (по умолчанию - во временной папке) и копируется в --dest-dir
+каждым способом --repeat раз. Для каждого способа выводятся МБ/сек (лучший и медиана).
+Только что записанный файл лежит в кэше ОС, поэтому локальный замер показывает скорость
+копирования в памяти; для сетевой папки источник нужно указать на ней, а размер взять больше
+кэша клиента. "copy2 + хеш" - копия и отдельный проход для контрольной суммы, с ним
+сравнивается copy_file_with_checksum, считающая сумму за тот же проход.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from fast_copy import CHECKSUM_ALGORITHM, COPY_BUFFER_SIZE, copy_file, copy_file_with_checksum
+
+WRITE_BLOCK_SIZE = 8 * 1024 * 1024
+
+
+def create_source_file(path, size_mb):
+    """Файл из случайных блоков (случайные данные не сжимаются прозрачно ФС)"""
+    block = os.urandom(WRITE_BLOCK_SIZE)
+    remaining = size_mb * 1024 * 1024
+    with open(path, "wb") as f:
+        while remaining > 0:
+            f.write(block[:remaining])
+            remaining -= WRITE_BLOCK_SIZE
+
+
+def copy2_then_hash(src, dst):
+    shutil.copy2(src, dst)
+    hasher = hashlib.new(CHECKSUM_ALGORITHM)
+    with open(dst, "rb") as f:
+        for block in iter(lambda: f.read(COPY_BUFFER_SIZE), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def copy_cases(workers):
+    cases = [
+        ("shutil.copy2", shutil.copy2),
+        ("fast_copy.copy_file", copy_file),
+        ("copy2 + хеш", copy2_then_hash),
+        ("copy_file_with_checksum", copy_file_with_checksum),
+    ]
+    if workers > 1:
+        cases += [
+            (f"copy_file, {workers} потока", lambda src, dst: copy_file(src, dst, workers=workers)),
+            (f"copy_file_with_checksum, {workers} потока",
+             lambda src, dst: copy_file_with_checksum(src, dst, workers=workers)),
+        ]
+    return cases
+
+
+def run_case(copy, src, dst, size_mb, repeat):
+    speeds = []
+    for _ in range(repeat):
+        if os.path.exists(dst):
+            os.remove(dst)
+        started = time.perf_counter()
+        copy(src, dst)
+        elapsed = time.perf_counter() - started
+        speeds.append(size_mb / elapsed if elapsed else 0.0)
+    if os.path.getsize(dst) != os.path.getsize(src):
+        raise RuntimeError(f"размер копии {dst} не совпадает с исходным")
+    os.remove(dst)
+    speeds.sort()
+    return {"best_mb_per_sec": speeds[-1], "median_mb_per_sec": speeds[len(speeds) // 2]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Скорость копирования крупных файлов: fast_copy и shutil.copy2")
+    parser.add_argument("--size-mb", type=int, default=512, help="размер файла, МБ")
+    parser.add_argument("--repeat", type=int, default=3, help="повторов каждого способа")
+    parser.add_argument("--workers", type=int, default=4, help="потоков параллельного чтения")
+    parser.add_argument("--source-dir", help="папка исходного файла (например, сетевая)")
+    parser.add_argument("--dest-dir", help="папка копий")
+    parser.add_argument("--output", help="JSON с результатами")
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix="pdf_copy_bench_")
+    src = os.path.join(args.source_dir or work_dir, "copy_bench_source.bin")
+    dst = os.path.join(args.dest_dir or work_dir, "copy_bench_copy.bin")
+    results = {}
+    try:
+        print(f"Создание файла {args.size_mb} МБ: {src}")
+        create_source_file(src, args.size_mb)
+        for name, copy in copy_cases(args.workers):
+            results[name] = run_case(copy, src, dst, args.size_mb, args.repeat)
+            print(f"  {name:<42} {results[name]['best_mb_per_sec']:>8.0f} МБ/с "
+                  f"(медиана {results[name]['median_mb_per_sec']:.0f})")
+    finally:
+        for path in (src, dst):
+            if os.path.exists(path):
+                os.remove(path)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    baseline = results.get("shutil.copy2", {}).get("median_mb_per_sec")
+    if baseline:
+        print("\nОтносительно shutil.copy2 (медиана):")
+        for name, values in results.items():
+            print(f"  {name:<42} x{values['median_mb_per_sec'] / baseline:.2f}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"size_mb": args.size_mb, "repeat": args.repeat, "results": results}, f,
+                      ensure_ascii=False, indent=2)
+        print(f"\nРезультаты записаны в {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+# benchmarks/bench_pipeline.py
+"""
+Микробенчмарк накладных расходов конвейера обработки.
+
+Полный цикл process_directory (сканирование, очередь запуска, process_single_file, запись в БД,
+журнал, статистика) прогоняется на тысячах маленьких файлов с движком-заглушкой: вместо
+Ghostscript файл просто копируется. Остается только стоимость учета, которая и замеряется.
+
+    python -m benchmarks.bench_pipeline --files 2000
+
+Два прохода: "первый" - новые файлы, "повтор" - те же файлы уже есть в БД (как при
+повторном запуске по архиву). Для каждого шага выводится собственное время (без вложенных
+замеренных шагов) в микросекундах на файл и число вызовов на файл.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from functools import wraps
+
+from benchmarks.bench_compress import create_headless_app, percentile
+from benchmarks.corpus import CORPUS_SPEC, build_pdf
+
+FILES_PER_FOLDER = 100
+FAKE_FILE_BYTES = 1200 * 1024
+GHOSTSCRIPT_METHOD_ID = 1
+
+
+class StepProfiler:
+    """
+    Замер собственного времени шагов: методы объектов подменяются на обертки на уровне экземпляра.
+    Время вложенного замеренного вызова вычитается из времени внешнего, поэтому сумма шагов
+    равна общему времени без двойного счета
+    """
+
+    def __init__(self):
+        self.steps = {}  # шаг -> [вызовов, собственное время, сек]
+        self._stack = []  # время вложенных вызовов для каждого активного шага
+
+    def wrap(self, obj, method_name, step):
+        original = getattr(obj, method_name)
+        steps = self.steps
+        stack = self._stack
+
+        @wraps(original)
+        def timed(*args, **kwargs):
+            stack.append(0.0)
+            started = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                nested = stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+                entry = steps.setdefault(step, [0, 0.0])
+                entry[0] += 1
+                entry[1] += elapsed - nested
+
+        setattr(obj, method_name, timed)
+        return original
+
+    def reset(self):
+        self.steps.clear()
+        self._stack.clear()
+
+
+def create_fake_files(root_dir, count):
+    """
+    count файлов по FILES_PER_FOLDER в папке. Файлы крупнее порога в 1 МБ (иначе конвейер
+    пропускает их до сжатия) и по возможности являются жесткими ссылками на один образец,
+    чтобы тысячи файлов не занимали гигабайты.
+    Возвращает (папка с файлами, компактный PDF - результат движка-заглушки)
+    """
+    template = os.path.join(root_dir, "template.pdf")
+    build_pdf(template, *CORPUS_SPEC["tiny.pdf"], padding_bytes=FAKE_FILE_BYTES)
+    compact = os.path.join(root_dir, "compact.pdf")
+    build_pdf(compact, *CORPUS_SPEC["tiny.pdf"])
+    files_dir = os.path.join(root_dir, "files")
+    for index in range(count):
+        folder = os.path.join(files_dir, f"folder_{index // FILES_PER_FOLDER:04d}")
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"doc_{index:06d}.pdf")
+        try:
+            os.link(template, path)
+        except OSError:
+            shutil.copyfile(template, path)
+    return files_dir, compact
+
+
+def instrument(app, profiler, compact_pdf):
+    """Подменяет движок заглушкой и оборачивает шаги конвейера"""
+
+    def stub_engine(input_path, output_path, compression_level):
+        shutil.copyfile(compact_pdf, output_path)
+        return True
+
+    app.compress_with_ghostscript = stub_engine
+    profiler.wrap(app, "compress_with_ghostscript", "движок (заглушка)")
+    profiler.wrap(app, "compress_pdf", "compress_pdf")
+    profiler.wrap(app, "process_job", "process_job (очередь, врем. папка)")
+    profiler.wrap(app, "process_single_file", "process_single_file (прочее)")
+    profiler.wrap(app, "find_pdf_files", "сканирование")
+    profiler.wrap(app, "get_page_count", "подсчет страниц")
+    profiler.wrap(app, "check_page_size_limit", "проверка размера страницы")
+    profiler.wrap(app, "estimate_job_memory_mb", "оценка памяти")
+    profiler.wrap(app, "add_to_log", "журнал")
+    profiler.wrap(app, "update_stats", "статистика")
+    profiler.wrap(app, "save_stage_timings", "замер этапов")
+    for name in dir(type(app.db_ops)):
+        if not name.startswith("_") and callable(getattr(app.db_ops, name)):
+            profiler.wrap(app.db_ops, name, "normalize_path" if name == "normalize_path" else f"БД: {name}")
+
+    # Ограничение нагрузки и допуск по памяти пересоздаются в prepare_processing - оборачиваем после
+    prepare_processing = app.prepare_processing
+
+    def prepare_and_wrap():
+        prepare_processing()
+        for name in ("probe", "before_file", "account_bytes"):
+            profiler.wrap(app.io_throttle, name, "ограничение I/O")
+        for name in ("acquire", "release"):
+            profiler.wrap(app.memory_admission, name, "допуск по памяти")
+
+    app.prepare_processing = prepare_and_wrap
+
+
+def run_pass(root, app, profiler, files_dir, file_count, rerun):
+    """Один проход process_directory, возвращает метрики на файл"""
+    profiler.reset()
+    if rerun:
+        # Повтор без сканирования: очередь из тех же файлов, все они уже записаны в БД
+        paths = [os.path.join(folder, name)
+                 for folder, _, names in os.walk(files_dir) for name in sorted(names)]
+        setting = app.db_ops.get_active_setting()
+        app.db_ops.create_run(files_dir, app.depth_level.get(), setting.id if setting else None, paths)
+
+    latencies = []
+    process_job = app.process_job
+
+    def timed_job(run_file):
+        started = time.perf_counter()
+        try:
+            return process_job(run_file)
+        finally:
+            latencies.append(time.perf_counter() - started)
+
+    app.process_job = timed_job
+    started = time.perf_counter()
+    app.process_directory()
+    wall_secs = time.perf_counter() - started
+    app.process_job = process_job
+    root.update()  # разбираем очередь событий интерфейса
+
+    measured = sum(self_secs for _, self_secs in profiler.steps.values())
+    steps = {
+        step: {"calls_per_file": calls / file_count, "us_per_file": self_secs / file_count * 1e6}
+        for step, (calls, self_secs) in sorted(profiler.steps.items(), key=lambda item: -item[1][1])
+    }
+    steps["process_directory (прочее)"] = {
+        "calls_per_file": 1.0 / file_count,
+        "us_per_file": (wall_secs - measured) / file_count * 1e6
+    }
+    return {
+        "files": file_count,
+        "processed_jobs": len(latencies),
+        "wall_secs": wall_secs,
+        "us_per_file": wall_secs / file_count * 1e6,
+        "files_per_sec": file_count / wall_secs if wall_secs else None,
+        "p50_job_us": percentile(latencies, 0.50) * 1e6 if latencies else None,
+        "p95_job_us": percentile(latencies, 0.95) * 1e6 if latencies else None,
+        "steps": steps
+    }
+
+
+def print_pass(title, result):
+    print(f"\n{title}: {result['files']} файлов, {result['wall_secs']:.2f} сек, "
+          f"{result['us_per_file']:.0f} мкс/файл, {result['files_per_sec'] or 0:.0f} файл/с")
+    if result["p50_job_us"] is not None:
+        print(f"  задание: p50 {result['p50_job_us']:.0f} мкс, p95 {result['p95_job_us']:.0f} мкс")
+    print(f"  {'шаг':<42} {'мкс/файл':>10} {'вызовов/файл':>13}")
+    for step, values in result["steps"].items():
+        print(f"  {step:<42} {values['us_per_file']:>10.1f} {values['calls_per_file']:>13.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Накладные расходы конвейера с движком-заглушкой")
+    parser.add_argument("--files", type=int, default=2000, help="число файлов")
+    parser.add_argument("--replace", action="store_true", help="заменять исходные файлы (шаг замены)")
+    parser.add_argument("--timings", action="store_true", help="включить замер этапов (file_timing)")
+    parser.add_argument("--output", help="JSON с результатами")
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix="pdf_pipeline_bench_")
+    try:
+        print(f"Создание {args.files} файлов...")
+        files_dir, compact_pdf = create_fake_files(work_dir, args.files)
+        root, app = create_headless_app(work_dir)
+        profiler = StepProfiler()
+        instrument(app, profiler, compact_pdf)
+
+        for value in app.method_combo['values']:
+            if value.split(':')[0] == str(GHOSTSCRIPT_METHOD_ID):
+                app.method_combo.set(value)
+        app.directory_path.set(files_dir)
+        app.depth_level.set(4)
+        app.replace_original.set(args.replace)
+        app.kbytes_per_page_border.set(0)
+        app.collect_timings.set(args.timings)
+
+        results = {
+            "first": run_pass(root, app, profiler, files_dir, args.files, rerun=False),
+            "rerun": run_pass(root, app, profiler, files_dir, args.files, rerun=True)
+        }
+        root.destroy()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_pass("Первый проход", results["first"])
+    print_pass("Повторный проход", results["rerun"])
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\nРезультаты записаны в {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
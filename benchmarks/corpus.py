@@ -0,0 +1,194 @@
+# benchmarks/corpus.py
+import hashlib
+import os
+import random
+import zlib
+
+# Размер страницы A4 в пунктах (1/72 дюйма)
+PAGE_WIDTH_PT = 595
+PAGE_HEIGHT_PT = 842
+
+WORDS = (
+    "акт договор счет накладная приложение поставка оплата сумма дата подпись печать реестр "
+    "документ основание количество цена итого стороны обязательства срок исполнение "
+    "invoice contract page total amount order delivery payment signature"
+).split()
+
+# Состав корпуса: имя файла -> (вид, параметры). Файлы строятся детерминированно из seed,
+# поэтому корпус, сгенерированный на разных машинах, побайтно совпадает
+CORPUS_SPEC = {
+    "scan_gray_150dpi.pdf": ("scan", {"pages": 4, "dpi": 150, "color": False, "seed": 1}),
+    "scan_gray_300dpi.pdf": ("scan", {"pages": 4, "dpi": 300, "color": False, "seed": 2}),
+    "scan_color_200dpi.pdf": ("scan", {"pages": 3, "dpi": 200, "color": True, "seed": 3}),
+    "text_only.pdf": ("text", {"pages": 20, "seed": 4}),
+    "mixed.pdf": ("mixed", {"pages": 10, "dpi": 200, "seed": 5}),
+    "tiny.pdf": ("text", {"pages": 1, "lines": 5, "seed": 6}),
+    "huge_scan_300dpi.pdf": ("scan", {"pages": 40, "dpi": 300, "color": False, "seed": 7}),
+    "already_optimized.pdf": ("scan", {"pages": 6, "dpi": 72, "color": False, "seed": 8, "optimized": True}),
+}
+
+# Быстрый набор для проверки самого бенчмарка (без крупных файлов)
+QUICK_CORPUS = ("scan_gray_150dpi.pdf", "text_only.pdf", "mixed.pdf", "tiny.pdf", "already_optimized.pdf")
+
+
+class MinimalPdfWriter:
+    """Минимальная запись PDF 1.4 без внешних библиотек: объекты, таблица xref и трейлер"""
+
+    def __init__(self):
+        self.objects = []
+        self.page_ids = []
+        self.pages_id = self.reserve()
+        self.font_id = self.add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    def reserve(self):
+        self.objects.append(None)
+        return len(self.objects)
+
+    def add(self, body):
+        self.objects.append(body)
+        return len(self.objects)
+
+    def add_stream(self, data, dictionary=b"", compress_level=None):
+        if compress_level is not None:
+            data = zlib.compress(data, compress_level)
+            dictionary += b" /Filter /FlateDecode"
+        return self.add(b"<<" + dictionary + b" /Length %d >>\nstream\n" % len(data) + data + b"\nendstream")
+
+    def add_page(self, content, images=(), compress_level=None):
+        """Страница A4: content - поток операторов, images - id объектов изображений (/Im0, /Im1...)"""
+        content_id = self.add_stream(content, compress_level=compress_level)
+        xobjects = b" ".join(b"/Im%d %d 0 R" % (index, image_id) for index, image_id in enumerate(images))
+        resources = b"/Font << /F1 %d 0 R >>" % self.font_id
+        if images:
+            resources += b" /XObject << " + xobjects + b" >>"
+        page_id = self.add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Resources << %s >> /Contents %d 0 R >>"
+            % (self.pages_id, PAGE_WIDTH_PT, PAGE_HEIGHT_PT, resources, content_id)
+        )
+        self.page_ids.append(page_id)
+
+    def write(self, path, padding_bytes=0):
+        """padding_bytes - строки-комментарии после заголовка, чтобы получить файл нужного размера"""
+        kids = b" ".join(b"%d 0 R" % page_id for page_id in self.page_ids)
+        self.objects[self.pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self.page_ids))
+        catalog_id = self.add(b"<< /Type /Catalog /Pages %d 0 R >>" % self.pages_id)
+
+        offsets = []
+        with open(path, "wb") as f:
+            f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+            comment_line = b"%" + b" " * 78 + b"\n"
+            f.write(comment_line * (padding_bytes // len(comment_line)))
+            for number, body in enumerate(self.objects, start=1):
+                offsets.append(f.tell())
+                f.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+            xref_offset = f.tell()
+            f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(self.objects) + 1))
+            for offset in offsets:
+                f.write(b"%010d 00000 n \n" % offset)
+            f.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                    % (len(self.objects) + 1, catalog_id, xref_offset))
+
+
+def text_content(rng, lines=60, top=None):
+    """Поток операторов со строками псевдотекста шрифтом Helvetica"""
+    top = PAGE_HEIGHT_PT - 60 if top is None else top
+    parts = [b"BT /F1 10 Tf 12 TL 50 %d Td" % top]
+    for _ in range(lines):
+        line = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 12)))
+        # Кириллица в Helvetica не отображается, но объем потока как у реального текста
+        parts.append(b"(" + line.encode("cp1251") + b") Tj T*")
+    parts.append(b"ET")
+    return b"\n".join(parts)
+
+
+def scan_image(writer, rng, dpi, color, compress_level, height_inches=11.69):
+    """
+    Изображение "скана" A4: белый фон с темными штрихами строк и шумом сканера.
+    Строки собираются из небольшого набора случайных строк пикселей - генерация быстрая
+    и детерминированная, а сжимаемость близка к реальным сканам без JPEG
+    """
+    width = int(8.27 * dpi)
+    height = int(height_inches * dpi)
+    channels = 3 if color else 1
+    row_bytes = width * channels
+
+    blank_rows = []
+    text_rows = []
+    for _ in range(16):
+        noise = bytes(255 - rng.randrange(0, 24) for _ in range(row_bytes))
+        blank_rows.append(noise)
+        text = bytearray(noise)
+        for _ in range(width // 12):
+            start = rng.randrange(0, width - 8) * channels
+            length = rng.randint(2, 8) * channels
+            text[start:start + length] = bytes([rng.randrange(0, 90)]) * length
+        text_rows.append(bytes(text))
+
+    rows = []
+    line_height = max(dpi // 6, 4)
+    for y in range(height):
+        in_text_line = (y // line_height) % 2 == 1 and dpi // 2 < y < height - dpi // 2
+        rows.append(rng.choice(text_rows if in_text_line else blank_rows))
+
+    color_space = b"/DeviceRGB" if color else b"/DeviceGray"
+    return writer.add_stream(
+        b"".join(rows),
+        b" /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace %s /BitsPerComponent 8"
+        % (width, height, color_space),
+        compress_level=compress_level
+    )
+
+
+def build_pdf(path, kind, params, padding_bytes=0):
+    rng = random.Random(params["seed"])
+    writer = MinimalPdfWriter()
+    optimized = params.get("optimized", False)
+    # Неоптимизированные файлы: текст без сжатия, изображения со слабым сжатием, как у сканеров
+    text_compress = 9 if optimized else None
+    image_compress = 9 if optimized else 1
+
+    for page in range(params["pages"]):
+        if kind == "text" or (kind == "mixed" and page % 2 == 0):
+            writer.add_page(text_content(rng, params.get("lines", 60)), compress_level=text_compress)
+        elif kind == "mixed":
+            # Половина страницы - текст, половина - вставленное изображение
+            image_id = scan_image(writer, rng, params["dpi"], True, image_compress, height_inches=5.5)
+            content = (text_content(rng, 25) + b"\nq %d 0 0 %d 0 0 cm /Im0 Do Q"
+                       % (PAGE_WIDTH_PT, PAGE_HEIGHT_PT // 2))
+            writer.add_page(content, images=[image_id], compress_level=text_compress)
+        else:
+            image_id = scan_image(writer, rng, params["dpi"], params.get("color", False), image_compress)
+            content = b"q %d 0 0 %d 0 0 cm /Im0 Do Q" % (PAGE_WIDTH_PT, PAGE_HEIGHT_PT)
+            writer.add_page(content, images=[image_id], compress_level=text_compress)
+
+    writer.write(path, padding_bytes)
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def generate_corpus(corpus_dir, names=None):
+    """
+    Создает недостающие файлы корпуса в corpus_dir.
+    Возвращает {имя: {"path", "size_bytes", "sha256"}} для выбранных файлов
+    """
+    os.makedirs(corpus_dir, exist_ok=True)
+    manifest = {}
+    for name in names or CORPUS_SPEC:
+        kind, params = CORPUS_SPEC[name]
+        path = os.path.join(corpus_dir, name)
+        if not os.path.exists(path):
+            temp_path = path + ".tmp"
+            build_pdf(temp_path, kind, params)
+            os.replace(temp_path, path)
+        manifest[name] = {
+            "path": path,
+            "size_bytes": os.path.getsize(path),
+            "sha256": file_sha256(path)
+        }
+    return manifest
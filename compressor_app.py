@@ -11,12 +11,29 @@ import uuid
 import glob
 import time
 import traceback
+import queue
 
 # Импорты для работы с БД
 from models.database import get_db, create_tables
 from models.models import ProcessedFile, CompressionMethod
-from crud.operations import DBOperations
+from crud.operations import DBOperations, RUN_COMPLETED, RUN_INTERRUPTED, RUN_RUNNING
 from stats_window import StatsWindow
+from process_supervisor import (ProcessSupervisor, STATUS_OK, STATUS_OUTPUT_LIMIT, STATUS_TIMEOUT,
+                                STATUS_CANCELLED)
+from timeout_model import AdaptiveTimeoutModel
+from io_throttle import AdaptiveIOThrottle
+from directory_index import DirectoryIndex
+from folder_watcher import FolderWatcher
+from log_sink import AsyncLogSink
+from ui_event_bus import UIEventBus
+from stage_timer import StageTimer
+from tool_probe import probe_tool
+from file_staging import PrefetchCache, WriteBackQueue, is_network_path
+from fast_copy import copy_file
+from priority_scheduler import SavingsPriorityModel, file_sizes
+from run_policy import RunPolicy, RunBudget, parse_clock, WINDOW_POLL_SECS
+from memory_scheduler import (MemoryAdmissionController, estimate_gs_memory_mb, estimate_ocr_memory_mb,
+                              OCR_DEFAULT_DPI)
 
 # Импорт OCR процессора
 try:
@@ -26,6 +43,40 @@ except ImportError:
     OCR_SUPPORT = False
     print("OCRProcessor не доступен. OCR методы будут отключены.")
 
+# Гонка стратегий: минимальный размер файла для гонки (уровни - в настройке, race_levels)
+RACE_MIN_SIZE_MB = 100
+RACE_POLL_INTERVAL_SECS = 0.2
+
+# Журнал в формате JSON lines (log_*.jsonl) вместо текстового
+LOG_JSON_LINES = False
+
+# Лимит адресного пространства (RLIMIT_AS) для одного внешнего процесса, МБ; 0 - без лимита. Только POSIX.
+# Многопоточные tesseract, pdftoppm и gs на больших сканах резервируют адресное пространство намного
+# больше используемой памяти и падают при таком лимите - память ограничивается допуском заданий
+JOB_MEMORY_LIMIT_MB = 0
+# Лимит процессорного времени (RLIMIT_CPU) внешнего процесса: таймаут файла x множитель x число ядер.
+# Многопоточный процесс тратит CPU быстрее настенного времени - лимит только страхует от зависаний,
+# а обычно раньше срабатывает таймаут по времени. 0 - без лимита. Только POSIX.
+CPU_LIMIT_TIMEOUT_FACTOR = 2
+
+# Упреждающее чтение сетевых файлов (UNC): сколько следующих файлов очереди копировать в локальный
+# кэш, пока сжимается текущий, и предел размера кэша, МБ. 0 файлов - копирование перед сжатием
+NETWORK_PREFETCH_FILES = 2
+NETWORK_PREFETCH_MAX_MB = 1024
+# Потоков параллельного чтения крупных сетевых файлов (fast_copy.PARALLEL_MIN_SIZE и больше).
+# На локальном диске 4 потока медленнее copy2 (benchmarks.bench_copy) - увеличивать только
+# по замеру на своей сетевой папке (--source-dir)
+NETWORK_COPY_WORKERS = 1
+
+# Замена исходных файлов результатом в фоновом потоке (при обработке директории) и предел
+# замен в ожидании: при медленной записи на хранилище следующий файл ждет
+ASYNC_WRITE_BACK = True
+WRITE_BACK_MAX_PENDING = 2
+
+# Очередь нового запуска - по ожидаемой экономии МБ на секунду обработки (оценка по размеру
+# и истории папки), а не в порядке обхода: прерванный запуск успевает сжать самое выгодное
+PRIORITY_SCHEDULING = True
+
 
 class PDFCompressor:
     def __init__(self, root):
@@ -52,9 +103,24 @@ class PDFCompressor:
         self.min_saving_threshold = tk.IntVar(
             value=self.active_setting.compression_min_boundary if self.active_setting else 1024)
         self.file_timeout = tk.IntVar(value=self.active_setting.procession_timeout if self.active_setting else 35)
+        self.adaptive_timeout = tk.BooleanVar(
+            value=bool(self.active_setting.adaptive_timeout) if self.active_setting else False)
         self.timeout_iterations = tk.IntVar(value=self.active_setting.timeout_iterations if self.active_setting else 350)
         self.timeout_interval_secs = tk.IntVar(value=self.active_setting.timeout_interval_secs if self.active_setting else 9)
         self.ocr_max_pages = tk.IntVar(value=self.active_setting.ocr_max_pages if self.active_setting else 120)
+        self.memory_budget_mb = tk.IntVar(value=self.active_setting.memory_budget_mb if self.active_setting else 0)
+        self.io_max_mb_per_sec = tk.DoubleVar(value=self.active_setting.io_max_mb_per_sec if self.active_setting else 0.0)
+        self.io_max_files_per_sec = tk.DoubleVar(
+            value=self.active_setting.io_max_files_per_sec if self.active_setting else 0.0)
+        self.collect_timings = tk.BooleanVar(
+            value=bool(self.active_setting.collect_timings) if self.active_setting else False)
+        self.run_window_start = tk.StringVar(value=self.active_setting.run_window_start if self.active_setting else "")
+        self.run_window_end = tk.StringVar(value=self.active_setting.run_window_end if self.active_setting else "")
+        self.run_max_hours = tk.DoubleVar(value=self.active_setting.run_max_hours if self.active_setting else 0.0)
+        self.run_max_read_gb = tk.DoubleVar(value=self.active_setting.run_max_read_gb if self.active_setting else 0.0)
+        self.run_max_cpu_hours = tk.DoubleVar(
+            value=self.active_setting.run_max_cpu_hours if self.active_setting else 0.0)
+        self.race_levels = tk.StringVar(value=self.active_setting.race_levels if self.active_setting else "1,2,3")
         
         # ✅ НОВОЕ: максимально допустимый размер страницы, КБ
         self.kbytes_per_page_border = tk.DoubleVar(value=(
@@ -71,17 +137,46 @@ class PDFCompressor:
         self.current_file_path = None
         self.stop_current_file = False
         self.processing_start_time = 0
+        self.last_compression_tier = None  # ступень/стратегия, давшая результат для текущего файла
+        self.last_fail_reason = None  # причина неудачи, определенная при сжатии (имя из fail_reason)
+        self.process_supervisor = ProcessSupervisor(memory_limit_mb=JOB_MEMORY_LIMIT_MB or None)
+        self.timeout_model = None  # AdaptiveTimeoutModel, обучается в начале каждого запуска
+        self.current_file_timeout = self.file_timeout.get()  # таймаут текущего файла, сек (None - без таймаута)
+        self.current_ocr_timeout = None  # таймаут OCR текущего файла, сек (None - без таймаута)
+        self.memory_admission = MemoryAdmissionController(self.memory_budget_mb.get())
+        self.io_throttle = AdaptiveIOThrottle(self.io_max_mb_per_sec.get(), self.io_max_files_per_sec.get())
+        self.job_temp_dir = None  # временная папка текущего задания очереди запуска
+        self.prefetcher = None  # PrefetchCache сетевых файлов на время обработки директории
+        self.prefetch_recorded = {}  # путь -> записан ли в БД (окно упреждающего чтения)
+        self.write_back = None  # WriteBackQueue замен исходных файлов на время обработки директории
+        self.current_run_file = None  # RunFile текущего задания очереди запуска
+        self.write_back_deferred = False  # замена файла текущего задания передана в фоновый поток
+        self.closing = False  # окно закрывается: запуск останавливается, фоновые замены дописываются
+        self.run_budget = None  # RunBudget политики запуска (None - запуск без ограничений)
+        self.waiting_for_run_window = False  # запуск ждет окна обработки
+        self.directory_index = None  # DirectoryIndex последнего сканирования запуска
+        self.processing_thread = None  # поток обработки директории
+        self.folder_watcher = None  # FolderWatcher в режиме наблюдения
+        self.watch_queue = queue.Queue()  # файлы, готовые к сжатию в режиме наблюдения
+        self.stage_timer = StageTimer()  # замер этапов текущего файла (включается настройкой)
 
         # Настройка системы логирования
         self.logs_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs")
         os.makedirs(self.logs_dir, exist_ok=True)
-        self.current_log_file = None
         self.max_log_size = 10 * 1024 * 1024  # 10 MB
+        # Запись в файл идет в фоновом потоке пачками, ротированные журналы сжимаются в .gz
+        self.log_sink = AsyncLogSink(self.logs_dir, max_bytes=self.max_log_size, json_lines=LOG_JSON_LINES)
 
         # Журнал операций
         self.log_text = tk.Text(self.root, height=15, state=tk.DISABLED, wrap=tk.WORD)
         self.log_scrollbar = ttk.Scrollbar(self.root, orient=tk.VERTICAL, command=self.log_text.yview)
         self.log_text.configure(yscrollcommand=self.log_scrollbar.set)
+        self.log_text.tag_config("warning", foreground="orange")
+        self.log_text.tag_config("error", foreground="red")
+        self.log_text.tag_config("success", foreground="green")
+        self.log_text.tag_config("info", foreground="blue")
+        # Рабочие потоки не трогают виджеты: журнал и статистика обновляются Tk-потоком по таймеру
+        self.ui_bus = UIEventBus(self.root, self.log_text, self.apply_stats)
 
         # Статистика
         self.processed_files = 0
@@ -109,8 +204,8 @@ class PDFCompressor:
         self.method_desc_label = None
 
         self.setup_ui()
-        self.check_ghostscript()
-        self.check_tools()  # Теперь OCR инициализируется здесь
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.check_tools()  # Ghostscript и OCR проверяются здесь
         self.check_log_files()
 
     def check_tools(self):
@@ -120,7 +215,13 @@ class PDFCompressor:
         # Инициализируем OCRProcessor только после создания UI
         if OCR_SUPPORT and self.ocr_processor is None:
             try:
-                self.ocr_processor = OCRProcessor(self.db_ops, self.add_to_log)
+                self.ocr_processor = OCRProcessor(
+                    self.db_ops,
+                    self.add_to_log,
+                    cancel_check=self.is_cancel_requested,
+                    supervisor=self.process_supervisor
+                )
+                self.ocr_processor.copy_workers = NETWORK_COPY_WORKERS
                 self.ocr_available = self.ocr_processor.ocr_available
             except Exception as e:
                 self.add_to_log(f"Ошибка инициализации OCR: {e}", "warning")
@@ -197,15 +298,19 @@ class PDFCompressor:
         for setting in all_settings:
             active_indicator = " [АКТИВНО]" if setting.is_active else ""
             border_text = f", Лимит стр: {setting.kbytes_per_page_border:.0f} КБ" if setting.kbytes_per_page_border else ", Лимит стр: выкл"
+            policy = RunPolicy.from_setting(setting)
             settings_listbox.insert(
                 tk.END,
                 f"ID{setting.id}: Глубина={setting.nesting_depth.name}, "
                 f"Замена={setting.need_replace}, Ур.сжатия={setting.compression_level}, "
                 f"Метод={setting.compression_method.name}, Порог={setting.compression_min_boundary}Б, "
-                f"Таймаут={setting.procession_timeout}, "
-                f"Итерации={setting.timeout_iterations}шт, "
-                f"Пауза={setting.timeout_interval_secs}с, "
-                f"OCR стр={setting.ocr_max_pages}{border_text}"
+                f"{f'Уровни гонки={setting.race_levels}, ' if setting.compression_method_id == 7 else ''}"
+                f"Таймаут={setting.procession_timeout}{' (адапт.)' if setting.adaptive_timeout else ''}, "
+                f"I/O={setting.io_max_mb_per_sec or '∞'}МБ/с, {setting.io_max_files_per_sec or '∞'}файл/с, "
+                f"{'Замер этапов, ' if setting.collect_timings else ''}"
+                f"{f'Политика: {policy.describe()}, ' if policy.is_limited() else ''}"
+                f"OCR стр={setting.ocr_max_pages}{border_text}, "
+                f"Память={f'{setting.memory_budget_mb}МБ' if setting.memory_budget_mb else 'авто'}"
                 f"{active_indicator}"
             )
 
@@ -264,6 +369,11 @@ class PDFCompressor:
                 kbytes_border = self.kbytes_per_page_border.get()
                 if kbytes_border <= 0:
                     kbytes_border = None
+
+                settings_error = self.settings_error()
+                if settings_error:
+                    messagebox.showerror("Ошибка", settings_error)
+                    return
                 
                 # Создание новой настройки на основе текущих значений UI
                 new_setting = self.db_ops.create_setting(
@@ -277,6 +387,17 @@ class PDFCompressor:
                     timeout_interval_secs=self.timeout_interval_secs.get(),
                     ocr_max_pages=self.ocr_max_pages.get(),
                     kbytes_per_page_border=kbytes_border,  # ✅ НОВОЕ
+                    adaptive_timeout=self.adaptive_timeout.get(),
+                    memory_budget_mb=self.memory_budget_mb.get(),
+                    io_max_mb_per_sec=self.io_max_mb_per_sec.get(),
+                    io_max_files_per_sec=self.io_max_files_per_sec.get(),
+                    collect_timings=self.collect_timings.get(),
+                    run_window_start=self.run_window_start.get().strip(),
+                    run_window_end=self.run_window_end.get().strip(),
+                    run_max_hours=self.run_max_hours.get(),
+                    run_max_read_gb=self.run_max_read_gb.get(),
+                    run_max_cpu_hours=self.run_max_cpu_hours.get(),
+                    race_levels=",".join(str(lvl) for lvl in self.get_race_levels()),
                     info=f"Создано {datetime.now().strftime('%d.%m.%Y %H:%M')}",
                     activate=True
                 )
@@ -332,9 +453,20 @@ class PDFCompressor:
             self.compression_level.set(self.active_setting.compression_level)
             self.min_saving_threshold.set(self.active_setting.compression_min_boundary)
             self.file_timeout.set(self.active_setting.procession_timeout)
+            self.adaptive_timeout.set(bool(self.active_setting.adaptive_timeout))
             self.timeout_iterations.set(self.active_setting.timeout_iterations)
             self.timeout_interval_secs.set(self.active_setting.timeout_interval_secs)
             self.ocr_max_pages.set(self.active_setting.ocr_max_pages)
+            self.memory_budget_mb.set(self.active_setting.memory_budget_mb)
+            self.io_max_mb_per_sec.set(self.active_setting.io_max_mb_per_sec)
+            self.io_max_files_per_sec.set(self.active_setting.io_max_files_per_sec)
+            self.collect_timings.set(bool(self.active_setting.collect_timings))
+            self.run_window_start.set(self.active_setting.run_window_start)
+            self.run_window_end.set(self.active_setting.run_window_end)
+            self.run_max_hours.set(self.active_setting.run_max_hours)
+            self.run_max_read_gb.set(self.active_setting.run_max_read_gb)
+            self.run_max_cpu_hours.set(self.active_setting.run_max_cpu_hours)
+            self.race_levels.set(self.active_setting.race_levels)
             
             # ✅ НОВОЕ
             if self.active_setting.kbytes_per_page_border is not None:
@@ -351,9 +483,40 @@ class PDFCompressor:
                         self.method_combo.set(f"{method.id}: {method.name}{ocr_mark}")
                         break
 
+    def is_cancel_requested(self):
+        """Запрошен ли пропуск текущего файла (проверяется супервизором внешних процессов)"""
+        return self.stop_current_file
+
+    def on_close(self):
+        """
+        Закрытие окна: текущий файл прерывается, новые не начинаются. Окно закрывается после
+        остановки потока обработки - замены, уже переданные фоновому потоку, дописываются на
+        хранилище и в БД. Повторное закрытие не ждет (недописанная замена не портит исходный файл
+        и вернет его в очередь при следующем запуске)
+        """
+        if self.closing or not (self.processing_thread and self.processing_thread.is_alive()):
+            self.root.destroy()
+            return
+        self.closing = True
+        self.stop_current_file = True
+        if self.folder_watcher is not None:
+            self.folder_watcher.stop()
+        self.add_to_log("Закрытие: обработка останавливается, дописываются начатые замены файлов...", "warning")
+        self.wait_processing_and_close()
+
+    def wait_processing_and_close(self):
+        if self.processing_thread and self.processing_thread.is_alive():
+            self.root.after(200, self.wait_processing_and_close)
+        else:
+            self.root.destroy()
+
     def skip_current_file(self):
-        """Пропускает текущий обрабатываемый файл"""
-        if self.currently_processing and self.current_file_path:
+        """Пропускает текущий обрабатываемый файл: внешние процессы останавливаются сразу"""
+        if self.waiting_for_run_window:
+            # Ожидание окна обработки прерывается, очередь остается сохраненной
+            self.stop_current_file = True
+            self.add_to_log("Ожидание окна обработки отменено пользователем", "warning")
+        elif self.currently_processing and self.current_file_path:
             self.stop_current_file = True
             self.add_to_log(f"Пропуск файла по требованию пользователя: {os.path.basename(self.current_file_path)}",
                             "warning")
@@ -361,58 +524,18 @@ class PDFCompressor:
     def setup_log_file(self):
         """Создает или выбирает файл для логирования"""
         try:
-            # Ищем существующие log-файлы
-            log_files = glob.glob(os.path.join(self.logs_dir, "log_*.txt"))
-
-            if log_files:
-                # Берем последний файл
-                latest_log = max(log_files, key=os.path.getctime)
-                file_size = os.path.getsize(latest_log)
-
-                if file_size < self.max_log_size:
-                    self.current_log_file = latest_log
-                    self.add_to_log(f"Продолжаем запись в журнал: {os.path.basename(latest_log)}")
-                    return
-
-            # Создаем новый файл
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            new_log_file = os.path.join(self.logs_dir, f"log_{timestamp}.txt")
-            self.current_log_file = new_log_file
-
-            # Записываем заголовок
-            with open(self.current_log_file, 'w', encoding='utf-8') as f:
-                f.write(f"PDF Compressor Log - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write("=" * 50 + "\n\n")
-
-            self.add_to_log(f"Создан новый журнал: {os.path.basename(new_log_file)}")
-
+            log_name, is_new = self.log_sink.open_log()
+            if is_new:
+                self.add_to_log(f"Создан новый журнал: {log_name}")
+            else:
+                self.add_to_log(f"Продолжаем запись в журнал: {log_name}")
         except Exception as e:
             self.add_to_log(f"Ошибка создания файла журнала: {e}", "error")
-            self.current_log_file = None
-
-    def save_to_log_file(self, message):
-        """Сохраняет сообщение в файл журнала"""
-        if not self.current_log_file:
-            return
-
-        try:
-            # Проверяем размер файла
-            if os.path.exists(self.current_log_file):
-                file_size = os.path.getsize(self.current_log_file)
-                if file_size >= self.max_log_size:
-                    self.setup_log_file()  # Создаем новый файл
-
-            # Записываем сообщение
-            with open(self.current_log_file, 'a', encoding='utf-8') as f:
-                f.write(message + "\n")
-
-        except Exception as e:
-            print(f"Ошибка записи в файл журнала: {e}")
 
     def check_log_files(self):
         """Проверяет количество файлов журналов и показывает предупреждение"""
         try:
-            log_files = glob.glob(os.path.join(self.logs_dir, "log_*.txt"))
+            log_files = glob.glob(os.path.join(self.logs_dir, "log_*"))
             if len(log_files) > 3:
                 warning_text = f"Внимание! Количество журналов работы программы составляет {len(log_files)}.\nРекомендуется удалить лишние журналы, расположенные в директории:\n{self.logs_dir}"
 
@@ -426,22 +549,12 @@ class PDFCompressor:
             self.add_to_log(f"Ошибка проверки журналов: {e}", "error")
 
     def check_ghostscript(self):
-        """Проверяем установлен ли Ghostscript"""
-        try:
-            result = subprocess.run(['gs', '--version'], capture_output=True, text=True)
-            if result.returncode == 0:
-                self.add_to_log(f"Ghostscript найден: {result.stdout.strip()}")
-                return True
-        except:
-            pass
-
-        try:
-            result = subprocess.run(['gswin64c', '--version'], capture_output=True, text=True)
-            if result.returncode == 0:
-                self.add_to_log(f"Ghostscript найден: {result.stdout.strip()}")
+        """Проверяем установлен ли Ghostscript (результат запуска gs --version кэшируется, tool_probe.py)"""
+        for command in ('gs', 'gswin64c'):
+            path, version = probe_tool(command)
+            if path:
+                self.add_to_log(f"Ghostscript найден: {version}")
                 return True
-        except:
-            pass
 
         self.add_to_log("⚠️  Ghostscript не найден! Установите его для работы программы", "warning")
         return False
@@ -552,9 +665,13 @@ class PDFCompressor:
         if not self.method_combo.get() and method_values:
             self.method_combo.set(method_values[0])
         
+        # Уровни Ghostscript для гонки стратегий
+        ttk.Label(method_frame, text="Уровни гонки:").grid(row=0, column=1, sticky=tk.W, padx=(20, 5))
+        ttk.Entry(method_frame, textvariable=self.race_levels, width=8).grid(row=0, column=2, sticky=tk.W)
+
         # Добавляем описание метода
         self.method_desc_label = ttk.Label(method_frame, text="", foreground="gray", wraplength=600)
-        self.method_desc_label.grid(row=1, column=0, sticky=tk.W, pady=(5, 0))
+        self.method_desc_label.grid(row=1, column=0, columnspan=3, sticky=tk.W, pady=(5, 0))
         
         # Привязываем событие изменения выбора
         self.method_combo.bind('<<ComboboxSelected>>', self.on_method_changed)
@@ -589,36 +706,46 @@ class PDFCompressor:
             width=10
         ).pack(side=tk.LEFT)
         ttk.Label(timeout_frame, text="сек (1-3600)").pack(side=tk.LEFT, padx=5)
+        ttk.Checkbutton(
+            timeout_frame,
+            text="Адаптивный (по истории: сек/стр и сек/МБ)",
+            variable=self.adaptive_timeout
+        ).pack(side=tk.LEFT, padx=10)
+        ttk.Checkbutton(
+            timeout_frame,
+            text="Замерять время этапов",
+            variable=self.collect_timings
+        ).pack(side=tk.LEFT, padx=10)
 
-        # Интервал итераций для таймаута
-        ttk.Label(main_frame, text="Интервал итераций для таймаута (шт):").grid(row=7, column=0, sticky=tk.W, pady=5)
-        iterations_frame = ttk.Frame(main_frame)
-        iterations_frame.grid(row=7, column=1, sticky=(tk.W, tk.E), pady=5)
+        # Потолок скорости чтения/записи на хранилище
+        ttk.Label(main_frame, text="Макс. скорость I/O (МБ/с):").grid(row=7, column=0, sticky=tk.W, pady=5)
+        io_bytes_frame = ttk.Frame(main_frame)
+        io_bytes_frame.grid(row=7, column=1, sticky=(tk.W, tk.E), pady=5)
 
         ttk.Spinbox(
-            iterations_frame,
-            from_=1,
-            to=1000,
-            increment=10,
-            textvariable=self.timeout_iterations,
+            io_bytes_frame,
+            from_=0,
+            to=10000,
+            increment=5,
+            textvariable=self.io_max_mb_per_sec,
             width=10
         ).pack(side=tk.LEFT)
-        ttk.Label(iterations_frame, text="шт (1-1000)").pack(side=tk.LEFT, padx=5)
+        ttk.Label(io_bytes_frame, text="МБ/с (0 = без ограничения)").pack(side=tk.LEFT, padx=5)
 
-        # Продолжительность интервального таймаута
-        ttk.Label(main_frame, text="Продолжительность интервального таймаута (сек):").grid(row=8, column=0, sticky=tk.W, pady=5)
-        interval_frame = ttk.Frame(main_frame)
-        interval_frame.grid(row=8, column=1, sticky=(tk.W, tk.E), pady=5)
+        # Потолок количества файлов в секунду
+        ttk.Label(main_frame, text="Макс. файлов в секунду:").grid(row=8, column=0, sticky=tk.W, pady=5)
+        io_files_frame = ttk.Frame(main_frame)
+        io_files_frame.grid(row=8, column=1, sticky=(tk.W, tk.E), pady=5)
 
         ttk.Spinbox(
-            interval_frame,
-            from_=1,
-            to=60,
-            increment=1,
-            textvariable=self.timeout_interval_secs,
+            io_files_frame,
+            from_=0,
+            to=100,
+            increment=0.5,
+            textvariable=self.io_max_files_per_sec,
             width=10
         ).pack(side=tk.LEFT)
-        ttk.Label(interval_frame, text="сек (1-60)").pack(side=tk.LEFT, padx=5)
+        ttk.Label(io_files_frame, text="файл/с (0 = без ограничения). Скорость снижается сама при росте задержки хранилища").pack(side=tk.LEFT, padx=5)
 
         # Максимальное количество страниц для OCR
         ttk.Label(main_frame, text="Макс. страниц для OCR:").grid(row=9, column=0, sticky=tk.W, pady=5)
@@ -634,6 +761,16 @@ class PDFCompressor:
             width=10
         ).pack(side=tk.LEFT)
         ttk.Label(ocr_pages_frame, text="стр. (1-1000)").pack(side=tk.LEFT, padx=5)
+        ttk.Label(ocr_pages_frame, text="Бюджет памяти:").pack(side=tk.LEFT, padx=(20, 5))
+        ttk.Spinbox(
+            ocr_pages_frame,
+            from_=0,
+            to=262144,
+            increment=512,
+            textvariable=self.memory_budget_mb,
+            width=8
+        ).pack(side=tk.LEFT)
+        ttk.Label(ocr_pages_frame, text="МБ (0 = авто)").pack(side=tk.LEFT, padx=5)
 
         # ✅ НОВОЕ: Максимально допустимый размер страницы (КБ)
         ttk.Label(main_frame, text="Макс. размер страницы (КБ):").grid(row=10, column=0, sticky=tk.W, pady=5)
@@ -660,36 +797,57 @@ class PDFCompressor:
         )
         border_hint.pack(side=tk.LEFT, padx=10)
 
+        # Политика запуска: окно обработки и бюджеты
+        ttk.Label(main_frame, text="Окно обработки:").grid(row=11, column=0, sticky=tk.W, pady=5)
+        policy_frame = ttk.Frame(main_frame)
+        policy_frame.grid(row=11, column=1, sticky=(tk.W, tk.E), pady=5)
+
+        ttk.Entry(policy_frame, textvariable=self.run_window_start, width=6).pack(side=tk.LEFT)
+        ttk.Label(policy_frame, text="-").pack(side=tk.LEFT, padx=2)
+        ttk.Entry(policy_frame, textvariable=self.run_window_end, width=6).pack(side=tk.LEFT)
+        ttk.Label(policy_frame, text="ЧЧ:ММ (пусто = всегда)").pack(side=tk.LEFT, padx=5)
+        for label, variable, increment in (("Лимит времени:", self.run_max_hours, 0.5),
+                                           ("чтения:", self.run_max_read_gb, 10),
+                                           ("CPU:", self.run_max_cpu_hours, 1)):
+            ttk.Label(policy_frame, text=label).pack(side=tk.LEFT, padx=(10, 2))
+            ttk.Spinbox(policy_frame, from_=0, to=100000, increment=increment, textvariable=variable,
+                        width=6).pack(side=tk.LEFT)
+        ttk.Label(policy_frame, text="ч / ГБ / ч (0 = без ограничения)").pack(side=tk.LEFT, padx=5)
+
         # Кнопка запуска
         ttk.Button(main_frame, text="Начать сжатие", command=self.start_compression).grid(
-            row=11, column=0, columnspan=3, pady=10
+            row=12, column=0, columnspan=3, pady=10
         )
 
         # Кнопка открытия папки с логами
         ttk.Button(main_frame, text="Открыть папку с журналами", command=self.open_logs_folder).grid(
-            row=11, column=2, pady=10, sticky=tk.E
+            row=12, column=2, pady=10, sticky=tk.E
         )
         
         # Кнопка инструкции
         ttk.Button(main_frame, text="📖 ИНСТРУКЦИЯ",
-                   command=self.show_instructions).grid(row=12, column=0, pady=10, sticky=tk.W)
+                   command=self.show_instructions).grid(row=13, column=0, pady=10, sticky=tk.W)
         ttk.Button(main_frame, text="Статистика сжатия",
-                   command=self.show_stats).grid(row=12, column=1, pady=10)
+                   command=self.show_stats).grid(row=13, column=1, pady=10)
 
         # Кнопка управления настройками
-        self.settings_button.grid(row=12, column=2, pady=10, sticky=tk.E)
+        self.settings_button.grid(row=13, column=2, pady=10, sticky=tk.E)
 
         # Кнопка пропуска файла
-        self.skip_button.grid(row=13, column=0, columnspan=2, pady=5)
+        self.skip_button.grid(row=14, column=0, columnspan=2, pady=5)
+
+        # Кнопка режима наблюдения
+        self.watch_button = ttk.Button(main_frame, text="👁 Наблюдать за папкой", command=self.toggle_watch_mode)
+        self.watch_button.grid(row=14, column=2, pady=5, sticky=tk.E)
 
         # Журнал операций
-        ttk.Label(main_frame, text="Журнал операций:").grid(row=14, column=0, sticky=tk.W, pady=5)
-        self.log_text.grid(row=15, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=5)
-        self.log_scrollbar.grid(row=15, column=3, sticky=(tk.N, tk.S), pady=5)
+        ttk.Label(main_frame, text="Журнал операций:").grid(row=15, column=0, sticky=tk.W, pady=5)
+        self.log_text.grid(row=16, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=5)
+        self.log_scrollbar.grid(row=16, column=3, sticky=(tk.N, tk.S), pady=5)
 
         # Статистика
         stats_frame = ttk.Frame(main_frame)
-        stats_frame.grid(row=16, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=5)
+        stats_frame.grid(row=17, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=5)
 
         ttk.Label(stats_frame, text="Обработано:").grid(row=0, column=0, padx=5)
         self.files_count_label.grid(row=0, column=1, padx=5)
@@ -710,10 +868,10 @@ class PDFCompressor:
         info_label = ttk.Label(main_frame, 
                               text="Для работы программы требуется установленный Ghostscript. Для OCR методов также нужен Tesseract.",
                               foreground="blue")
-        info_label.grid(row=17, column=0, columnspan=3, pady=5)
+        info_label.grid(row=18, column=0, columnspan=3, pady=5)
 
         # Настройка весов для растягивания
-        main_frame.rowconfigure(14, weight=1)
+        main_frame.rowconfigure(15, weight=1)
 
     def open_logs_folder(self):
         """Открывает папку с логами в проводнике"""
@@ -734,8 +892,7 @@ class PDFCompressor:
             self.add_to_log(f"Выбрана директория: {directory}")
 
     def add_to_log(self, message, level="info"):
-        """Добавляет сообщение в лог и сохраняет в файл"""
-        self.log_text.config(state=tk.NORMAL)
+        """Добавляет сообщение в лог и сохраняет в файл (можно вызывать из любого потока)"""
         timestamp = datetime.now().strftime("%H:%M:%S")
 
         if level == "warning":
@@ -752,48 +909,88 @@ class PDFCompressor:
             tag = "info"
 
         log_message = f"[{timestamp}] {prefix}{message}"
-        self.log_text.insert(tk.END, log_message + "\n", tag)
+        self.ui_bus.publish_log(log_message, tag)
 
-        self.log_text.tag_config("warning", foreground="orange")
-        self.log_text.tag_config("error", foreground="red")
-        self.log_text.tag_config("success", foreground="green")
-        self.log_text.tag_config("info", foreground="blue")
-
-        self.log_text.see(tk.END)
-        self.log_text.config(state=tk.DISABLED)
-
-        # Сохраняем в файл
-        file_message = f"[{timestamp}] {message}"
-        self.save_to_log_file(file_message)
+        # Сохраняем в файл (фоновая запись)
+        self.log_sink.write(message, level)
 
     def update_stats(self):
-        self.files_count_label.config(text=str(self.processed_files))
-        self.skipped_label.config(text=str(self.skipped_files))
-        self.failed_label.config(text=str(self.failed_files))
+        """Публикует снимок статистики; метки обновит Tk-поток (частые вызовы схлопываются)"""
+        self.ui_bus.publish_stats((self.processed_files, self.skipped_files, self.failed_files,
+                                   self.total_original_size, self.total_compressed_size))
 
-        saved = self.total_original_size - self.total_compressed_size
+    def apply_stats(self, stats):
+        processed_files, skipped_files, failed_files, total_original_size, total_compressed_size = stats
+        self.files_count_label.config(text=str(processed_files))
+        self.skipped_label.config(text=str(skipped_files))
+        self.failed_label.config(text=str(failed_files))
+
+        saved = total_original_size - total_compressed_size
         self.saved_label.config(text=f"{saved / (1024 * 1024):.2f} MB")
 
-        if self.total_original_size > 0:
-            ratio = (1 - self.total_compressed_size / self.total_original_size) * 100
+        if total_original_size > 0:
+            ratio = (1 - total_compressed_size / total_original_size) * 100
             self.ratio_label.config(text=f"{ratio:.1f}%")
 
     def create_temp_file_path(self, extension=".pdf"):
         """Создает временный файл с ASCII-именем"""
-        temp_dir = tempfile.gettempdir()
+        temp_dir = self.job_temp_dir or tempfile.gettempdir()
         temp_name = f"pdf_compress_{uuid.uuid4().hex}{extension}"
         return os.path.join(temp_dir, temp_name)
 
     def copy_network_file_to_local(self, network_path):
-        """Копирует файл из сетевой папки на локальный диск"""
+        """Копирует файл из сетевой папки на локальный диск (или берет копию, подготовленную упреждающим чтением)"""
         try:
             local_temp_path = self.create_temp_file_path()
-            shutil.copy2(network_path, local_temp_path)
+            with self.stage_timer.stage("copy"):
+                if not (self.prefetcher and self.prefetcher.take(network_path, local_temp_path)):
+                    copy_file(network_path, local_temp_path, workers=NETWORK_COPY_WORKERS)
             return local_temp_path
         except Exception as e:
             self.add_to_log(f"Ошибка копирования сетевого файла: {e}", "error")
             return None
 
+    def get_ghostscript_command(self, input_path, output_path, compression_level):
+        """Формирует командную строку Ghostscript для заданного уровня сжатия"""
+        gs_command = 'gswin64c' if os.name == 'nt' else 'gs'
+
+        if compression_level == 1:
+            settings = [
+                '-dPDFSETTINGS=/screen',
+                '-dDownsampleColorImages=true',
+                '-dColorImageResolution=72',
+                '-dGrayImageResolution=72',
+                '-dMonoImageResolution=72'
+            ]
+        elif compression_level == 2:
+            settings = [
+                '-dPDFSETTINGS=/ebook',
+                '-dDownsampleColorImages=true',
+                '-dColorImageResolution=150',
+                '-dGrayImageResolution=150',
+                '-dMonoImageResolution=150'
+            ]
+        else:
+            settings = [
+                '-dPDFSETTINGS=/prepress',
+                '-dDownsampleColorImages=true',
+                '-dColorImageResolution=300',
+                '-dGrayImageResolution=300',
+                '-dMonoImageResolution=300'
+            ]
+
+        return [
+            gs_command,
+            '-sDEVICE=pdfwrite',
+            '-dCompatibilityLevel=1.4',
+            '-dNOPAUSE',
+            '-dQUIET',
+            '-dBATCH',
+            *settings,
+            '-sOutputFile=' + output_path,
+            input_path
+        ]
+
     def compress_with_ghostscript(self, input_path, output_path, compression_level):
         """Сжатие с использованием Ghostscript - профессиональный метод"""
         temp_input = None
@@ -801,72 +998,54 @@ class PDFCompressor:
 
         try:
             # Проверяем, является ли путь сетевым
-            if input_path.startswith('\\\\') or '://' in input_path:
+            if is_network_path(input_path):
                 temp_input = self.copy_network_file_to_local(input_path)
                 if not temp_input:
                     return False
             else:
                 temp_input = self.create_temp_file_path()
-                shutil.copy2(input_path, temp_input)
+                with self.stage_timer.stage("copy"):
+                    copy_file(input_path, temp_input)
 
             temp_output = self.create_temp_file_path()
 
-            gs_command = 'gswin64c' if os.name == 'nt' else 'gs'
-
-            if compression_level == 1:
-                settings = [
-                    '-dPDFSETTINGS=/screen',
-                    '-dDownsampleColorImages=true',
-                    '-dColorImageResolution=72',
-                    '-dGrayImageResolution=72',
-                    '-dMonoImageResolution=72'
-                ]
-            elif compression_level == 2:
-                settings = [
-                    '-dPDFSETTINGS=/ebook',
-                    '-dDownsampleColorImages=true',
-                    '-dColorImageResolution=150',
-                    '-dGrayImageResolution=150',
-                    '-dMonoImageResolution=150'
-                ]
-            else:
-                settings = [
-                    '-dPDFSETTINGS=/prepress',
-                    '-dDownsampleColorImages=true',
-                    '-dColorImageResolution=300',
-                    '-dGrayImageResolution=300',
-                    '-dMonoImageResolution=300'
-                ]
-
-            command = [
-                gs_command,
-                '-sDEVICE=pdfwrite',
-                '-dCompatibilityLevel=1.4',
-                '-dNOPAUSE',
-                '-dQUIET',
-                '-dBATCH',
-                *settings,
-                '-sOutputFile=' + temp_output,
-                temp_input
-            ]
+            command = self.get_ghostscript_command(temp_input, temp_output, compression_level)
+
+            # Выход больше этого размера не даст нужной экономии - Ghostscript можно остановить сразу
+            max_output_size = os.path.getsize(temp_input) - self.min_saving_threshold.get()
 
-            result = subprocess.run(
+            result = self.process_supervisor.run(
                 command,
-                capture_output=True,
-                text=True,
-                timeout=self.file_timeout.get()
+                timeout=self.current_file_timeout,
+                output_path=temp_output,
+                max_output_size=max_output_size,
+                cancel_check=self.is_cancel_requested,
+                cpu_limit_secs=self.get_cpu_limit_secs()
             )
 
-            if result.returncode == 0:
-                shutil.copy2(temp_output, output_path)
+            if result.status == STATUS_OK:
+                copy_file(temp_output, output_path)
                 return True
+            elif result.status == STATUS_OUTPUT_LIMIT:
+                self.last_fail_reason = "размер увеличился при сжатии"
+                self.add_to_log(
+                    f"Ghostscript остановлен досрочно через {result.elapsed:.1f} сек: "
+                    f"результат уже {result.output_size / 1024:.1f} KB > допустимых {max_output_size / 1024:.1f} KB",
+                    "warning"
+                )
+                return False
+            elif result.status == STATUS_TIMEOUT:
+                self.last_fail_reason = "превышен таймаут обработки файла"
+                self.add_to_log(f"Таймаут обработки файла: {input_path}", "error")
+                return False
+            elif result.status == STATUS_CANCELLED:
+                self.add_to_log(f"Ghostscript остановлен по требованию пользователя: {os.path.basename(input_path)}",
+                                "warning")
+                return False
             else:
                 self.add_to_log(f"Ошибка Ghostscript: {result.stderr}", "error")
                 return False
 
-        except subprocess.TimeoutExpired:
-            self.add_to_log(f"Таймаут обработки файла: {input_path}", "error")
-            return False
         except Exception as e:
             self.add_to_log(f"Ошибка сжатия Ghostscript: {e}", "error")
             return False
@@ -879,8 +1058,288 @@ class PDFCompressor:
             except Exception as e:
                 self.add_to_log(f"Ошибка удаления временных файлов: {e}", "warning")
 
-    def compress_pdf(self, input_path, output_path):
-        """Основная функция сжатия PDF с поддержкой OCR"""
+    def get_page_count(self, file_path):
+        """Возвращает количество страниц PDF или None, если определить не удалось"""
+        try:
+            from PyPDF2 import PdfReader
+            with open(file_path, 'rb') as f:
+                return len(PdfReader(f).pages)
+        except Exception as e:
+            self.add_to_log(f"⚠️ Не удалось определить количество страниц: {e}", "warning")
+            return None
+
+    def run_ocr(self, process, input_path, output_path, *args):
+        """OCR-обработка (метод OCRProcessor) с таймаутом OCR текущего файла (см. get_file_timeout)"""
+        success = process(input_path, output_path, *args, timeout_secs=self.current_ocr_timeout)
+        if self.ocr_processor.timed_out:
+            self.last_fail_reason = "превышен таймаут обработки файла"
+        return success
+
+    def compress_with_lossless_cleanup(self, input_path, output_path):
+        """Очистка без потерь: пересборка PDF со сжатием потоков содержимого (PyPDF2, без Ghostscript)"""
+        try:
+            from PyPDF2 import PdfReader, PdfWriter
+        except ImportError:
+            self.add_to_log("PyPDF2 не установлен. Очистка без потерь недоступна.", "warning")
+            return False
+
+        try:
+            with open(input_path, 'rb') as f:
+                reader = PdfReader(f)
+                writer = PdfWriter()
+                for page in reader.pages:
+                    writer.add_page(page)
+                for page in writer.pages:
+                    page.compress_content_streams()
+
+                with open(output_path, 'wb') as out:
+                    writer.write(out)
+            return os.path.exists(output_path) and os.path.getsize(output_path) > 0
+        except Exception as e:
+            self.add_to_log(f"Ошибка очистки без потерь: {e}", "error")
+            return False
+
+    def get_cascade_tiers(self, input_path, num_pages=None):
+        """
+        Ступени каскада от самой дешевой к самой дорогой.
+        Возвращает список (имя ступени, функция(input_path, output_path) -> bool).
+        num_pages - число страниц, уже подсчитанное при обработке файла (None - подсчитать)
+        """
+        tiers = [
+            ("lossless", self.compress_with_lossless_cleanup),
+            ("gs-2", lambda src, dst: self.compress_with_ghostscript(src, dst, 2)),
+            ("gs-1", lambda src, dst: self.compress_with_ghostscript(src, dst, 1)),
+        ]
+
+        # OCR+GS - самая дорогая ступень: только если OCR доступен и страниц не больше лимита
+        if self.ocr_available and self.ocr_processor:
+            if not num_pages:  # 0 - страницы не удалось подсчитать при проверке OCR-лимита
+                num_pages = self.get_page_count(input_path)
+            max_pages = self.ocr_max_pages.get()
+            if num_pages is not None and num_pages <= max_pages:
+                tiers.append((
+                    "ocr-gs",
+                    lambda src, dst: self.run_ocr(self.ocr_processor.process_with_tesseract_and_ghostscript, src, dst, 1)
+                ))
+            else:
+                self.add_to_log(f"Каскад: ступень OCR+GS пропущена (страниц: {num_pages}, лимит: {max_pages})")
+
+        return tiers
+
+    def compress_with_cascade(self, input_path, output_path, num_pages=None):
+        """
+        Каскадное сжатие: ступени запускаются от дешевой к дорогой, каскад останавливается
+        на первой ступени, экономия которой достигла порога compression_min_boundary.
+        В output_path записывается лучший результат, имя ступени - в self.last_compression_tier.
+        """
+        original_size = os.path.getsize(input_path)
+        min_saving = self.min_saving_threshold.get()
+
+        best_path = None
+        best_saving = None
+        best_tier = None
+
+        try:
+            for tier_name, run_tier in self.get_cascade_tiers(input_path, num_pages):
+                if self.stop_current_file:
+                    break
+
+                tier_output = self.create_temp_file_path()
+                try:
+                    tier_ok = run_tier(input_path, tier_output)
+                except MemoryError:
+                    self.add_to_log(f"❌ Каскад [{tier_name}]: недостаточно памяти", "error")
+                    tier_ok = False
+                except Exception as e:
+                    self.add_to_log(f"Каскад [{tier_name}]: ошибка {e}", "error")
+                    tier_ok = False
+
+                if not tier_ok or not os.path.exists(tier_output):
+                    if os.path.exists(tier_output):
+                        os.remove(tier_output)
+                    continue
+
+                saving = original_size - os.path.getsize(tier_output)
+                self.add_to_log(f"Каскад [{tier_name}]: экономия {saving / 1024:.2f} KB (порог {min_saving} Б)")
+
+                if best_saving is None or saving > best_saving:
+                    if best_path and os.path.exists(best_path):
+                        os.remove(best_path)
+                    best_path, best_saving, best_tier = tier_output, saving, tier_name
+                else:
+                    os.remove(tier_output)
+
+                if saving >= min_saving:
+                    break
+
+            if best_path is None:
+                return False
+
+            shutil.move(best_path, output_path)
+            best_path = None
+            self.last_compression_tier = best_tier
+            return True
+
+        finally:
+            if best_path and os.path.exists(best_path):
+                try:
+                    os.remove(best_path)
+                except Exception as e:
+                    self.add_to_log(f"Ошибка удаления временных файлов: {e}", "warning")
+
+    def is_valid_pdf_output(self, path):
+        """Проверяет, что результат сжатия существует, не пуст и начинается с заголовка PDF"""
+        try:
+            if not os.path.exists(path) or os.path.getsize(path) == 0:
+                return False
+            with open(path, 'rb') as f:
+                return f.read(5) == b'%PDF-'
+        except OSError:
+            return False
+
+    def compress_with_race(self, input_path, output_path):
+        """
+        Гонка стратегий: уровни Ghostscript из настройки (race_levels) запускаются одновременно
+        на одной локальной копии файла в пределах общего бюджета времени (таймаут файла).
+        Побеждает самый маленький корректный результат. Участник снимается, как только
+        его растущий выходной файл стал не меньше лучшего готового результата или уже
+        не дает нужной экономии. Когда уровень с наименьшим разрешением завершился с нужной
+        экономией, остальные снимаются сразу: более высокое разрешение почти никогда не дает
+        файл меньше. Файлы меньше RACE_MIN_SIZE_MB сжимаются обычным путем.
+        """
+        original_size = os.path.getsize(input_path)
+        level = self.compression_level.get()
+        if original_size < RACE_MIN_SIZE_MB * 1024 * 1024:
+            self.add_to_log(f"Гонка: файл меньше {RACE_MIN_SIZE_MB} МБ, обычное сжатие ур.{level}")
+            self.last_compression_tier = f"gs-{level}"
+            return self.compress_with_ghostscript(input_path, output_path, level)
+
+        temp_input = None
+        racers = []  # (уровень, SupervisedProcess)
+        admitted_racers = 0  # участники, допущенные сверх файла по памяти
+        racer_memory_mb = 0
+        best_level = None
+        best_path = None
+        best_size = None
+
+        try:
+            if is_network_path(input_path):
+                temp_input = self.copy_network_file_to_local(input_path)
+                if not temp_input:
+                    return False
+            else:
+                temp_input = self.create_temp_file_path()
+                with self.stage_timer.stage("copy"):
+                    copy_file(input_path, temp_input)
+
+            # Результат больше этого размера не даст нужной экономии
+            max_output_size = original_size - self.min_saving_threshold.get()
+            racer_memory_mb = estimate_gs_memory_mb(original_size)
+            race_levels = self.get_race_levels()
+            for race_level in race_levels:
+                # Память первого участника учтена при допуске файла, остальным нужна свободная доля бюджета
+                if racers:
+                    if not self.memory_admission.try_acquire(racer_memory_mb):
+                        self.add_to_log(f"Гонка: ур.{race_level} не запущен - не хватает памяти", "warning")
+                        continue
+                    admitted_racers += 1
+                race_output = self.create_temp_file_path()
+                command = self.get_ghostscript_command(temp_input, race_output, race_level)
+                racers.append((race_level, self.process_supervisor.start(
+                    command,
+                    output_path=race_output,
+                    max_output_size=max_output_size,
+                    cpu_limit_secs=self.get_cpu_limit_secs()
+                )))
+
+            self.add_to_log(f"Гонка: запущено {len(racers)} стратегий (уровни {', '.join(str(lvl) for lvl, _ in racers)})")
+            deadline = time.time() + self.current_file_timeout
+            lowest_level = racers[0][0]  # уровни запускаются по возрастанию, первый допущен всегда
+            lowest_finished = False
+
+            while racers and not lowest_finished:
+                if self.stop_current_file:
+                    self.add_to_log("Гонка прервана пользователем", "warning")
+                    break
+                if time.time() > deadline:
+                    self.last_fail_reason = "превышен таймаут обработки файла"
+                    self.add_to_log(f"Гонка: исчерпан бюджет времени {self.current_file_timeout} сек", "warning")
+                    break
+
+                for racer in list(racers):
+                    race_level, supervised = racer
+                    result = supervised.check()
+                    if result is None:
+                        continue
+
+                    racers.remove(racer)
+                    race_output = supervised.output_path
+                    if result.status == STATUS_OUTPUT_LIMIT:
+                        # Выходной файл только растет - участник уже не может победить
+                        if best_size is None:
+                            self.last_fail_reason = "размер увеличился при сжатии"
+                        self.add_to_log(f"Гонка: ур.{race_level} снят - результат не может быть меньше лучшего")
+                    elif result.status == STATUS_TIMEOUT:
+                        # Лимит процессорного времени - тот же таймаут обработки файла
+                        if best_size is None:
+                            self.last_fail_reason = "превышен таймаут обработки файла"
+                        self.add_to_log(f"Гонка: ур.{race_level} снят по лимиту процессорного времени", "warning")
+                    elif result.status != STATUS_OK or not self.is_valid_pdf_output(race_output):
+                        self.add_to_log(f"Гонка: ур.{race_level} завершился с ошибкой (код {result.returncode})", "warning")
+                    else:
+                        race_size = os.path.getsize(race_output)
+                        self.add_to_log(f"Гонка: ур.{race_level} готов, размер {race_size / 1024:.1f} KB")
+                        if best_size is None or race_size < best_size:
+                            if best_path and os.path.exists(best_path):
+                                os.remove(best_path)
+                            best_level, best_path, best_size = race_level, race_output, race_size
+                            # Остальным участникам достаточно стать не меньше лучшего, чтобы проиграть
+                            for _, other in racers:
+                                other.max_output_size = min(other.max_output_size, best_size - 1)
+                        # Наименьшее разрешение дало нужную экономию - остальные уровни снимаются (в finally)
+                        lowest_finished = race_level == lowest_level and race_size <= max_output_size
+                        if lowest_finished and racers:
+                            self.add_to_log(f"Гонка: ур.{race_level} дал нужную экономию, сняты уровни "
+                                            f"{', '.join(str(lvl) for lvl, _ in racers)}")
+                        if best_path == race_output:
+                            if lowest_finished:
+                                break
+                            continue
+
+                    if os.path.exists(race_output):
+                        os.remove(race_output)
+                    if lowest_finished:
+                        break
+
+                if racers and not lowest_finished:
+                    time.sleep(RACE_POLL_INTERVAL_SECS)
+
+            if best_path is None:
+                return False
+
+            shutil.move(best_path, output_path)
+            best_path = None
+            self.last_compression_tier = f"race:gs-{best_level}"
+            self.add_to_log(f"Гонка: победил ур.{best_level} ({best_size / 1024:.1f} KB)")
+            return True
+
+        finally:
+            # Останавливаем проигравших и убираем временные файлы
+            for race_level, supervised in racers:
+                supervised.kill()
+            for _ in range(admitted_racers):
+                self.memory_admission.release(racer_memory_mb)
+            try:
+                for path in [temp_input, best_path] + [supervised.output_path for _, supervised in racers]:
+                    if path and os.path.exists(path):
+                        os.remove(path)
+            except Exception as e:
+                self.add_to_log(f"Ошибка удаления временных файлов: {e}", "warning")
+
+    def compress_pdf(self, input_path, output_path, num_pages=None):
+        """Основная функция сжатия PDF с поддержкой OCR (num_pages - уже подсчитанное число страниц)"""
+        self.last_compression_tier = None
+        self.last_fail_reason = None
         try:
             original_size = os.path.getsize(input_path)
             
@@ -899,9 +1358,11 @@ class PDFCompressor:
                     self.add_to_log("OCR недоступен. Установите Tesseract и зависимости.", "error")
                     return False, 0
                     
+                self.last_compression_tier = "ocr"
                 try:
-                    success = self.ocr_processor.process_with_tesseract(input_path, output_path)
+                    success = self.run_ocr(self.ocr_processor.process_with_tesseract, input_path, output_path)
                 except MemoryError as e:
+                    self.last_fail_reason = "недостаточно памяти для обработки"
                     self.add_to_log(f"❌ Недостаточно памяти для обработки {os.path.basename(input_path)}. Файл пропущен.", "error")
                     return False, 0
                 except Exception as e:
@@ -913,13 +1374,16 @@ class PDFCompressor:
                     self.add_to_log("OCR недоступен. Установите Tesseract и зависимости.", "error")
                     return False, 0
                     
+                self.last_compression_tier = f"ocr-gs-{self.compression_level.get()}"
                 try:
-                    success = self.ocr_processor.process_with_tesseract_and_ghostscript(
+                    success = self.run_ocr(
+                        self.ocr_processor.process_with_tesseract_and_ghostscript,
                         input_path, 
                         output_path,
                         self.compression_level.get()
                     )
                 except MemoryError as e:
+                    self.last_fail_reason = "недостаточно памяти для обработки"
                     self.add_to_log(f"❌ Недостаточно памяти для обработки {os.path.basename(input_path)}. Файл пропущен.", "error")
                     return False, 0
                 except Exception as e:
@@ -927,14 +1391,34 @@ class PDFCompressor:
                     return False, 0
                 
             elif method_id in [1, 2, 3]:  # Стандартные методы Ghostscript
+                self.last_compression_tier = f"gs-{self.compression_level.get()}"
                 try:
                     success = self.compress_with_ghostscript(input_path, output_path, self.compression_level.get())
                 except MemoryError as e:
+                    self.last_fail_reason = "недостаточно памяти для обработки"
                     self.add_to_log(f"❌ Недостаточно памяти для обработки {os.path.basename(input_path)}. Файл пропущен.", "error")
                     return False, 0
                 except Exception as e:
                     self.add_to_log(f"Ошибка сжатия Ghostscript: {e}", "error")
                     return False, 0
+
+            elif method_id == 6:  # Каскад: от дешевой ступени к дорогой
+                try:
+                    success = self.compress_with_cascade(input_path, output_path, num_pages)
+                except Exception as e:
+                    self.add_to_log(f"Ошибка каскадного сжатия: {e}", "error")
+                    return False, 0
+
+            elif method_id == 7:  # Гонка стратегий: параллельные уровни Ghostscript
+                try:
+                    success = self.compress_with_race(input_path, output_path)
+                except MemoryError as e:
+                    self.last_fail_reason = "недостаточно памяти для обработки"
+                    self.add_to_log(f"❌ Недостаточно памяти для обработки {os.path.basename(input_path)}. Файл пропущен.", "error")
+                    return False, 0
+                except Exception as e:
+                    self.add_to_log(f"Ошибка гонки стратегий: {e}", "error")
+                    return False, 0
                 
             else:
                 self.add_to_log(f"Неизвестный метод сжатия: {method_id}", "error")
@@ -1021,18 +1505,103 @@ class PDFCompressor:
 
     # compressor_app.py - фрагмент метода process_single_file
 
+    def get_method_engine(self, method_id):
+        """Группа движка для модели таймаута по методу сжатия"""
+        if method_id == 4:
+            return "ocr"
+        if method_id == 5:
+            return "ocr-gs"
+        return "gs"
+
+    def train_timeout_model(self):
+        """Обучает модель адаптивного таймаута по истории обработки из БД"""
+        self.timeout_model = None
+        if not self.adaptive_timeout.get():
+            return
+        try:
+            history = self.db_ops.get_timing_history()
+            self.timeout_model = AdaptiveTimeoutModel(self.file_timeout.get()).fit(history)
+            for engine, samples in self.timeout_model.samples.items():
+                self.add_to_log(
+                    f"Модель таймаута [{engine}]: {samples} записей, "
+                    f"{self.timeout_model.secs_per_mb.get(engine, 0):.2f} сек/МБ, "
+                    f"{self.timeout_model.secs_per_page.get(engine, 0):.2f} сек/стр"
+                )
+        except Exception as e:
+            self.add_to_log(f"⚠️ Не удалось построить модель таймаута: {e}", "warning")
+            try:
+                self.db.rollback()
+            except:
+                pass
+
+    def get_file_timeout(self, file_size_bytes, num_pages):
+        """
+        Таймаут для файла: по модели из истории или фиксированный из настроек. Фиксированный
+        таймаут рассчитан на Ghostscript, поэтому OCR (методы OCR и ступень OCR+GS каскада)
+        ограничивается только моделью, обученной по истории OCR; иначе OCR идет без таймаута.
+        Таймаут OCR - в self.current_ocr_timeout (None - без таймаута)
+        """
+        selected_method = self.method_combo.get()
+        method_id = int(selected_method.split(':')[0]) if selected_method else 1
+        engine = self.get_method_engine(method_id)
+        model = self.timeout_model if self.adaptive_timeout.get() else None
+        size_mb = file_size_bytes / (1024 * 1024)
+
+        ocr_engine = "ocr-gs" if method_id == 6 else (engine if engine != "gs" else None)
+        self.current_ocr_timeout = None
+        if model is not None and ocr_engine and model.is_trained(ocr_engine):
+            self.current_ocr_timeout = model.timeout_for(ocr_engine, size_mb, num_pages)
+        if engine != "gs":
+            if self.current_ocr_timeout:
+                self.add_to_log(f"⏱️ Таймаут файла: {self.current_ocr_timeout} сек ({engine}, "
+                                f"страниц: {num_pages or 'н/д'})")
+            return self.current_ocr_timeout
+
+        if model is None:
+            return self.file_timeout.get()
+        timeout = model.timeout_for(engine, size_mb, num_pages)
+        self.add_to_log(f"⏱️ Таймаут файла: {timeout} сек ({engine}, страниц: {num_pages or 'н/д'})")
+        return timeout
+
+    def get_cpu_limit_secs(self):
+        """
+        Лимит процессорного времени внешнего процесса, сек (None - без лимита). CPU-время
+        многопоточного процесса растет быстрее настенного, поэтому лимит берется с запасом
+        над таймаутом файла - иначе SIGXCPU оборвет процесс раньше таймаута
+        """
+        if not self.current_file_timeout or not CPU_LIMIT_TIMEOUT_FACTOR:
+            return None
+        return self.current_file_timeout * CPU_LIMIT_TIMEOUT_FACTOR * (os.cpu_count() or 1)
+
+    def estimate_job_memory_mb(self, method_id, file_size_bytes, num_pages):
+        """Оценка пиковой памяти задания сжатия, МБ"""
+        gs_estimate = estimate_gs_memory_mb(file_size_bytes, num_pages)
+        # pdftoppm пишет страницы на диск, и Tesseract держит в памяти одну; pdf2image - все сразу
+        pages_in_memory = 1 if self.ocr_processor and self.ocr_processor.pdftoppm_path else None
+        ocr_estimate = estimate_ocr_memory_mb(num_pages, OCR_DEFAULT_DPI, pages_in_memory)
+
+        if method_id == 4:
+            return ocr_estimate
+        if method_id == 5:
+            return max(ocr_estimate, gs_estimate)
+        if method_id == 6 and self.ocr_available and num_pages and num_pages <= self.ocr_max_pages.get():
+            return max(ocr_estimate, gs_estimate)  # каскад может дойти до ступени OCR+GS
+        return gs_estimate
+
     def process_single_file(self, file_path):
         """Обрабатывает один файл"""
         self.current_file_path = file_path
         self.currently_processing = True
-        self.stop_current_file = False
+        self.stop_current_file = self.closing  # при закрытии окна новые файлы не начинаются
         self.processing_start_time = time.time()
+        self.stage_timer.reset()
         
         # Инициализируем переменные
         file_size_bytes = 0
         file_size_kbytes = 0
         num_pages = None
         avg_page_size = None
+        deferred_outcome = None  # итог файла, замена которого выполняется в фоне
 
         try:
             # ===== ЗАЩИТА: проверяем доступность файла =====
@@ -1109,6 +1678,8 @@ class PDFCompressor:
                 self.update_stats()
                 return
 
+            self.stage_timer.lap("stat")
+
             # Проверяем, не обрабатывался ли файл ранее
             try:
                 processed_file = self.db_ops.get_processed_file_by_path(file_path)
@@ -1125,6 +1696,8 @@ class PDFCompressor:
                 except:
                     pass
                 # Продолжаем обработку, если не можем проверить дубликат
+            self.stage_timer.lap("db_lookup")
+            self.stage_timer.recordable = True
 
             # Проверяем минимальный размер файла (1 МБ)
             min_size_bytes = 1024 * 1024
@@ -1167,6 +1740,9 @@ class PDFCompressor:
             # ===== ПРОВЕРКА 1: ЛИМИТ РАЗМЕРА СТРАНИЦЫ =====
             try:
                 page_check_ok, num_pages, file_size_kbytes, avg_page_size = self.check_page_size_limit(file_path)
+                if file_size_kbytes is None:
+                    # При отключенном лимите проверка не возвращает размер - он нужен для истории и таймаута
+                    file_size_kbytes = file_size_bytes / 1024.0
                 if not page_check_ok:
                     self.skipped_files += 1
                     
@@ -1271,7 +1847,7 @@ class PDFCompressor:
             # Создаем временный файл для результата...
             temp_output = None
             try:
-                temp_dir = tempfile.gettempdir()
+                temp_dir = self.job_temp_dir or tempfile.gettempdir()
                 temp_output = os.path.join(temp_dir, f"temp_compress_{uuid.uuid4().hex}.pdf")
             except Exception as e:
                 self.failed_files += 1
@@ -1305,16 +1881,57 @@ class PDFCompressor:
                 self.update_stats()
                 return
 
+            self.stage_timer.lap("page_count")
+
+            # Таймаут файла: фиксированный или по модели из истории обработки
+            if self.adaptive_timeout.get() and num_pages is None:
+                num_pages = self.get_page_count(file_path)
+            self.current_file_timeout = self.get_file_timeout(file_size_bytes, num_pages)
+
+            # Чтение файла с хранилища учитывается в ограничении нагрузки и бюджете чтения
+            self.io_throttle.account_bytes(file_size_bytes, self.is_cancel_requested)
+            if self.run_budget:
+                self.run_budget.account_read(file_size_bytes)
+
+            # Допуск по памяти: задание ждет, пока его оценка поместится в бюджет
+            selected_method = self.method_combo.get()
+            method_id = int(selected_method.split(':')[0]) if selected_method else 1
+            if method_id in (4, 5, 6) and num_pages is None:
+                num_pages = self.get_page_count(file_path)
+            memory_estimate = self.estimate_job_memory_mb(method_id, file_size_bytes, num_pages)
+            admitted = self.memory_admission.acquire(memory_estimate, cancel_check=self.is_cancel_requested)
+
             # Сжимаем файл...
-            try:
-                self.add_to_log(f"🔄 Обработка: {os.path.basename(file_path)}")
-                success, saving = self.compress_pdf(file_path, temp_output)
-            except Exception as e:
+            self.stage_timer.lap("admission")
+            compress_start_time = time.time()
+            if not admitted:
+                # Недопуск по памяти не записывается в БД: файл будет обработан при следующем запуске
                 self.failed_files += 1
-                self.add_to_log(f"❌ Критическая ошибка при сжатии {os.path.basename(file_path)}: {e}", "error")
-                self.add_to_log(traceback.format_exc(), "error")
-                success = False
-                saving = 0
+                if not self.stop_current_file:
+                    self.add_to_log(
+                        f"⚠️ Недостаточно памяти: оценка {memory_estimate:.0f} МБ, бюджет "
+                        f"{self.memory_admission.budget_mb} МБ. Файл отложен до следующего запуска: "
+                        f"{os.path.basename(file_path)}", "warning")
+                try:
+                    if temp_output and os.path.exists(temp_output):
+                        os.remove(temp_output)
+                except:
+                    pass
+                return
+            else:
+                try:
+                    self.add_to_log(f"🔄 Обработка: {os.path.basename(file_path)}")
+                    success, saving = self.compress_pdf(file_path, temp_output, num_pages)
+                except Exception as e:
+                    self.failed_files += 1
+                    self.add_to_log(f"❌ Критическая ошибка при сжатии {os.path.basename(file_path)}: {e}", "error")
+                    self.add_to_log(traceback.format_exc(), "error")
+                    success = False
+                    saving = 0
+                finally:
+                    self.memory_admission.release(memory_estimate)
+            processing_seconds = time.time() - compress_start_time
+            self.stage_timer.lap("compress")
 
             if self.stop_current_file:
                 self.add_to_log(f"⏹️ Обработка прервана пользователем: {os.path.basename(file_path)}", "warning")
@@ -1326,87 +1943,32 @@ class PDFCompressor:
                 return
 
             if success:
+                outcome = dict(saving=saving, num_pages=num_pages, file_size_kbytes=file_size_kbytes,
+                               processing_seconds=processing_seconds, compression_tier=self.last_compression_tier,
+                               timeout_secs=self.current_file_timeout)
                 # Заменяем исходный файл...
                 if self.replace_original.get():
-                    backup_path = None
+                    # Резервная копия и результат пишутся на хранилище
+                    self.io_throttle.account_bytes(
+                        file_size_bytes + os.path.getsize(temp_output), self.is_cancel_requested)
+                    if self.write_back:
+                        # Замена в фоновом потоке; запись в БД - по ее итогу (finish_write_backs)
+                        self.write_back.submit(temp_output, file_path, (self.current_run_file, outcome))
+                        self.write_back_deferred = True
+                        self.stage_timer.lap("replace")
+                        deferred_outcome = outcome
+                        return
                     try:
-                        backup_path = file_path + '.backup'
-                        shutil.copy2(file_path, backup_path)
-                        shutil.move(temp_output, file_path)
-                        if os.path.exists(backup_path):
-                            os.remove(backup_path)
+                        WriteBackQueue.replace_file(temp_output, file_path)
                     except Exception as e:
                         self.add_to_log(f"⚠️ Ошибка замены файла: {e}", "error")
-                        if backup_path and os.path.exists(backup_path):
-                            try:
-                                shutil.move(backup_path, file_path)
-                            except:
-                                pass
                         success = False
+                    self.stage_timer.lap("replace")
 
                 if success:
-                    # Обновляем статистику
-                    self.processed_files += 1
-                    try:
-                        self.total_original_size += os.path.getsize(file_path) + saving
-                        self.total_compressed_size += os.path.getsize(file_path)
-                    except:
-                        pass
-
-                    # Сохраняем в БД
-                    try:
-                        existing = self.db_ops.get_processed_file_by_path(file_path)
-                        if not existing:
-                            selected_method = self.method_combo.get()
-                            method_id = int(selected_method.split(':')[0]) if selected_method else 1
-                            
-                            active_setting = self.db_ops.get_active_setting()
-                            setting_id = active_setting.id if active_setting else 1
-
-                            self.db_ops.create_processed_file(
-                                file_full_path=file_path,
-                                is_successful=True,
-                                setting_id=setting_id,
-                                file_compression_kbites=saving / 1024,
-                                file_pages=num_pages,
-                                file_origin_size_kbytes=file_size_kbytes
-                            )
-                    except Exception as e:
-                        self.add_to_log(f"⚠️ Ошибка сохранения в БД: {e}", "warning")
-                        try:
-                            self.db.rollback()
-                        except:
-                            pass
-
-                    self.add_to_log(f"✅ Успешно сжат: {os.path.basename(file_path)} (экономия: {saving / 1024:.2f} KB)",
-                                    "success")
+                    self.record_compressed_file(file_path, **outcome)
                 else:
-                    self.failed_files += 1
-                    self.add_to_log(f"❌ Не удалось сжать: {os.path.basename(file_path)}", "error")
-                    
-                    # Сохраняем в БД
-                    try:
-                        existing = self.db_ops.get_processed_file_by_path(file_path)
-                        if not existing:
-                            active_setting = self.db_ops.get_active_setting()
-                            setting_id = active_setting.id if active_setting else 1
-                            
-                            self.db_ops.create_processed_file(
-                                file_full_path=file_path,
-                                is_successful=False,
-                                setting_id=setting_id,
-                                file_compression_kbites=0.0,
-                                fail_reason_id=None,
-                                other_fail_reason="Ошибка сжатия",
-                                file_pages=num_pages,
-                                file_origin_size_kbytes=file_size_kbytes
-                            )
-                    except Exception as e:
-                        self.add_to_log(f"⚠️ Ошибка сохранения в БД: {e}", "warning")
-                        try:
-                            self.db.rollback()
-                        except:
-                            pass
+                    self.record_replace_failure(file_path, **outcome)
 
             else:
                 self.failed_files += 1
@@ -1416,11 +1978,12 @@ class PDFCompressor:
                 other_fail_reason = None
 
                 try:
-                    if saving > 0 and saving < self.min_saving_threshold.get():
+                    if self.last_fail_reason:
+                        fail_reason = self.db_ops.get_fail_reason_by_name(self.last_fail_reason)
+                    elif saving > 0 and saving < self.min_saving_threshold.get():
                         fail_reason = self.db_ops.get_fail_reason_by_name("размер увеличился при сжатии")
-                    elif time.time() - self.processing_start_time > self.file_timeout.get():
-                        fail_reason = self.db_ops.get_fail_reason_by_name("превышен таймаут обработки файла")
                     else:
+                        # Таймаут отмечают сами движки (Ghostscript, гонка, OCR) в last_fail_reason
                         fail_reason = self.db_ops.get_fail_reason_by_name("прочая причина")
                         other_fail_reason = traceback.format_exc()
                 except:
@@ -1441,7 +2004,10 @@ class PDFCompressor:
                             fail_reason_id=fail_reason.id if fail_reason else None,
                             other_fail_reason=other_fail_reason,
                             file_pages=num_pages,
-                            file_origin_size_kbytes=file_size_kbytes
+                            file_origin_size_kbytes=file_size_kbytes,
+                            compression_tier=self.last_compression_tier,
+                            processing_seconds=processing_seconds,
+                            timeout_secs=self.current_file_timeout
                         )
                 except Exception as e:
                     self.add_to_log(f"⚠️ Ошибка сохранения в БД: {e}", "warning")
@@ -1452,6 +2018,8 @@ class PDFCompressor:
 
                 self.add_to_log(f"❌ Не удалось сжать: {os.path.basename(file_path)}", "error")
 
+            self.stage_timer.lap("db_write")
+
             # Удаляем временный файл
             try:
                 if temp_output and os.path.exists(temp_output):
@@ -1501,47 +2069,201 @@ class PDFCompressor:
             self.currently_processing = False
             self.current_file_path = None
             self.update_stats()
+            if self.stage_timer.enabled and self.stage_timer.recordable:
+                if deferred_outcome is not None:
+                    # Записи файла еще нет - замер сохранится вместе с ней
+                    deferred_outcome["timings"] = self.stage_timer.as_record()
+                else:
+                    self.save_stage_timings(file_path)
 
+    def record_compressed_file(self, file_path, saving, num_pages, file_size_kbytes, processing_seconds,
+                               compression_tier, timeout_secs, timings=None):
+        """Учитывает успешно сжатый файл: статистика, запись в БД, журнал"""
+        # Обновляем статистику
+        self.processed_files += 1
+        try:
+            self.total_original_size += os.path.getsize(file_path) + saving
+            self.total_compressed_size += os.path.getsize(file_path)
+        except:
+            pass
 
-    def find_pdf_files(self, directory, depth):
-        """Находит PDF файлы в директории с учетом глубины вложенности"""
-        pdf_files = []
-        current_depth = 0
+        # Сохраняем в БД
+        try:
+            existing = self.db_ops.get_processed_file_by_path(file_path)
+            if not existing:
+                active_setting = self.db_ops.get_active_setting()
+                setting_id = active_setting.id if active_setting else 1
+
+                self.db_ops.create_processed_file(
+                    file_full_path=file_path,
+                    is_successful=True,
+                    setting_id=setting_id,
+                    file_compression_kbites=saving / 1024,
+                    file_pages=num_pages,
+                    file_origin_size_kbytes=file_size_kbytes,
+                    compression_tier=compression_tier,
+                    processing_seconds=processing_seconds,
+                    timeout_secs=timeout_secs
+                )
+        except Exception as e:
+            self.add_to_log(f"⚠️ Ошибка сохранения в БД: {e}", "warning")
+            try:
+                self.db.rollback()
+            except:
+                pass
 
-        for root, dirs, files in os.walk(directory):
-            # Вычисляем текущую глубину
-            current_depth = root[len(directory):].count(os.sep)
+        self.add_to_log(f"✅ Успешно сжат: {os.path.basename(file_path)} (экономия: {saving / 1024:.2f} KB)",
+                        "success")
 
-            # Проверяем глубину в соответствии с настройками
-            if depth == 1 and current_depth > 0:  # Только текущая
-                continue
-            elif depth == 2 and current_depth > 1:  # 1 уровень
-                continue
-            elif depth == 3 and current_depth > 2:  # 2 уровня
-                continue
-            # depth == 4: все поддиректории - не ограничиваем
+    def record_replace_failure(self, file_path, saving, num_pages, file_size_kbytes, processing_seconds,
+                               compression_tier, timeout_secs, timings=None):
+        """Учитывает файл, который сжался, но не был заменен на хранилище"""
+        self.failed_files += 1
+        self.add_to_log(f"❌ Не удалось сжать: {os.path.basename(file_path)}", "error")
+
+        # Сохраняем в БД
+        try:
+            existing = self.db_ops.get_processed_file_by_path(file_path)
+            if not existing:
+                active_setting = self.db_ops.get_active_setting()
+                setting_id = active_setting.id if active_setting else 1
+
+                self.db_ops.create_processed_file(
+                    file_full_path=file_path,
+                    is_successful=False,
+                    setting_id=setting_id,
+                    file_compression_kbites=0.0,
+                    fail_reason_id=None,
+                    other_fail_reason="Ошибка сжатия",
+                    file_pages=num_pages,
+                    file_origin_size_kbytes=file_size_kbytes,
+                    compression_tier=compression_tier,
+                    processing_seconds=processing_seconds,
+                    timeout_secs=timeout_secs
+                )
+        except Exception as e:
+            self.add_to_log(f"⚠️ Ошибка сохранения в БД: {e}", "warning")
+            try:
+                self.db.rollback()
+            except:
+                pass
+
+    def finish_write_backs(self, results):
+        """
+        Учитывает завершенные фоновые замены (file_path, (RunFile задания, итог файла), ошибка)
+        в потоке обработки; файл очереди запуска отмечается завершенным только здесь
+        """
+        for file_path, (run_file, outcome), error in results:
+            if error is None:
+                self.record_compressed_file(file_path, **outcome)
+            else:
+                self.add_to_log(f"⚠️ Ошибка замены файла: {error}", "error")
+                self.record_replace_failure(file_path, **outcome)
+            if outcome.get("timings"):
+                try:
+                    processed_file = self.db_ops.get_processed_file_by_path(file_path)
+                    if processed_file:
+                        self.db_ops.create_file_timing(processed_file.id, **outcome["timings"])
+                except Exception as e:
+                    self.add_to_log(f"⚠️ Ошибка сохранения замера этапов: {e}", "warning")
+                    try:
+                        self.db.rollback()
+                    except:
+                        pass
+            if run_file is not None:
+                self.db_ops.mark_run_file_finished(run_file, error is None)
+        if results:
+            self.update_stats()
 
-            for file in files:
-                if file.lower().endswith('.pdf'):
-                    pdf_files.append(os.path.join(root, file))
+    def save_stage_timings(self, file_path):
+        """Сохраняет замер этапов, связав его с записью файла в processed_files"""
+        try:
+            processed_file = self.db_ops.get_processed_file_by_path(file_path)
+            if processed_file:
+                self.db_ops.create_file_timing(processed_file.id, **self.stage_timer.as_record())
+        except Exception as e:
+            self.add_to_log(f"⚠️ Ошибка сохранения замера этапов: {e}", "warning")
+            try:
+                self.db.rollback()
+            except:
+                pass
 
+
+    def find_pdf_files(self, directory, depth):
+        """
+        Находит PDF файлы в директории с учетом глубины вложенности.
+        Неизменившиеся директории, все файлы которых уже есть в БД, не листаются (directory_snapshot)
+        """
+        self.directory_index = DirectoryIndex(self.db_ops, collect_sizes=PRIORITY_SCHEDULING)
+        pdf_files = self.directory_index.scan(directory, depth)
+        if self.directory_index.reused_dirs:
+            self.add_to_log(
+                f"Инкрементальное сканирование: пропущено неизменившихся папок - {self.directory_index.reused_dirs}, "
+                f"просмотрено - {len(self.directory_index.listed)}")
         return pdf_files
 
-    def start_compression(self):
-        """Запускает процесс сжатия в отдельном потоке"""
+    def prioritize_files(self, pdf_files):
+        """Упорядочивает найденные файлы по ожидаемой экономии на секунду обработки (priority_scheduler)"""
+        if not PRIORITY_SCHEDULING or len(pdf_files) < 2:
+            return pdf_files
+        try:
+            model = SavingsPriorityModel().fit(self.db_ops.get_directory_saving_history(),
+                                               self.db_ops.get_density_saving_samples())
+            sizes = file_sizes(pdf_files, self.directory_index.file_sizes if self.directory_index else None)
+            ordered, savings = model.order(pdf_files, self.db_ops.normalize_paths(pdf_files), sizes)
+        except Exception as e:
+            self.add_to_log(f"⚠️ Не удалось упорядочить очередь по экономии: {e}", "warning")
+            try:
+                self.db.rollback()
+            except:
+                pass
+            return pdf_files
+
+        total_saving = sum(savings)
+        if total_saving > 0:
+            head = max(1, len(ordered) // 10)
+            self.add_to_log(
+                f"Очередь упорядочена по экономии: первые {head} файл(ов) - "
+                f"{sum(savings[:head]) / total_saving:.0%} ожидаемой экономии ({total_saving:.0f} МБ)")
+        return ordered
+
+    def get_race_levels(self):
+        """Уровни гонки стратегий из настройки по возрастанию (ValueError при неверном значении)"""
+        levels = sorted({int(part) for part in self.race_levels.get().replace(' ', '').split(',') if part})
+        if not levels or any(lvl not in (1, 2, 3) for lvl in levels):
+            raise ValueError(self.race_levels.get())
+        return tuple(levels)
+
+    def settings_error(self):
+        """Сообщение об ошибке в окне обработки или уровнях гонки, или None"""
+        try:
+            start = parse_clock(self.run_window_start.get())
+            end = parse_clock(self.run_window_end.get())
+        except ValueError:
+            return "Окно обработки задается временем ЧЧ:ММ, например 22:00 - 06:00"
+        if (start is None) != (end is None):
+            return "Укажите и начало, и конец окна обработки (или оставьте оба пустыми)"
+        try:
+            self.get_race_levels()
+        except ValueError:
+            return "Уровни гонки задаются через запятую из 1, 2, 3, например 1,2"
+        return None
+
+    def can_start_processing(self):
+        """Проверяет директорию и метод перед запуском обработки или наблюдения"""
         if not self.directory_path.get():
             messagebox.showerror("Ошибка", "Выберите директорию для обработки")
-            return
+            return False
 
         if not os.path.exists(self.directory_path.get()):
             messagebox.showerror("Ошибка", "Указанная директория не существует")
-            return
+            return False
 
         # Проверяем выбранный метод
         selected_method = self.method_combo.get()
         if not selected_method:
             messagebox.showerror("Ошибка", "Выберите метод сжатия")
-            return
+            return False
             
         method_id = int(selected_method.split(':')[0])
         
@@ -1553,6 +2275,21 @@ class PDFCompressor:
                 "1. pip install pytesseract pdf2image PyPDF2 Pillow\n"
                 "2. apt install tesseract-ocr tesseract-ocr-rus poppler-utils\n"
                 "3. Проверьте установку Tesseract: tesseract --version")
+            return False
+
+        settings_error = self.settings_error()
+        if settings_error:
+            messagebox.showerror("Ошибка", settings_error)
+            return False
+
+        if self.folder_watcher is not None or (self.processing_thread and self.processing_thread.is_alive()):
+            messagebox.showerror("Ошибка", "Обработка уже выполняется. Остановите наблюдение или дождитесь завершения")
+            return False
+        return True
+
+    def start_compression(self):
+        """Запускает процесс сжатия в отдельном потоке"""
+        if not self.can_start_processing():
             return
 
         # Обновляем активные настройки
@@ -1576,6 +2313,242 @@ class PDFCompressor:
         thread = threading.Thread(target=self.process_directory)
         thread.daemon = True
         thread.start()
+        self.processing_thread = thread
+
+    def toggle_watch_mode(self):
+        """Включает или выключает режим наблюдения за папкой"""
+        if self.folder_watcher is not None:
+            self.folder_watcher.stop()
+            self.folder_watcher = None
+            self.watch_button.config(text="👁 Наблюдать за папкой")
+            self.add_to_log("Наблюдение за папкой остановлено")
+            return
+
+        if not self.can_start_processing():
+            return
+
+        self.load_active_settings()
+        self.setup_log_file()
+        self.skip_button.config(state=tk.NORMAL)
+
+        self.folder_watcher = FolderWatcher(
+            self.directory_path.get(),
+            self.depth_level.get(),
+            on_file_ready=self.watch_queue.put,
+            log_callback=self.add_to_log
+        )
+        self.watch_button.config(text="⏹ Остановить наблюдение")
+        self.add_to_log(f"Наблюдение за папкой: {self.directory_path.get()}")
+
+        thread = threading.Thread(target=self.run_watch_mode, args=(self.folder_watcher,))
+        thread.daemon = True
+        thread.start()
+        self.processing_thread = thread
+        self.folder_watcher.start()
+
+    def run_watch_mode(self, watcher):
+        """Сжимает файлы, которые наблюдатель признал дописанными, пока наблюдение не остановлено"""
+        self.prepare_processing()
+        while not watcher.stopped:
+            try:
+                file_path = self.watch_queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            try:
+                # Событие от замены файла результатом сжатия - файл уже есть в БД
+                if self.db_ops.get_processed_file_by_path(file_path):
+                    continue
+                # Политика запуска: вне окна файлы копятся в watch_queue до начала следующего окна
+                if self.run_budget and not self.wait_for_watch_policy(watcher, file_path):
+                    break
+                self.io_throttle.before_file()
+                job_start_time = time.monotonic()
+                self.process_single_file(file_path)
+                if self.run_budget:
+                    self.run_budget.job_finished(time.monotonic() - job_start_time)
+            except Exception as e:
+                self.add_to_log(f"Ошибка обработки {file_path} в режиме наблюдения: {e}", "error")
+        self.ui_bus.call(self.skip_button.config, state=tk.DISABLED)
+
+    def wait_for_watch_policy(self, watcher, file_path):
+        """
+        Проверка политики запуска перед файлом в режиме наблюдения. С окном обработки файл и
+        все новые файлы ждут начала следующего окна (бюджеты окна начинаются заново); без окна
+        исчерпанный бюджет останавливает наблюдение. Возвращает True, если файл можно начинать
+        """
+        try:
+            file_size = os.path.getsize(file_path)
+        except OSError:
+            file_size = 0
+        reason = self.run_budget.stop_reason(file_size)
+        if reason is None:
+            return True
+
+        self.add_to_log(f"⏸ Политика запуска: {reason} (расход: {self.run_budget.usage()})", "warning")
+        policy = self.run_budget.policy
+        if not policy.has_window():
+            self.add_to_log("Наблюдение за папкой остановлено политикой запуска. Необработанные файлы "
+                            "будут сжаты при обработке директории", "warning")
+            self.ui_bus.call(self.stop_watch_mode, watcher)
+            return False
+
+        resume_at = policy.next_window_start(datetime.now())
+        self.add_to_log(f"Новые файлы ждут начала окна обработки: {resume_at:%d.%m.%Y %H:%M}")
+        if not self.sleep_until(resume_at, lambda: watcher.stopped):
+            return False
+        self.run_budget.reset()
+        self.add_to_log(f"▶ Окно обработки началось, в очереди наблюдения файлов: {self.watch_queue.qsize() + 1}")
+        return True
+
+    def stop_watch_mode(self, watcher):
+        """Останавливает наблюдение (из потока Tk), если оно еще то же самое"""
+        if self.folder_watcher is watcher:
+            self.toggle_watch_mode()
+
+    def prepare_processing(self):
+        """Подготовка к обработке: модель таймаута, бюджет памяти и ограничение нагрузки"""
+        # Справочники (активная настройка, причины ошибок, методы) читаются из БД один раз на запуск
+        self.db_ops.invalidate_reference_cache()
+        # Модель адаптивного таймаута строится один раз на запуск
+        self.train_timeout_model()
+        self.memory_admission = MemoryAdmissionController(self.memory_budget_mb.get())
+        self.add_to_log(f"Бюджет памяти заданий: {self.memory_admission.budget_mb} МБ")
+        self.io_throttle = AdaptiveIOThrottle(self.io_max_mb_per_sec.get(), self.io_max_files_per_sec.get())
+        # Замер этапов: при выключенном - только проверка флага, ресурсы процессов не собираются
+        self.stage_timer.enabled = self.collect_timings.get()
+        # Политика запуска: окно обработки и бюджеты (время, чтение, процессорное время)
+        policy = RunPolicy(self.run_window_start.get(), self.run_window_end.get(), self.run_max_hours.get(),
+                           self.run_max_read_gb.get(), self.run_max_cpu_hours.get())
+        self.run_budget = RunBudget(policy) if policy.is_limited() else None
+        if self.run_budget:
+            self.add_to_log(f"Политика запуска: {policy.describe()}")
+        self.process_supervisor.on_finish = (self.on_process_finished
+                                             if self.stage_timer.enabled or self.run_budget else None)
+
+    def on_process_finished(self, result):
+        """Завершенный внешний процесс: замер этапов и расход процессорного времени политики запуска"""
+        self.stage_timer.add_process(result)
+        if self.run_budget:
+            self.run_budget.add_process(result)
+
+    def process_job(self, run_file):
+        """Обрабатывает файл из очереди запуска во временной папке задания"""
+        job_temp_dir = tempfile.mkdtemp(prefix=f"pdf_compress_job{run_file.id}_")
+        self.db_ops.mark_run_file_running(run_file, job_temp_dir)
+        self.job_temp_dir = job_temp_dir
+        if self.ocr_processor:
+            self.ocr_processor.temp_root = job_temp_dir
+        failed_before = self.failed_files
+        self.current_run_file = run_file
+        self.write_back_deferred = False
+        try:
+            self.process_single_file(run_file.file_path)
+        finally:
+            self.job_temp_dir = None
+            self.current_run_file = None
+            if self.ocr_processor:
+                self.ocr_processor.temp_root = None
+            shutil.rmtree(job_temp_dir, ignore_errors=True)
+            if self.write_back_deferred:
+                # Итог файла известен после замены на хранилище (finish_write_backs); до того сбой
+                # программы возвращает файл в очередь
+                self.db_ops.mark_run_file_writing(run_file)
+            else:
+                # Пропущенный пользователем файл считается неудачным, чтобы при продолжении не браться за него снова
+                succeeded = not self.stop_current_file and self.failed_files == failed_before
+                self.db_ops.mark_run_file_finished(run_file, succeeded)
+
+    def start_file_staging(self, run_files):
+        """Упреждающее чтение сетевых файлов очереди и фоновая замена исходных файлов на время запуска"""
+        if NETWORK_PREFETCH_FILES > 0 and any(is_network_path(run_file.file_path) for run_file in run_files):
+            # Окно: текущий файл и следующие NETWORK_PREFETCH_FILES
+            self.prefetcher = PrefetchCache(NETWORK_PREFETCH_FILES + 1, NETWORK_PREFETCH_MAX_MB * 1024 * 1024,
+                                            workers=NETWORK_COPY_WORKERS)
+            self.prefetch_recorded = {}
+            if self.ocr_processor:
+                self.ocr_processor.prefetcher = self.prefetcher
+        if ASYNC_WRITE_BACK and self.replace_original.get():
+            self.write_back = WriteBackQueue(WRITE_BACK_MAX_PENDING)
+
+    def prefetch_window(self, upcoming_files):
+        """Передает упреждающему чтению текущий и следующие сетевые файлы очереди, которых еще нет в БД"""
+        candidates = [run_file.file_path for run_file in upcoming_files[:self.prefetcher.max_files * 4]
+                      if is_network_path(run_file.file_path)]
+        unchecked = [path for path in candidates if path not in self.prefetch_recorded]
+        if unchecked:
+            # Записанные файлы пропускаются без чтения - копировать их незачем
+            try:
+                recorded = self.db_ops.find_recorded_paths(unchecked)
+            except Exception:
+                recorded = set()
+            for path in unchecked:
+                self.prefetch_recorded[path] = path in recorded
+        self.prefetcher.prefetch([path for path in candidates if not self.prefetch_recorded[path]])
+
+    def stop_file_staging(self):
+        """Дожидается фоновых замен, учитывает их итоги и освобождает кэш упреждающего чтения"""
+        if self.write_back:
+            try:
+                self.finish_write_backs(self.write_back.drain())
+            finally:
+                self.write_back.close()
+                self.write_back = None
+        if self.prefetcher:
+            if self.prefetcher.hits or self.prefetcher.misses:
+                self.add_to_log(f"Упреждающее чтение: готовых копий {self.prefetcher.hits}, "
+                                f"скопировано перед сжатием {self.prefetcher.misses}")
+            if self.ocr_processor:
+                self.ocr_processor.prefetcher = None
+            self.prefetcher.close()
+            self.prefetcher = None
+
+    def wait_for_run_policy(self, run, file_path, remaining_files):
+        """
+        Проверка политики запуска перед файлом. Если лимит близок, начатые файлы (фоновые замены)
+        доводятся до конца, а очередь сохраняется как прерванный запуск. С окном обработки запуск
+        ждет начала следующего окна (бюджеты окна начинаются заново), без окна - останавливается.
+        Возвращает причину остановки или None, если файл можно начинать
+        """
+        try:
+            file_size = os.path.getsize(file_path)
+        except OSError:
+            file_size = 0
+        reason = self.run_budget.stop_reason(file_size)
+        if reason is None:
+            return None
+
+        if self.write_back:
+            self.finish_write_backs(self.write_back.drain())
+        self.db_ops.set_run_status(run.id, RUN_INTERRUPTED, reason)
+        self.add_to_log(f"⏸ Политика запуска: {reason} (расход: {self.run_budget.usage()}), "
+                        f"в очереди осталось файлов: {remaining_files}", "warning")
+        policy = self.run_budget.policy
+        if not policy.has_window():
+            return reason
+
+        resume_at = policy.next_window_start(datetime.now())
+        self.add_to_log(f"Очередь сохранена, продолжение в начале окна обработки: {resume_at:%d.%m.%Y %H:%M}")
+        self.waiting_for_run_window = True
+        try:
+            if not self.sleep_until(resume_at, lambda: self.stop_current_file):
+                return reason
+        finally:
+            self.waiting_for_run_window = False
+
+        self.run_budget.reset()
+        self.db_ops.set_run_status(run.id, RUN_RUNNING)
+        self.add_to_log("▶ Окно обработки началось, запуск продолжается")
+        return None
+
+    @staticmethod
+    def sleep_until(resume_at, stop_check):
+        """Ждет наступления resume_at, проверяя stop_check каждые WINDOW_POLL_SECS; False - ожидание прервано"""
+        while not stop_check():
+            wait_secs = (resume_at - datetime.now()).total_seconds()
+            if wait_secs <= 0:
+                return True
+            time.sleep(min(WINDOW_POLL_SECS, wait_secs))
+        return False
 
     def process_directory(self):
         """Обрабатывает все PDF файлы в директории"""
@@ -1597,27 +2570,83 @@ class PDFCompressor:
             else:
                 self.add_to_log("Лимит размера страницы: отключен", "info")
 
-            # Находим все PDF файлы
-            pdf_files = self.find_pdf_files(directory, depth)
-            total_files = len(pdf_files)
-
-            self.add_to_log(f"Найдено PDF файлов: {total_files}")
+            self.prepare_processing()
+
+            # Очередь запуска: продолжаем прерванный запуск или сканируем директорию заново
+            recovered = self.db_ops.recover_stale_run_files()
+            if recovered:
+                self.add_to_log(f"Восстановление после сбоя: {recovered} файл(ов) в обработке, временные файлы удалены",
+                                "warning")
+            self.directory_index = None
+            run = self.db_ops.get_unfinished_run(directory, depth)
+            if run:
+                stopped_by = f" (остановлен: {run.stop_reason})" if run.stop_reason else ""
+                self.add_to_log(f"Продолжение прерванного запуска #{run.id}{stopped_by} без повторного сканирования")
+            else:
+                # Находим все PDF файлы
+                scan_start_time = time.monotonic()
+                pdf_files = self.find_pdf_files(directory, depth)
+                scan_seconds = time.monotonic() - scan_start_time
+                self.add_to_log(f"Найдено PDF файлов: {len(pdf_files)} (сканирование {scan_seconds:.1f} сек)")
+                pdf_files = self.prioritize_files(pdf_files)
+                active_setting = self.db_ops.get_active_setting()
+                run = self.db_ops.create_run(directory, depth, active_setting.id if active_setting else None,
+                                             pdf_files, scan_seconds=scan_seconds)
+
+            run_files = self.db_ops.get_pending_run_files(run.id)
+            total_files = run.total_files
+            done_before = total_files - len(run_files)
+            if done_before:
+                self.add_to_log(f"Осталось файлов: {len(run_files)} из {total_files}")
 
             # Обрабатываем каждый файл
-            counter = 0
-            for i, file_path in enumerate(pdf_files, 1):
-                if counter % self.timeout_iterations.get() == 0:
-                    time.sleep(self.timeout_interval_secs.get())
-                counter += 1
-                if self.stop_current_file:
-                    break
-
-                self.add_to_log(f"Прогресс: {i}/{total_files}")
-                self.process_single_file(file_path)
+            policy_stop = None  # причина остановки по политике запуска
+            self.start_file_staging(run_files)
+            try:
+                for i, run_file in enumerate(run_files, done_before + 1):
+                    file_path = run_file.file_path
+                    # Ограничение нагрузки на хранилище: скорость подстраивается по задержке stat
+                    if self.io_throttle.probe(file_path):
+                        self.add_to_log(
+                            f"🐢 Хранилище отвечает медленно ({self.io_throttle.last_latency * 1000:.0f} мс), "
+                            f"скорость снижена до {self.io_throttle.rate_share:.0%} потолка", "warning")
+                    self.io_throttle.before_file(self.is_cancel_requested)
+                    if self.stop_current_file:
+                        break
+                    # Политика запуска: новый файл не начинается, если лимит близок
+                    if self.run_budget:
+                        policy_stop = self.wait_for_run_policy(run, file_path, len(run_files) - (i - done_before - 1))
+                        if policy_stop:
+                            break
+
+                    self.add_to_log(f"Прогресс: {i}/{total_files}")
+                    if self.prefetcher:
+                        self.prefetch_window(run_files[i - done_before - 1:])
+                    job_start_time = time.monotonic()
+                    self.process_job(run_file)
+                    if self.run_budget:
+                        self.run_budget.job_finished(time.monotonic() - job_start_time)
+                    if self.write_back:
+                        self.finish_write_backs(self.write_back.collect())
+            finally:
+                # Незавершенные замены дописываются и в БД, и на хранилище до отметки папок
+                self.stop_file_staging()
+
+            interrupted = self.stop_current_file or policy_stop is not None
+            self.db_ops.set_run_status(run.id, RUN_INTERRUPTED if interrupted else RUN_COMPLETED, policy_stop)
+            if self.directory_index and not interrupted:
+                completed_dirs = self.directory_index.mark_complete()
+                self.add_to_log(f"Индекс папок: обработанными отмечено {completed_dirs}")
+
+            if self.io_throttle.total_wait_secs:
+                self.add_to_log(f"Ожидание ограничения нагрузки на хранилище: {self.io_throttle.total_wait_secs:.1f} сек")
 
             # Финальное сообщение
             if self.stop_current_file:
                 self.add_to_log("Обработка прервана пользователем", "warning")
+            elif policy_stop:
+                self.add_to_log(f"Обработка остановлена политикой запуска: {policy_stop}. Оставшиеся файлы сохранены "
+                                f"в очереди запуска #{run.id} и будут обработаны при следующем запуске", "warning")
             else:
                 self.add_to_log("Обработка завершена!", "success")
 
@@ -1625,7 +2654,7 @@ class PDFCompressor:
             self.add_to_log(f"Ошибка обработки директории: {e}", "error")
         finally:
             # Деактивируем кнопку пропуска
-            self.skip_button.config(state=tk.DISABLED)
+            self.ui_bus.call(self.skip_button.config, state=tk.DISABLED)
 
     def show_stats(self):
         """Показать окно статистики"""
@@ -1663,6 +2692,13 @@ class PDFCompressor:
         • Только изображения - оптимизация изображений в PDF
         • Tesseract OCR - создание поисковых PDF из сканов (нужен Tesseract)
         • Tesseract + Ghostscript - OCR + последующее сжатие (нужен Tesseract)
+        • Каскад - сначала дешевая очистка без потерь, затем Ghostscript ур.2, ур.1
+          и OCR+GS; следующая ступень запускается, только если экономия ниже порога.
+          В БД сохраняется ступень, давшая результат (compression_tier)
+        • Гонка стратегий - для файлов от 100 МБ уровни Ghostscript из поля "Уровни гонки"
+          (по умолчанию 1,2,3) запускаются одновременно в пределах таймаута файла; остается
+          самый маленький результат, остальные процессы останавливаются, как только не могут
+          его превзойти или уровень с наименьшим разрешением уже дал нужную экономию
 
         ⚠️ НОВАЯ ФУНКЦИЯ: МАКСИМАЛЬНЫЙ РАЗМЕР СТРАНИЦЫ (КБ)
         • Позволяет отсеивать "тяжелые" файлы, которые невыгодно сжимать
@@ -1704,21 +2740,36 @@ class PDFCompressor:
         • Максимальное время обработки одного файла
         • Защита от зависания на больших или поврежденных файлах
         • По умолчанию: 35 секунд
-
-        ИНТЕРВАЛ ИТЕРАЦИЙ ДЛЯ ТАЙМАУТА (ШТ):
-        • Количество файлов, после обработки которых делается перерыв
-        • Помогает обойти ограничения антивирусного ПО
-        • По умолчанию: 350 файлов
-
-        ПРОДОЛЖИТЕЛЬНОСТЬ ИНТЕРВАЛЬНОГО ТАЙМАУТА (СЕК):
-        • Длительность перерыва после заданного количества итераций
-        • По умолчанию: 9 секунд
+        • "Адаптивный" - таймаут считается для каждого файла по истории обработки
+          (медианные сек/стр и сек/МБ для движка) с запасом x3, в пределах 10-3600 сек.
+          Пока истории мало (меньше 20 файлов по движку) - используется значение выше
+        • OCR ограничивается только адаптивным таймаутом по истории OCR; без нее
+          (и при фиксированном таймауте) OCR выполняется без ограничения времени
+
+        МАКС. СКОРОСТЬ I/O (МБ/С) И МАКС. ФАЙЛОВ В СЕКУНДУ:
+        • Потолки нагрузки на файловое хранилище (0 - без ограничения)
+        • Скорость подстраивается сама: пока хранилище отвечает быстро, она растет до потолка,
+          при росте задержки - снижается вдвое (днем NAS не перегружается, ночью - полная скорость)
+        • Заменяют прежнюю паузу каждые N файлов
+
+        БЮДЖЕТ ПАМЯТИ (МБ):
+        • Для каждого задания оценивается пиковая память: OCR - страницы x DPI² x каналы,
+          Ghostscript - средний размер страницы x коэффициент (файл читается потоком)
+        • Задание запускается, только когда оценка помещается в бюджет и в свободную память;
+          иначе оно ждет, пока память освободят другие задания или программы (до 5 минут).
+          Задание больше бюджета или физической памяти не ждет. Не дождавшийся файл не
+          записывается в БД и будет обработан при следующем запуске
+        • 0 - авто (70% физической памяти)
 
         3. ЗАПУСК ОБРАБОТКИ:
         • Нажмите "Начать сжатие" для запуска процесса
         • Следите за прогрессом в журнале операций
         • Используйте "Пропустить файл" если обработка зависла
         • Статистика отображается в реальном времени
+        • Список найденных файлов сохраняется в БД: если программа была закрыта или упала,
+          повторный запуск той же папки продолжит с первого необработанного файла без сканирования
+        • "Наблюдать за папкой" - долгий режим: новые PDF сжимаются вскоре после сохранения,
+          когда размер и дата изменения файла не меняются 5 сек (inotify в Linux, опрос для SMB/NFS)
 
         📊 НОВАЯ СТАТИСТИКА В БАЗЕ ДАННЫХ:
 
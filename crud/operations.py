@@ -1,32 +1,98 @@
 # crud/operations.py
 
 
+import hashlib
 import os
-import re
 
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, or_
 from models.models import (
     ProcessedFile,
+    Directory,
     Setting,
     FailReason,
     NestingDepth,
-    CompressionMethod
+    CompressionMethod,
+    ProcessingRun,
+    RunFile,
+    DirectorySnapshot,
+    FileTiming,
+    DailyStats
 )
 from typing import Optional, List
 import datetime
+import shutil
+
+import pytz
+
+from path_dimensions import path_dimensions
+from path_normalizer import normalize_path, normalize_paths
+from file_staging import WriteBackQueue
+
+# Состояния запуска и файлов в очереди запуска
+RUN_RUNNING = "running"
+RUN_INTERRUPTED = "interrupted"
+RUN_COMPLETED = "completed"
+RUN_FILE_PENDING = "pending"
+RUN_FILE_RUNNING = "running"
+RUN_FILE_WRITING = "writing"  # сжат, замена исходного файла идет в фоновом потоке
+RUN_FILE_DONE = "done"
+RUN_FILE_FAILED = "failed"
+
+# Сколько раз файл может оборвать запуск (сбой во время его обработки), прежде чем его пропустят
+MAX_RUN_FILE_ATTEMPTS = 2
+
+# Версия схемы БД и справочников, хранится в PRAGMA user_version. Увеличивается при добавлении
+# миграции или изменении справочников в initialize_base_data: при совпадении версии запуск
+# программы не проверяет столбцы и не обновляет справочники
+SCHEMA_VERSION = 5
 
 
 class DBOperations:
     def __init__(self, db: Session):
         self.db = db
+        self._directory_ids = {}  # dir_path -> directory.id (записи directory не удаляются)
+        self._reference_cache = None  # справочники, см. reference_data
 
     # Операции с ProcessedFile
+    @staticmethod
+    def split_path(normalized_path: str) -> tuple:
+        """(папка, имя файла) нормализованного пути"""
+        dir_path, _, file_name = normalized_path.rpartition('/')
+        return dir_path, file_name
+
+    @staticmethod
+    def path_hash(normalized_path: str) -> int:
+        """64-битный хеш нормализованного пути (со знаком - помещается в INTEGER SQLite)"""
+        digest = hashlib.blake2b(normalized_path.encode('utf-8'), digest_size=8).digest()
+        return int.from_bytes(digest, 'big', signed=True)
+
+    def intern_directory(self, dir_path: str) -> int:
+        """id записи directory для папки; новая папка сохраняется сразу (отдельным commit)"""
+        directory_id = self._directory_ids.get(dir_path)
+        if directory_id is None:
+            directory = self.db.query(Directory).filter(Directory.dir_path == dir_path).first()
+            if directory is None:
+                directory = Directory(dir_path=dir_path)
+                self.db.add(directory)
+                self.db.commit()
+            directory_id = self._directory_ids[dir_path] = directory.id
+        return directory_id
+
     def get_processed_file_by_path(self, file_path: str) -> Optional[ProcessedFile]:
-        normalized_path = self.normalize_path(file_path)
-        return self.db.query(ProcessedFile).filter(
-            ProcessedFile.file_full_path == normalized_path
-        ).first()
+        return self.find_processed_file(self.normalize_path(file_path))
+
+    def find_processed_file(self, normalized_path: str) -> Optional[ProcessedFile]:
+        """Запись по уже нормализованному пути"""
+        dir_path, file_name = self.split_path(normalized_path)
+        # Поиск по индексу хеша; папка и имя сверяются на случай коллизии
+        candidates = self.db.query(ProcessedFile, Directory.dir_path).join(Directory).filter(
+            ProcessedFile.path_hash == self.path_hash(normalized_path)
+        ).all()
+        for processed_file, candidate_dir in candidates:
+            if processed_file.file_name == file_name and candidate_dir == dir_path:
+                return processed_file
+        return None
 
     def create_processed_file(
             self,
@@ -37,28 +103,43 @@ class DBOperations:
             fail_reason_id: Optional[int] = None,
             other_fail_reason: Optional[str] = None,
             file_pages: Optional[int] = None,
-            file_origin_size_kbytes: Optional[float] = None
+            file_origin_size_kbytes: Optional[float] = None,
+            compression_tier: Optional[str] = None,
+            processing_seconds: Optional[float] = None,
+            timeout_secs: Optional[float] = None
     ) -> ProcessedFile:
         # Нормализуем путь перед сохранением
         normalized_path = self.normalize_path(file_full_path)
 
         # Проверяем существование записи прямо перед сохранением
-        existing = self.get_processed_file_by_path(normalized_path)
+        existing = self.find_processed_file(normalized_path)
         if existing:
             print(f"⚠️ Запись уже существует для пути: {normalized_path}")
             return existing
 
+        dir_path, file_name = self.split_path(normalized_path)
+        directory_id = self.intern_directory(dir_path)
+        processed_date = datetime.datetime.now(pytz.timezone('Asia/Novosibirsk'))
         processed_file = ProcessedFile(
-            file_full_path=normalized_path,
+            directory_id=directory_id,
+            file_name=file_name,
+            path_hash=self.path_hash(normalized_path),
+            processed_date=processed_date,
             is_successful=is_successful,
             fail_reason_id=fail_reason_id,
             setting_id=setting_id,
             file_compression_kbites=file_compression_kbites,
             other_fail_reason=other_fail_reason,
             file_pages=file_pages,
-            file_origin_size_kbytes=file_origin_size_kbytes
+            file_origin_size_kbytes=file_origin_size_kbytes,
+            compression_tier=compression_tier,
+            processing_seconds=processing_seconds,
+            timeout_secs=timeout_secs,
+            **path_dimensions(normalized_path)
         )
         self.db.add(processed_file)
+        # Сводка для окна статистики обновляется в той же транзакции
+        self.add_to_daily_stats(processed_date, setting_id, is_successful, fail_reason_id, file_compression_kbites)
         try:
             self.db.commit()
             self.db.refresh(processed_file)
@@ -68,9 +149,89 @@ class DBOperations:
             print(f"❌ Ошибка сохранения в БД: {e}")
             raise
 
+    def get_timing_history(self, limit: int = 20000) -> List[tuple]:
+        """
+        История времени обработки успешных файлов для модели таймаута:
+        (compression_tier, processing_seconds, file_origin_size_kbytes, file_pages), новые записи первыми
+        """
+        return self.db.query(
+            ProcessedFile.compression_tier,
+            ProcessedFile.processing_seconds,
+            ProcessedFile.file_origin_size_kbytes,
+            ProcessedFile.file_pages
+        ).filter(
+            ProcessedFile.is_successful == True,
+            ProcessedFile.processing_seconds.isnot(None)
+        ).order_by(ProcessedFile.id.desc()).limit(limit).all()
+
+    def get_directory_saving_history(self) -> List[tuple]:
+        """
+        Суммы по папкам для оценки экономии (очередность файлов запуска): dir_path, department, files,
+        origin_kb, saved_kb, paged_origin_kb и pages (файлы с известным числом страниц),
+        timed_origin_kb и seconds (файлы с известным временем обработки)
+        """
+        from sqlalchemy import func, case
+
+        with_pages = ProcessedFile.file_pages > 0
+        timed = ProcessedFile.processing_seconds.isnot(None)
+        return self.db.query(
+            Directory.dir_path.label("dir_path"),
+            ProcessedFile.department.label("department"),
+            func.count(ProcessedFile.id).label("files"),
+            func.sum(ProcessedFile.file_origin_size_kbytes).label("origin_kb"),
+            func.sum(ProcessedFile.file_compression_kbites).label("saved_kb"),
+            func.sum(case((with_pages, ProcessedFile.file_origin_size_kbytes), else_=0)).label("paged_origin_kb"),
+            func.sum(case((with_pages, ProcessedFile.file_pages), else_=0)).label("pages"),
+            func.sum(case((timed, ProcessedFile.file_origin_size_kbytes), else_=0)).label("timed_origin_kb"),
+            func.sum(ProcessedFile.processing_seconds).label("seconds")
+        ).join(Directory).filter(
+            ProcessedFile.file_origin_size_kbytes > 0
+        ).group_by(ProcessedFile.directory_id, ProcessedFile.department).all()
+
+    def get_density_saving_samples(self, limit: int = 20000) -> List[tuple]:
+        """(file_origin_size_kbytes, file_pages, file_compression_kbites) последних файлов с известным числом страниц"""
+        return self.db.query(
+            ProcessedFile.file_origin_size_kbytes,
+            ProcessedFile.file_pages,
+            ProcessedFile.file_compression_kbites
+        ).filter(
+            ProcessedFile.file_origin_size_kbytes > 0,
+            ProcessedFile.file_pages > 0
+        ).order_by(ProcessedFile.id.desc()).limit(limit).all()
+
+    # Кэш справочников
+    def reference_data(self) -> dict:
+        """
+        Активная настройка, причины ошибок и методы сжатия - несколько строк, которые меняются
+        только из окна настроек. Загружаются один раз отдельной сессией: объекты отсоединены от
+        self.db, и commit записей файлов не сбрасывает их атрибуты (иначе каждое обращение
+        снова шло бы в БД). Сбрасывается invalidate_reference_cache.
+        Объекты только для чтения: у отсоединенного объекта ленивая загрузка связи бросает
+        DetachedInstanceError, поэтому связи настройки (метод сжатия, глубина вложенности)
+        загружаются сразу, а изменять настройки нужно через запросы self.db
+        """
+        if self._reference_cache is None:
+            from sqlalchemy.orm import joinedload
+
+            with Session(bind=self.db.get_bind()) as session:
+                self._reference_cache = {
+                    "active_setting": session.query(Setting).options(
+                        joinedload(Setting.compression_method),
+                        joinedload(Setting.nesting_depth)
+                    ).filter(Setting.is_active == True).first(),
+                    "fail_reasons": {reason.name: reason for reason in session.query(FailReason)},
+                    "methods": {method.id: method for method in session.query(CompressionMethod).order_by(
+                        CompressionMethod.id
+                    )}
+                }
+        return self._reference_cache
+
+    def invalidate_reference_cache(self):
+        self._reference_cache = None
+
     # Операции с Setting
     def get_active_setting(self) -> Optional[Setting]:
-        return self.db.query(Setting).filter(Setting.is_active == True).first()
+        return self.reference_data()["active_setting"]
 
     def find_existing_setting(
             self,
@@ -83,7 +244,18 @@ class DBOperations:
             timeout_iterations: int,
             timeout_interval_secs: int,
             ocr_max_pages: int,
-            kbytes_per_page_border: Optional[float] = None  # ✅ НОВОЕ
+            kbytes_per_page_border: Optional[float] = None,  # ✅ НОВОЕ
+            adaptive_timeout: bool = False,
+            memory_budget_mb: int = 0,
+            io_max_mb_per_sec: float = 0,
+            io_max_files_per_sec: float = 0,
+            collect_timings: bool = False,
+            run_window_start: str = "",
+            run_window_end: str = "",
+            run_max_hours: float = 0,
+            run_max_read_gb: float = 0,
+            run_max_cpu_hours: float = 0,
+            race_levels: str = "1,2,3"
     ) -> Optional[Setting]:
         query = self.db.query(Setting).filter(
             and_(
@@ -95,7 +267,18 @@ class DBOperations:
                 Setting.procession_timeout == procession_timeout,
                 Setting.timeout_iterations == timeout_iterations,
                 Setting.timeout_interval_secs == timeout_interval_secs,
-                Setting.ocr_max_pages == ocr_max_pages
+                Setting.ocr_max_pages == ocr_max_pages,
+                Setting.adaptive_timeout == adaptive_timeout,
+                Setting.memory_budget_mb == memory_budget_mb,
+                Setting.io_max_mb_per_sec == io_max_mb_per_sec,
+                Setting.io_max_files_per_sec == io_max_files_per_sec,
+                Setting.collect_timings == collect_timings,
+                Setting.run_window_start == run_window_start,
+                Setting.run_window_end == run_window_end,
+                Setting.run_max_hours == run_max_hours,
+                Setting.run_max_read_gb == run_max_read_gb,
+                Setting.run_max_cpu_hours == run_max_cpu_hours,
+                Setting.race_levels == race_levels
             )
         )
         
@@ -119,6 +302,17 @@ class DBOperations:
             timeout_interval_secs: int = 9,
             ocr_max_pages: int = 120,
             kbytes_per_page_border: Optional[float] = None,  # ✅ НОВОЕ
+            adaptive_timeout: bool = False,
+            memory_budget_mb: int = 0,
+            io_max_mb_per_sec: float = 0,
+            io_max_files_per_sec: float = 0,
+            collect_timings: bool = False,
+            run_window_start: str = "",
+            run_window_end: str = "",
+            run_max_hours: float = 0,
+            run_max_read_gb: float = 0,
+            run_max_cpu_hours: float = 0,
+            race_levels: str = "1,2,3",
             info: Optional[str] = None,
             activate: bool = True
     ) -> Setting:
@@ -133,7 +327,18 @@ class DBOperations:
             timeout_iterations=timeout_iterations,
             timeout_interval_secs=timeout_interval_secs,
             ocr_max_pages=ocr_max_pages,
-            kbytes_per_page_border=kbytes_per_page_border  # ✅
+            kbytes_per_page_border=kbytes_per_page_border,  # ✅
+            adaptive_timeout=adaptive_timeout,
+            memory_budget_mb=memory_budget_mb,
+            io_max_mb_per_sec=io_max_mb_per_sec,
+            io_max_files_per_sec=io_max_files_per_sec,
+            collect_timings=collect_timings,
+            run_window_start=run_window_start,
+            run_window_end=run_window_end,
+            run_max_hours=run_max_hours,
+            run_max_read_gb=run_max_read_gb,
+            run_max_cpu_hours=run_max_cpu_hours,
+            race_levels=race_levels
         )
 
         if existing_setting:
@@ -153,6 +358,17 @@ class DBOperations:
             timeout_interval_secs=timeout_interval_secs,
             ocr_max_pages=ocr_max_pages,
             kbytes_per_page_border=kbytes_per_page_border,  # ✅
+            adaptive_timeout=adaptive_timeout,
+            memory_budget_mb=memory_budget_mb,
+            io_max_mb_per_sec=io_max_mb_per_sec,
+            io_max_files_per_sec=io_max_files_per_sec,
+            collect_timings=collect_timings,
+            run_window_start=run_window_start,
+            run_window_end=run_window_end,
+            run_max_hours=run_max_hours,
+            run_max_read_gb=run_max_read_gb,
+            run_max_cpu_hours=run_max_cpu_hours,
+            race_levels=race_levels,
             is_active=activate,
             info=info or f"Создано {datetime.datetime.now().strftime('%d.%m.%Y %H:%M')}"
         )
@@ -163,6 +379,7 @@ class DBOperations:
             self.db.query(Setting).filter(Setting.id != setting.id).update({Setting.is_active: False})
         
         self.db.commit()
+        self.invalidate_reference_cache()
         self.db.refresh(setting)
         return setting
 
@@ -173,6 +390,7 @@ class DBOperations:
             setting.is_active = True
             self.db.commit()
             self.db.refresh(setting)
+        self.invalidate_reference_cache()
         return setting
 
     def get_all_settings(self) -> List[Setting]:
@@ -184,14 +402,15 @@ class DBOperations:
             setting.info = info
             self.db.commit()
             self.db.refresh(setting)
+            self.invalidate_reference_cache()
         return setting
 
     # Операции с FailReason
     def get_fail_reason_by_name(self, name: str) -> Optional[FailReason]:
-        return self.db.query(FailReason).filter(FailReason.name == name).first()
+        return self.reference_data()["fail_reasons"].get(name)
 
     def get_all_fail_reasons(self) -> List[FailReason]:
-        return self.db.query(FailReason).all()
+        return list(self.reference_data()["fail_reasons"].values())
 
     def update_fail_reason_info(self, fail_reason_id: int, info: str) -> FailReason:
         fail_reason = self.db.query(FailReason).filter(FailReason.id == fail_reason_id).first()
@@ -199,23 +418,270 @@ class DBOperations:
             fail_reason.info = info
             self.db.commit()
             self.db.refresh(fail_reason)
+            self.invalidate_reference_cache()
         return fail_reason
 
     # Операции с CompressionMethod
     def get_compression_method_by_name(self, name: str) -> Optional[CompressionMethod]:
-        return self.db.query(CompressionMethod).filter(CompressionMethod.name == name).first()
+        return next((method for method in self.reference_data()["methods"].values() if method.name == name), None)
 
     def get_all_compression_methods(self) -> List[CompressionMethod]:
-        return self.db.query(CompressionMethod).all()
+        return list(self.reference_data()["methods"].values())
 
     def get_compression_method_by_id(self, method_id: int) -> Optional[CompressionMethod]:
-        return self.db.query(CompressionMethod).filter(CompressionMethod.id == method_id).first()
+        return self.reference_data()["methods"].get(method_id)
+
+    # Операции с очередью запуска
+    def create_run(self, root_directory: str, nesting_depth_id: int, setting_id: Optional[int],
+                   file_paths: List[str], scan_seconds: Optional[float] = None,
+                   chunk_size: int = 5000) -> ProcessingRun:
+        """Создает запуск и сохраняет найденные файлы в очередь (пакетами)"""
+        run = ProcessingRun(
+            root_directory=self.normalize_path(root_directory),
+            nesting_depth_id=nesting_depth_id,
+            setting_id=setting_id,
+            status=RUN_RUNNING,
+            total_files=len(file_paths),
+            scan_seconds=scan_seconds
+        )
+        self.db.add(run)
+        self.db.commit()
+
+        for start in range(0, len(file_paths), chunk_size):
+            self.db.bulk_insert_mappings(RunFile, [
+                {"run_id": run.id, "position": position, "file_path": path, "state": RUN_FILE_PENDING}
+                for position, path in enumerate(file_paths[start:start + chunk_size], start)
+            ])
+            self.db.commit()
+        return run
+
+    def get_unfinished_run(self, root_directory: str, nesting_depth_id: int) -> Optional[ProcessingRun]:
+        """Последний незавершенный запуск для директории и глубины"""
+        return self.db.query(ProcessingRun).filter(
+            ProcessingRun.root_directory == self.normalize_path(root_directory),
+            ProcessingRun.nesting_depth_id == nesting_depth_id,
+            ProcessingRun.status.in_([RUN_RUNNING, RUN_INTERRUPTED])
+        ).order_by(ProcessingRun.id.desc()).first()
+
+    def get_pending_run_files(self, run_id: int) -> List[RunFile]:
+        return self.db.query(RunFile).filter(
+            RunFile.run_id == run_id,
+            RunFile.state == RUN_FILE_PENDING
+        ).order_by(RunFile.position).all()
+
+    def recover_stale_run_files(self) -> int:
+        """
+        Файлы в состоянии running или writing остались от аварийно завершенного запуска: удаляет их
+        временные папки и следы оборванной замены на хранилище и возвращает файлы в очередь. Файл,
+        на котором сбой повторился MAX_RUN_FILE_ATTEMPTS раз, помечается как failed, чтобы не ронять
+        каждый следующий запуск.
+        """
+        stale_files = self.db.query(RunFile).filter(
+            RunFile.state.in_([RUN_FILE_RUNNING, RUN_FILE_WRITING])).all()
+        for run_file in stale_files:
+            if run_file.temp_dir and os.path.isdir(run_file.temp_dir):
+                shutil.rmtree(run_file.temp_dir, ignore_errors=True)
+            if WriteBackQueue.recover_replace(run_file.file_path):
+                print(f"Исходный файл восстановлен из резервной копии: {run_file.file_path}")
+            run_file.temp_dir = None
+            run_file.state = RUN_FILE_FAILED if run_file.attempts >= MAX_RUN_FILE_ATTEMPTS else RUN_FILE_PENDING
+        if stale_files:
+            self.db.query(ProcessingRun).filter(ProcessingRun.status == RUN_RUNNING).update(
+                {ProcessingRun.status: RUN_INTERRUPTED}, synchronize_session=False)
+            self.db.commit()
+        return len(stale_files)
+
+    def mark_run_file_running(self, run_file: RunFile, temp_dir: str) -> RunFile:
+        run_file.state = RUN_FILE_RUNNING
+        run_file.attempts += 1
+        run_file.temp_dir = temp_dir
+        run_file.started_at = datetime.datetime.now(pytz.timezone('Asia/Novosibirsk'))
+        self.db.commit()
+        return run_file
+
+    def mark_run_file_writing(self, run_file: RunFile) -> RunFile:
+        """Файл сжат, итог станет известен после фоновой замены (mark_run_file_finished)"""
+        run_file.state = RUN_FILE_WRITING
+        run_file.temp_dir = None
+        self.db.commit()
+        return run_file
+
+    def mark_run_file_finished(self, run_file: RunFile, succeeded: bool) -> RunFile:
+        run_file.state = RUN_FILE_DONE if succeeded else RUN_FILE_FAILED
+        run_file.temp_dir = None
+        run_file.finished_at = datetime.datetime.now(pytz.timezone('Asia/Novosibirsk'))
+        self.db.commit()
+        return run_file
+
+    def set_run_status(self, run_id: int, status: str, stop_reason: Optional[str] = None) -> Optional[ProcessingRun]:
+        """Статус запуска; stop_reason - причина остановки по политике запуска (очередь ждет следующего окна)"""
+        run = self.db.query(ProcessingRun).filter(ProcessingRun.id == run_id).first()
+        if run:
+            run.status = status
+            run.stop_reason = stop_reason
+            if status == RUN_COMPLETED:
+                run.finished_at = datetime.datetime.now(pytz.timezone('Asia/Novosibirsk'))
+            self.db.commit()
+        return run
+
+    # Операции с замерами этапов
+    def create_file_timing(self, processed_file_id: int, **stage_fields) -> FileTiming:
+        timing = FileTiming(processed_file_id=processed_file_id, **stage_fields)
+        self.db.add(timing)
+        self.db.commit()
+        return timing
+
+    # Операции со снимками директорий
+    def get_directory_snapshots(self, root_directory: str) -> dict:
+        """Снимки директории и всех ее поддиректорий: нормализованный путь -> DirectorySnapshot"""
+        root = self.normalize_path(root_directory)
+        snapshots = self.db.query(DirectorySnapshot).filter(
+            (DirectorySnapshot.dir_path == root) | DirectorySnapshot.dir_path.like(f"{root}/%")
+        ).all()
+        return {snapshot.dir_path: snapshot for snapshot in snapshots}
+
+    def save_directory_snapshots(self, rows: List[dict], chunk_size: int = 1000):
+        """Создает или обновляет снимки: словари с ключами полей DirectorySnapshot"""
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            existing = {
+                snapshot.dir_path: snapshot
+                for snapshot in self.db.query(DirectorySnapshot).filter(
+                    DirectorySnapshot.dir_path.in_([row["dir_path"] for row in chunk])
+                )
+            }
+            now = datetime.datetime.now(pytz.timezone('Asia/Novosibirsk'))
+            for row in chunk:
+                snapshot = existing.get(row["dir_path"])
+                if snapshot is None:
+                    snapshot = DirectorySnapshot(dir_path=row["dir_path"])
+                    self.db.add(snapshot)
+                for field, value in row.items():
+                    setattr(snapshot, field, value)
+                snapshot.last_scan = now
+            self.db.commit()
+
+    def find_recorded_paths(self, file_paths: List[str], chunk_size: int = 500) -> set:
+        """Какие из указанных файлов уже записаны в processed_files (пути возвращаются как переданы)"""
+        by_hash = {}
+        for file_path, normalized in zip(file_paths, self.normalize_paths(file_paths)):
+            by_hash.setdefault(self.path_hash(normalized), {}).setdefault(
+                self.split_path(normalized), []).append(file_path)
+        hashes = list(by_hash)
+        recorded = set()
+        for start in range(0, len(hashes), chunk_size):
+            rows = self.db.query(ProcessedFile.path_hash, Directory.dir_path, ProcessedFile.file_name).join(
+                Directory
+            ).filter(
+                ProcessedFile.path_hash.in_(hashes[start:start + chunk_size])
+            ).all()
+            # Совпадение хеша проверяется по самому пути
+            for row in rows:
+                recorded.update(by_hash[row.path_hash].get((row.dir_path, row.file_name), ()))
+        return recorded
+
+    def count_recorded_files(self, file_paths: List[str], chunk_size: int = 500) -> int:
+        """Сколько из указанных файлов уже записано в processed_files"""
+        return len(self.find_recorded_paths(file_paths, chunk_size))
 
     # Инициализация базовых данных и миграции
+    def add_to_daily_stats(self, processed_date, setting_id: int, is_successful: bool,
+                           fail_reason_id: Optional[int], file_compression_kbites: float):
+        """Учитывает новый файл в суточной сводке (без commit)"""
+        local_time = processed_date.replace(tzinfo=None)
+        fail_filter = (DailyStats.fail_reason_id.is_(None) if fail_reason_id is None
+                       else DailyStats.fail_reason_id == fail_reason_id)
+        row = self.db.query(DailyStats).filter(
+            DailyStats.day == local_time.date(),
+            DailyStats.setting_id == setting_id,
+            DailyStats.is_successful == is_successful,
+            fail_filter
+        ).first()
+        if row is None:
+            row = DailyStats(day=local_time.date(), setting_id=setting_id, is_successful=is_successful,
+                             fail_reason_id=fail_reason_id, file_count=0, saved_kbytes=0.0,
+                             first_time=local_time, last_time=local_time)
+            self.db.add(row)
+        row.file_count += 1
+        if is_successful and file_compression_kbites and file_compression_kbites > 0:
+            row.saved_kbytes += file_compression_kbites
+        row.first_time = min(row.first_time, local_time)
+        row.last_time = max(row.last_time, local_time)
+
+    def rebuild_daily_stats(self):
+        """Пересчитывает суточную сводку по processed_files одним запросом (после удаления записей)"""
+        from sqlalchemy import func, case, insert
+        day = func.strftime("%Y-%m-%d", ProcessedFile.processed_date)
+        aggregates = self.db.query(
+            day,
+            ProcessedFile.setting_id,
+            ProcessedFile.is_successful,
+            ProcessedFile.fail_reason_id,
+            func.count(ProcessedFile.id),
+            func.coalesce(func.sum(case(
+                (and_(ProcessedFile.is_successful == True, ProcessedFile.file_compression_kbites > 0),
+                 ProcessedFile.file_compression_kbites),
+                else_=0.0
+            )), 0.0),
+            func.min(ProcessedFile.processed_date),
+            func.max(ProcessedFile.processed_date)
+        ).group_by(day, ProcessedFile.setting_id, ProcessedFile.is_successful, ProcessedFile.fail_reason_id)
+        try:
+            self.db.query(DailyStats).delete(synchronize_session=False)
+            self.db.execute(insert(DailyStats).from_select(
+                ["day", "setting_id", "is_successful", "fail_reason_id", "file_count", "saved_kbytes",
+                 "first_time", "last_time"],
+                aggregates
+            ))
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+    def backfill_daily_stats(self) -> bool:
+        """Заполняет суточную сводку по уже накопленной истории (однократно, при пустой таблице)"""
+        try:
+            if self.db.query(DailyStats.id).first() is None and self.db.query(ProcessedFile.id).first() is not None:
+                self.rebuild_daily_stats()
+                print("✅ Таблица daily_stats заполнена по истории обработки")
+            return True
+        except Exception as e:
+            print(f"⚠️ Ошибка заполнения daily_stats: {e}")
+            self.db.rollback()
+            return False
+
+    def get_schema_version(self) -> int:
+        from sqlalchemy import text
+        return self.db.execute(text("PRAGMA user_version")).scalar() or 0
+
+    def set_schema_version(self, version: int):
+        from sqlalchemy import text
+        self.db.execute(text(f"PRAGMA user_version = {int(version)}"))
+        self.db.commit()
+
     def initialize_base_data(self):
-        self.add_ocr_max_pages_column()
-        self.add_kbytes_per_page_border_column()  # ✅ НОВОЕ
-        self.add_file_pages_and_origin_size_columns()  # ✅ НОВОЕ
+        if self.get_schema_version() >= SCHEMA_VERSION:
+            return
+
+        # Шаги выполняются все, даже после ошибки одного из них: каждый проверяет, что уже сделано.
+        # migrate_to_interned_paths при ошибке прерывает запуск - без него схема processed_files неверна
+        self.migrate_to_interned_paths()
+        migration_results = [
+            self.add_ocr_max_pages_column(),
+            self.add_kbytes_per_page_border_column(),  # ✅ НОВОЕ
+            self.add_file_pages_and_origin_size_columns(),  # ✅ НОВОЕ
+            self.add_compression_tier_column(),
+            self.add_adaptive_timeout_columns(),
+            self.add_memory_budget_column(),
+            self.add_io_throttle_columns(),
+            self.add_timing_columns(),
+            self.add_run_policy_columns(),
+            self.add_race_levels_column(),
+            self.rebuild_setting_unique_constraint(),
+            self.backfill_daily_stats(),
+            self.add_path_dimension_columns(),
+            self.backfill_path_dimensions() is not None,
+        ]
         
         # Создаем причины ошибок
         fail_reasons = [
@@ -226,11 +692,13 @@ class DBOperations:
             {"name": "прочая причина", 
              "info": "Другие причины ошибок при обработки файла"},
             {"name": "превышен лимит размера страницы",  # ✅ НОВОЕ
-             "info": "Файл пропущен, так как размер страницы превышает установленный лимит"}
+             "info": "Файл пропущен, так как размер страницы превышает установленный лимит"},
+            {"name": "недостаточно памяти для обработки",
+             "info": "Оценка памяти задания не уместилась в бюджет или свободную память за время ожидания"}
         ]
 
         for reason_data in fail_reasons:
-            if not self.get_fail_reason_by_name(reason_data["name"]):
+            if not self.db.query(FailReason).filter(FailReason.name == reason_data["name"]).first():
                 fail_reason = FailReason(**reason_data)
                 self.db.add(fail_reason)
 
@@ -248,6 +716,8 @@ class DBOperations:
             {"id": 3, "name": "Только изображения", "description": "Оптимизация только изображений", "is_ocr_enabled": False},
             {"id": 4, "name": "Tesseract OCR", "description": "Распознавание текста и создание поискового PDF", "is_ocr_enabled": True},
             {"id": 5, "name": "Tesseract + Ghostscript", "description": "OCR + последующее сжатие", "is_ocr_enabled": True},
+            {"id": 6, "name": "Каскад", "description": "Сначала очистка без потерь, затем Ghostscript ур.2, ур.1 и OCR+GS - пока экономия ниже порога", "is_ocr_enabled": False},
+            {"id": 7, "name": "Гонка стратегий", "description": "Для больших файлов: уровни Ghostscript из настройки запускаются параллельно, остается самый маленький результат", "is_ocr_enabled": False},
         ]
         
         for method_info in method_data:
@@ -265,6 +735,7 @@ class DBOperations:
                 existing_method.is_ocr_enabled = method_info["is_ocr_enabled"]
 
         self.db.commit()
+        self.invalidate_reference_cache()
 
         # Создаем настройку по умолчанию, если нет активных
         if not self.get_active_setting():
@@ -283,70 +754,80 @@ class DBOperations:
                 activate=True
             )
 
+        # Версия записывается, только если все миграции прошли: иначе они повторятся при следующем запуске
+        if all(migration_results):
+            self.set_schema_version(SCHEMA_VERSION)
+        else:
+            print("⚠️ Не все миграции БД выполнены - они будут повторены при следующем запуске")
+
     def normalize_path(self, file_path: str) -> str:
         """
-        Улучшенная нормализация пути для сетевых и локальных путей
+        Улучшенная нормализация пути для сетевых и локальных путей (path_normalizer.py)
         """
-        try:
-            # Приводим к абсолютному пути, если это возможно
-            try:
-                abs_path = os.path.abspath(file_path)
-            except:
-                abs_path = file_path
-            
-            # Заменяем обратные слеши на прямые
-            normalized = abs_path.replace('\\', '/')
-            
-            # Для Windows путей (включая сетевые) приводим к нижнему регистру
-            if os.name == 'nt' or normalized.startswith('//'):
-                normalized = normalized.lower()
-            
-            # Удаляем лишние слеши в конце
-            normalized = normalized.rstrip('/')
-            
-            # Нормализуем сетевые пути (//server/share -> //server/share)
-            if normalized.startswith('//') and not normalized.startswith('///'):
-                # Оставляем как есть, просто убираем лишние слеши
-                normalized = re.sub(r'/+', '/', normalized)
-            
-            # Убираем возможные дублирующиеся слеши
-            normalized = re.sub(r'/+', '/', normalized)
-            
-            return normalized
-            
-        except Exception as e:
-            print(f"Ошибка нормализации пути {file_path}: {e}")
-            # Возвращаем упрощенную версию в случае ошибки
-            return file_path.replace('\\', '/').lower()
+        return normalize_path(file_path)
+
+    def normalize_paths(self, file_paths: List[str]) -> List[str]:
+        """Нормализует пакет путей за один вызов"""
+        return normalize_paths(file_paths)
 
-    def normalize_existing_paths(self):
-        """Нормализует пути в существующих записях и удаляет дубликаты"""
+    def normalize_existing_paths(self, chunk_size: int = 5000):
+        """
+        Нормализует пути в существующих записях и удаляет дубликаты. Записи читаются порциями по id.
+        Уже нормализованные пути уникальны (ограничение uq_processed_file_path), поэтому дубликатом
+        может оказаться только запись, путь которой меняется: она удаляется, если нормализованный
+        путь уже есть в БД или занят другой измененной записью
+        """
         try:
-            all_files = self.db.query(ProcessedFile).all()
-            print(f"Всего записей до нормализации: {len(all_files)}")
-
-            unique_paths = {}
-            duplicates_to_remove = []
-
-            for pf in all_files:
-                normalized = self.normalize_path(pf.file_full_path)
-
-                if normalized in unique_paths:
-                    print(f"Найден дубликат: {pf.file_full_path} -> {normalized}")
-                    duplicates_to_remove.append(pf.id)
-                else:
-                    unique_paths[normalized] = pf.id
-                    if normalized != pf.file_full_path:
-                        pf.file_full_path = normalized
-                        print(f"Обновлен путь: {pf.file_full_path} -> {normalized}")
-
-            if duplicates_to_remove:
-                print(f"Удаляем {len(duplicates_to_remove)} дубликатов")
-                self.db.query(ProcessedFile).filter(
-                    ProcessedFile.id.in_(duplicates_to_remove)
-                ).delete(synchronize_session=False)
+            total = 0
+            updated = 0
+            claimed = {}  # новый нормализованный путь -> id измененной записи
+            duplicates_removed = 0
+            last_id = 0
+            while True:
+                rows = self.db.query(ProcessedFile.id, Directory.dir_path, ProcessedFile.file_name).join(
+                    Directory
+                ).filter(
+                    ProcessedFile.id > last_id
+                ).order_by(ProcessedFile.id).limit(chunk_size).all()
+                if not rows:
+                    break
+                total += len(rows)
+                last_id = rows[-1].id
 
-            self.db.commit()
+                file_paths = [f"{row.dir_path}/{row.file_name}" for row in rows]
+                updates = []
+                duplicates_to_remove = []
+                for row, file_full_path, normalized in zip(rows, file_paths, self.normalize_paths(file_paths)):
+                    if normalized == file_full_path:
+                        continue
+                    if normalized in claimed or self.find_processed_file(normalized) is not None:
+                        print(f"Найден дубликат: {file_full_path} -> {normalized}")
+                        duplicates_to_remove.append(row.id)
+                        continue
+                    claimed[normalized] = row.id
+                    dir_path, file_name = self.split_path(normalized)
+                    updates.append({
+                        "id": row.id,
+                        "directory_id": self.intern_directory(dir_path),
+                        "file_name": file_name,
+                        "path_hash": self.path_hash(normalized),
+                        **path_dimensions(normalized)
+                    })
+                    print(f"Обновлен путь: {file_full_path} -> {normalized}")
+
+                if duplicates_to_remove:
+                    self.db.query(ProcessedFile).filter(
+                        ProcessedFile.id.in_(duplicates_to_remove)
+                    ).delete(synchronize_session=False)
+                if updates:
+                    self.db.bulk_update_mappings(ProcessedFile, updates)
+                self.db.commit()
+                updated += len(updates)
+                duplicates_removed += len(duplicates_to_remove)
+
+            print(f"Всего записей: {total}, обновлено путей: {updated}, удалено дубликатов: {duplicates_removed}")
+            if duplicates_removed:
+                self.rebuild_daily_stats()
             print("Миграция завершена успешно")
         except Exception as e:
             print(f"Ошибка миграции: {e}")
@@ -358,10 +839,11 @@ class DBOperations:
         from sqlalchemy import func
 
         duplicates = self.db.query(
-            ProcessedFile.file_full_path,
+            Directory.dir_path + '/' + ProcessedFile.file_name,
             func.count(ProcessedFile.id)
-        ).group_by(
-            ProcessedFile.file_full_path
+        ).join(Directory).group_by(
+            ProcessedFile.directory_id,
+            ProcessedFile.file_name
         ).having(
             func.count(ProcessedFile.id) > 1
         ).all()
@@ -372,19 +854,25 @@ class DBOperations:
 
         return len(duplicates) == 0
     
-    def add_ocr_max_pages_column(self):
+    def add_ocr_max_pages_column(self) -> bool:
         """Добавляет поле ocr_max_pages в таблицу setting, если его нет"""
         from sqlalchemy import inspect, text
-        inspector = inspect(self.db.bind)
-        columns = [col['name'] for col in inspector.get_columns('setting')]
-        
-        if 'ocr_max_pages' not in columns:
-            self.db.execute(text("ALTER TABLE setting ADD COLUMN ocr_max_pages INTEGER DEFAULT 120 NOT NULL"))
-            self.db.commit()
-            print("✅ Поле ocr_max_pages добавлено в таблицу setting")
+        try:
+            inspector = inspect(self.db.bind)
+            columns = [col['name'] for col in inspector.get_columns('setting')]
+
+            if 'ocr_max_pages' not in columns:
+                self.db.execute(text("ALTER TABLE setting ADD COLUMN ocr_max_pages INTEGER DEFAULT 120 NOT NULL"))
+                self.db.commit()
+                print("✅ Поле ocr_max_pages добавлено в таблицу setting")
+            return True
+        except Exception as e:
+            print(f"⚠️ Ошибка при добавлении ocr_max_pages: {e}")
+            self.db.rollback()
+            return False
     
     # ✅ НОВЫЙ МЕТОД МИГРАЦИИ
-    def add_kbytes_per_page_border_column(self):
+    def add_kbytes_per_page_border_column(self) -> bool:
         """Добавляет поле kbytes_per_page_border в таблицу setting, если его нет"""
         from sqlalchemy import inspect, text
         try:
@@ -397,12 +885,14 @@ class DBOperations:
                 ))
                 self.db.commit()
                 print("✅ Поле kbytes_per_page_border добавлено в таблицу setting")
+            return True
         except Exception as e:
             print(f"⚠️ Ошибка при добавлении kbytes_per_page_border: {e}")
             self.db.rollback()
+            return False
     
     # ✅ НОВЫЙ МЕТОД МИГРАЦИИ
-    def add_file_pages_and_origin_size_columns(self):
+    def add_file_pages_and_origin_size_columns(self) -> bool:
         """Добавляет поля file_pages и file_origin_size_kbytes в таблицу processed_files"""
         from sqlalchemy import inspect, text
         try:
@@ -422,7 +912,366 @@ class DBOperations:
                 print("✅ Поле file_origin_size_kbytes добавлено в таблицу processed_files")
             
             self.db.commit()
+            return True
         except Exception as e:
             print(f"⚠️ Ошибка при добавлении полей в processed_files: {e}")
             self.db.rollback()
-            
\ No newline at end of file
+            return False
+
+    def add_compression_tier_column(self) -> bool:
+        """Добавляет поле compression_tier в таблицу processed_files"""
+        from sqlalchemy import inspect, text
+        try:
+            inspector = inspect(self.db.bind)
+            columns = [col['name'] for col in inspector.get_columns('processed_files')]
+
+            if 'compression_tier' not in columns:
+                self.db.execute(text(
+                    "ALTER TABLE processed_files ADD COLUMN compression_tier VARCHAR(50) DEFAULT NULL"
+                ))
+                self.db.commit()
+                print("✅ Поле compression_tier добавлено в таблицу processed_files")
+            return True
+        except Exception as e:
+            print(f"⚠️ Ошибка при добавлении compression_tier: {e}")
+            self.db.rollback()
+            return False
+
+    def add_path_dimension_columns(self) -> bool:
+        """Добавляет в processed_files индексированные поля department, department_legacy и top_folder"""
+        from sqlalchemy import inspect, text
+        try:
+            inspector = inspect(self.db.bind)
+            columns = [col['name'] for col in inspector.get_columns('processed_files')]
+
+            for column, column_type in (('department', 'VARCHAR(100)'), ('department_legacy', 'VARCHAR(100)'),
+                                        ('top_folder', 'VARCHAR(200)')):
+                if column not in columns:
+                    self.db.execute(text(
+                        f"ALTER TABLE processed_files ADD COLUMN {column} {column_type} DEFAULT NULL"
+                    ))
+                    print(f"✅ Поле {column} добавлено в таблицу processed_files")
+                self.db.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS ix_processed_files_{column} ON processed_files ({column})"
+                ))
+            self.db.commit()
+            return True
+        except Exception as e:
+            print(f"⚠️ Ошибка при добавлении полей отдела: {e}")
+            self.db.rollback()
+            return False
+
+    def migrate_to_interned_paths(self, chunk_size: int = 5000):
+        """
+        Переводит processed_files со столбца file_full_path (String(200), unique) на directory_id,
+        file_name и path_hash. SQLite не удаляет столбцы с ограничениями, поэтому таблица
+        пересоздается: новая таблица заполняется порциями, старая удаляется, новая переименовывается.
+        id записей сохраняются - ссылки file_timing остаются верными
+        """
+        from sqlalchemy import inspect, text, insert, MetaData
+        from models.database import Base
+        inspector = inspect(self.db.bind)
+        old_columns = [col['name'] for col in inspector.get_columns('processed_files')]
+        if 'file_full_path' not in old_columns:
+            return
+
+        # Копия схемы во временных метаданных: новая таблица под другим именем и пока без индексов
+        metadata = MetaData()
+        for table in Base.metadata.sorted_tables:
+            table.to_metadata(metadata)
+        new_table = ProcessedFile.__table__.to_metadata(metadata, name="processed_files_new")
+        for index in list(new_table.indexes):
+            new_table.indexes.discard(index)
+        copied_columns = [name for name in old_columns if name in new_table.c and name != 'file_full_path']
+
+        try:
+            connection = self.db.connection()
+            new_table.drop(connection, checkfirst=True)
+            new_table.create(connection)
+            # Папка, имя и хеш вычисляются порциями во временную таблицу, остальные поля
+            # переносятся одним INSERT ... SELECT без преобразования значений
+            self.db.execute(text(
+                "CREATE TEMP TABLE IF NOT EXISTS path_split "
+                "(id INTEGER PRIMARY KEY, directory_id INTEGER, file_name TEXT, path_hash INTEGER)"
+            ))
+            self.db.execute(text("DELETE FROM path_split"))
+            directory_ids = {}
+            migrated = 0
+            last_id = 0
+            while True:
+                rows = self.db.execute(text(
+                    "SELECT id, file_full_path FROM processed_files WHERE id > :last_id ORDER BY id LIMIT :limit"
+                ), {"last_id": last_id, "limit": chunk_size}).all()
+                if not rows:
+                    break
+                records = []
+                for row_id, file_full_path in rows:
+                    dir_path, file_name = self.split_path(file_full_path)
+                    directory_id = directory_ids.get(dir_path)
+                    if directory_id is None:
+                        directory_id = self.db.execute(
+                            insert(Directory).values(dir_path=dir_path)
+                        ).inserted_primary_key[0]
+                        directory_ids[dir_path] = directory_id
+                    records.append({"id": row_id, "directory_id": directory_id, "file_name": file_name,
+                                    "path_hash": self.path_hash(file_full_path)})
+                self.db.execute(text(
+                    "INSERT INTO path_split (id, directory_id, file_name, path_hash) "
+                    "VALUES (:id, :directory_id, :file_name, :path_hash)"
+                ), records)
+                migrated += len(rows)
+                last_id = rows[-1][0]
+
+            columns = ", ".join(copied_columns)
+            source_columns = ", ".join(f"p.{name}" for name in copied_columns)
+            self.db.execute(text(
+                f"INSERT INTO processed_files_new ({columns}, directory_id, file_name, path_hash) "
+                f"SELECT {source_columns}, s.directory_id, s.file_name, s.path_hash "
+                f"FROM processed_files p JOIN path_split s ON s.id = p.id"
+            ))
+            self.db.execute(text("DROP TABLE path_split"))
+            self.db.execute(text("DROP TABLE processed_files"))
+            self.db.execute(text("ALTER TABLE processed_files_new RENAME TO processed_files"))
+            for index in ProcessedFile.__table__.indexes:
+                index.create(connection, checkfirst=True)
+            self.db.commit()
+            self._directory_ids.update(directory_ids)
+            print(f"✅ Пути {migrated} записей processed_files разделены на папку и имя файла "
+                  f"({len(directory_ids)} папок)")
+        except Exception as e:
+            print(f"⚠️ Ошибка перевода processed_files на таблицу directory: {e}")
+            self.db.rollback()
+            raise
+        try:
+            # Освобождаем место, занятое старой таблицей и ее индексом по полному пути
+            self.db.execute(text("VACUUM"))
+            self.db.commit()
+        except Exception as e:
+            print(f"⚠️ VACUUM после перевода путей не выполнен: {e}")
+            self.db.rollback()
+
+    def backfill_path_dimensions(self, chunk_size: int = 5000, reclassify: bool = False) -> Optional[int]:
+        """
+        Заполняет измерения пути у записей, где они не вычислены (reclassify=True - у всех,
+        после изменения правил). Записи обрабатываются порциями по id. Возвращает число обновленных
+        или None при ошибке
+        """
+        updated = 0
+        last_id = 0
+        try:
+            while True:
+                query = self.db.query(ProcessedFile.id, Directory.dir_path, ProcessedFile.file_name).join(
+                    Directory
+                ).filter(
+                    ProcessedFile.id > last_id
+                )
+                if not reclassify:
+                    query = query.filter(or_(ProcessedFile.department.is_(None),
+                                             ProcessedFile.department_legacy.is_(None)))
+                rows = query.order_by(ProcessedFile.id).limit(chunk_size).all()
+                if not rows:
+                    break
+                self.db.bulk_update_mappings(ProcessedFile, [
+                    {"id": row.id, **path_dimensions(f"{row.dir_path}/{row.file_name}")} for row in rows
+                ])
+                self.db.commit()
+                updated += len(rows)
+                last_id = rows[-1].id
+            if updated:
+                print(f"✅ Отдел определен для {updated} записей processed_files")
+        except Exception as e:
+            print(f"⚠️ Ошибка заполнения отделов: {e}")
+            self.db.rollback()
+            return None
+        return updated
+
+    def add_adaptive_timeout_columns(self) -> bool:
+        """Добавляет поле adaptive_timeout в setting и поля времени обработки в processed_files"""
+        from sqlalchemy import inspect, text
+        try:
+            inspector = inspect(self.db.bind)
+            setting_columns = [col['name'] for col in inspector.get_columns('setting')]
+            file_columns = [col['name'] for col in inspector.get_columns('processed_files')]
+
+            if 'adaptive_timeout' not in setting_columns:
+                self.db.execute(text(
+                    "ALTER TABLE setting ADD COLUMN adaptive_timeout BOOLEAN DEFAULT 0 NOT NULL"
+                ))
+                print("✅ Поле adaptive_timeout добавлено в таблицу setting")
+
+            if 'processing_seconds' not in file_columns:
+                self.db.execute(text(
+                    "ALTER TABLE processed_files ADD COLUMN processing_seconds FLOAT DEFAULT NULL"
+                ))
+                print("✅ Поле processing_seconds добавлено в таблицу processed_files")
+
+            if 'timeout_secs' not in file_columns:
+                self.db.execute(text(
+                    "ALTER TABLE processed_files ADD COLUMN timeout_secs FLOAT DEFAULT NULL"
+                ))
+                print("✅ Поле timeout_secs добавлено в таблицу processed_files")
+
+            self.db.commit()
+            return True
+        except Exception as e:
+            print(f"⚠️ Ошибка при добавлении полей адаптивного таймаута: {e}")
+            self.db.rollback()
+            return False
+
+    def add_memory_budget_column(self) -> bool:
+        """Добавляет поле memory_budget_mb в таблицу setting"""
+        from sqlalchemy import inspect, text
+        try:
+            inspector = inspect(self.db.bind)
+            columns = [col['name'] for col in inspector.get_columns('setting')]
+
+            if 'memory_budget_mb' not in columns:
+                self.db.execute(text(
+                    "ALTER TABLE setting ADD COLUMN memory_budget_mb INTEGER DEFAULT 0 NOT NULL"
+                ))
+                self.db.commit()
+                print("✅ Поле memory_budget_mb добавлено в таблицу setting")
+            return True
+        except Exception as e:
+            print(f"⚠️ Ошибка при добавлении memory_budget_mb: {e}")
+            self.db.rollback()
+            return False
+
+    def add_io_throttle_columns(self) -> bool:
+        """Добавляет потолки нагрузки на хранилище в таблицу setting"""
+        from sqlalchemy import inspect, text
+        try:
+            inspector = inspect(self.db.bind)
+            columns = [col['name'] for col in inspector.get_columns('setting')]
+
+            for column in ('io_max_mb_per_sec', 'io_max_files_per_sec'):
+                if column not in columns:
+                    self.db.execute(text(
+                        f"ALTER TABLE setting ADD COLUMN {column} FLOAT DEFAULT 0 NOT NULL"
+                    ))
+                    print(f"✅ Поле {column} добавлено в таблицу setting")
+
+            self.db.commit()
+            return True
+        except Exception as e:
+            print(f"⚠️ Ошибка при добавлении полей ограничения нагрузки: {e}")
+            self.db.rollback()
+            return False
+
+    def add_run_policy_columns(self) -> bool:
+        """Добавляет политику запуска (окно обработки, бюджеты) в setting и причину остановки в processing_run"""
+        from sqlalchemy import inspect, text
+        try:
+            inspector = inspect(self.db.bind)
+            setting_columns = [col['name'] for col in inspector.get_columns('setting')]
+            run_columns = [col['name'] for col in inspector.get_columns('processing_run')]
+
+            for column, column_type in (('run_window_start', "VARCHAR(5) DEFAULT '' NOT NULL"),
+                                        ('run_window_end', "VARCHAR(5) DEFAULT '' NOT NULL"),
+                                        ('run_max_hours', "FLOAT DEFAULT 0 NOT NULL"),
+                                        ('run_max_read_gb', "FLOAT DEFAULT 0 NOT NULL"),
+                                        ('run_max_cpu_hours', "FLOAT DEFAULT 0 NOT NULL")):
+                if column not in setting_columns:
+                    self.db.execute(text(f"ALTER TABLE setting ADD COLUMN {column} {column_type}"))
+                    print(f"✅ Поле {column} добавлено в таблицу setting")
+
+            if 'stop_reason' not in run_columns:
+                self.db.execute(text(
+                    "ALTER TABLE processing_run ADD COLUMN stop_reason VARCHAR(100) DEFAULT NULL"
+                ))
+                print("✅ Поле stop_reason добавлено в таблицу processing_run")
+
+            self.db.commit()
+            return True
+        except Exception as e:
+            print(f"⚠️ Ошибка при добавлении полей политики запуска: {e}")
+            self.db.rollback()
+            return False
+
+    def add_race_levels_column(self) -> bool:
+        """Добавляет уровни гонки стратегий в таблицу setting"""
+        from sqlalchemy import inspect, text
+        try:
+            inspector = inspect(self.db.bind)
+            columns = [col['name'] for col in inspector.get_columns('setting')]
+
+            if 'race_levels' not in columns:
+                self.db.execute(text(
+                    "ALTER TABLE setting ADD COLUMN race_levels VARCHAR(20) DEFAULT '1,2,3' NOT NULL"
+                ))
+                self.db.commit()
+                print("✅ Поле race_levels добавлено в таблицу setting")
+            return True
+        except Exception as e:
+            print(f"⚠️ Ошибка при добавлении race_levels: {e}")
+            self.db.rollback()
+            return False
+
+    def add_timing_columns(self) -> bool:
+        """Добавляет флаг collect_timings в setting и время сканирования в processing_run"""
+        from sqlalchemy import inspect, text
+        try:
+            inspector = inspect(self.db.bind)
+            setting_columns = [col['name'] for col in inspector.get_columns('setting')]
+            run_columns = [col['name'] for col in inspector.get_columns('processing_run')]
+
+            if 'collect_timings' not in setting_columns:
+                self.db.execute(text(
+                    "ALTER TABLE setting ADD COLUMN collect_timings BOOLEAN DEFAULT 0 NOT NULL"
+                ))
+                print("✅ Поле collect_timings добавлено в таблицу setting")
+
+            if 'scan_seconds' not in run_columns:
+                self.db.execute(text(
+                    "ALTER TABLE processing_run ADD COLUMN scan_seconds FLOAT DEFAULT NULL"
+                ))
+                print("✅ Поле scan_seconds добавлено в таблицу processing_run")
+
+            self.db.commit()
+            return True
+        except Exception as e:
+            print(f"⚠️ Ошибка при добавлении полей замера этапов: {e}")
+            self.db.rollback()
+            return False
+
+    def rebuild_setting_unique_constraint(self):
+        """
+        Приводит uq_setting_combination к модели Setting. Поля, добавленные через ALTER TABLE, не
+        попадают в ограничение существующей таблицы SQLite, и настройка, отличающаяся только ими,
+        нарушала бы старое ограничение. Таблица пересоздается с ограничением модели, строки
+        переносятся с прежними id
+        """
+        import re
+        from sqlalchemy import inspect, text
+        from sqlalchemy.schema import CreateIndex, CreateTable
+        try:
+            model_columns = next(set(constraint.columns.keys()) for constraint in Setting.__table__.constraints
+                                 if constraint.name == 'uq_setting_combination')
+            inspector = inspect(self.db.bind)
+            unique_sets = [set(constraint['column_names'])
+                           for constraint in inspector.get_unique_constraints('setting')]
+            unique_sets += [set(index['column_names']) for index in inspector.get_indexes('setting')
+                            if index['unique']]
+            if unique_sets and all(columns == model_columns for columns in unique_sets):
+                return True
+
+            existing_columns = {col['name'] for col in inspector.get_columns('setting')}
+            columns = ", ".join(column.name for column in Setting.__table__.columns
+                                if column.name in existing_columns)
+            create_sql = str(CreateTable(Setting.__table__).compile(self.db.bind))
+            create_sql = re.sub(r"CREATE TABLE setting\b", "CREATE TABLE setting_rebuild", create_sql, count=1)
+
+            self.db.execute(text("DROP TABLE IF EXISTS setting_rebuild"))
+            self.db.execute(text(create_sql))
+            self.db.execute(text(f"INSERT INTO setting_rebuild ({columns}) SELECT {columns} FROM setting"))
+            self.db.execute(text("DROP TABLE setting"))
+            self.db.execute(text("ALTER TABLE setting_rebuild RENAME TO setting"))
+            for index in Setting.__table__.indexes:
+                self.db.execute(CreateIndex(index))
+            self.db.commit()
+            print("✅ Ограничение uq_setting_combination таблицы setting обновлено")
+            return True
+        except Exception as e:
+            print(f"⚠️ Ошибка при обновлении ограничения uq_setting_combination: {e}")
+            self.db.rollback()
+            return False
@@ -0,0 +1,130 @@
+# directory_index.py
+import json
+import os
+
+# Максимальная глубина обхода по настройке nesting_depth (None - без ограничения)
+MAX_DEPTH_BY_SETTING = {1: 0, 2: 1, 3: 2}
+
+
+class DirectoryIndex:
+    """
+    Инкрементальное сканирование по снимкам директорий (таблица directory_snapshot).
+    Директория, у которой не изменился mtime и все PDF уже записаны в processed_files,
+    не листается: список ее поддиректорий берется из снимка, на каждую тратится один stat.
+    Архивные папки прошлых лет, где ничего не меняется, обходятся без чтения содержимого.
+    """
+
+    def __init__(self, db_ops, collect_sizes=False):
+        self.db_ops = db_ops
+        self.listed = {}  # нормализованный путь -> (путь, mtime, число записей, имена PDF, поддиректории)
+        self.reused_dirs = 0
+        # Размеры найденных PDF (путь -> байт) из данных листинга: в Windows - без лишних запросов к хранилищу
+        self.collect_sizes = collect_sizes
+        self.file_sizes = {}
+
+    def scan(self, directory, depth):
+        """Возвращает PDF файлы директории с учетом глубины, пропуская неизменившиеся обработанные папки"""
+        max_depth = MAX_DEPTH_BY_SETTING.get(depth)
+        snapshots = self.db_ops.get_directory_snapshots(directory)
+        self.listed = {}
+        self.reused_dirs = 0
+        self.file_sizes = {}
+        pdf_files = []
+
+        stack = [(directory, 0)]
+        while stack:
+            path, level = stack.pop()
+            key = self.db_ops.normalize_path(path)
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                continue
+
+            snapshot = snapshots.get(key)
+            if snapshot is not None and snapshot.is_complete and snapshot.mtime == mtime:
+                subdirs = json.loads(snapshot.subdirs or "[]")
+                self.reused_dirs += 1
+            else:
+                sizes = {} if self.collect_sizes else None
+                try:
+                    entry_count, pdf_names, subdirs = self.list_directory(path, sizes)
+                except OSError:
+                    continue
+                self.listed[key] = (path, mtime, entry_count, pdf_names, subdirs)
+                pdf_files.extend(os.path.join(path, name) for name in pdf_names)
+                if sizes:
+                    self.file_sizes.update((os.path.join(path, name), size) for name, size in sizes.items())
+
+            if max_depth is None or level < max_depth:
+                stack.extend((os.path.join(path, name), level + 1) for name in reversed(subdirs))
+
+        self.db_ops.save_directory_snapshots([
+            {
+                "dir_path": key,
+                "mtime": mtime,
+                "entry_count": entry_count,
+                "pdf_count": len(pdf_names),
+                "subdirs": json.dumps(subdirs, ensure_ascii=False),
+                "is_complete": False
+            }
+            for key, (path, mtime, entry_count, pdf_names, subdirs) in self.listed.items()
+        ])
+        return pdf_files
+
+    @staticmethod
+    def list_directory(path, sizes=None):
+        """
+        Число записей, отсортированные имена PDF и поддиректорий (ссылки на папки не обходятся, как в os.walk).
+        sizes - словарь, в который записываются размеры PDF по именам
+        """
+        entry_count = 0
+        pdf_names = []
+        subdirs = []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                entry_count += 1
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    if not entry.is_symlink():
+                        subdirs.append(entry.name)
+                elif entry.name.lower().endswith('.pdf'):
+                    pdf_names.append(entry.name)
+                    if sizes is not None:
+                        try:
+                            sizes[entry.name] = entry.stat().st_size
+                        except OSError:
+                            pass
+        return entry_count, sorted(pdf_names), sorted(subdirs)
+
+    def mark_complete(self):
+        """
+        После завершенного запуска помечает пролистанные директории как обработанные.
+        Замена файлов меняет mtime директории, поэтому снимок обновляется, только если
+        состав PDF и поддиректорий не изменился с момента сканирования и все PDF есть в БД.
+        Возвращает число директорий, помеченных обработанными.
+        """
+        rows = []
+        for key, (path, _, _, pdf_names, subdirs) in self.listed.items():
+            try:
+                mtime = os.stat(path).st_mtime
+                entry_count, current_pdfs, current_subdirs = self.list_directory(path)
+            except OSError:
+                continue
+            if current_pdfs != pdf_names or current_subdirs != subdirs:
+                continue  # в директорию что-то добавили во время запуска - при следующем скане она будет пролистана
+            pdf_paths = [os.path.join(path, name) for name in pdf_names]
+            if self.db_ops.count_recorded_files(pdf_paths) < len(pdf_paths):
+                continue
+            rows.append({
+                "dir_path": key,
+                "mtime": mtime,
+                "entry_count": entry_count,
+                "pdf_count": len(pdf_names),
+                "subdirs": json.dumps(subdirs, ensure_ascii=False),
+                "is_complete": True
+            })
+        self.db_ops.save_directory_snapshots(rows)
+        return len(rows)
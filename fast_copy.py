@@ -0,0 +1,151 @@
+# fast_copy.py
+import errno
+import hashlib
+import mmap
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+# Буфер копирования через пространство пользователя (кратен странице; shutil - 64 КБ, в Windows 1 МБ)
+COPY_BUFFER_SIZE = 8 * 1024 * 1024
+
+# Параллельное чтение: файл читается частями по PARALLEL_CHUNK_SIZE в нескольких потоках -
+# на сетевой папке с большой задержкой запросы к серверу идут одновременно. Только для крупных файлов
+PARALLEL_MIN_SIZE = 64 * 1024 * 1024
+PARALLEL_CHUNK_SIZE = 16 * 1024 * 1024
+
+CHECKSUM_ALGORITHM = "blake2b"
+
+# Ошибки, при которых копирование ядром недоступно для этой пары файлов (ФС, версия ядра)
+_KERNEL_COPY_UNSUPPORTED = {errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.EBADF, errno.ENOTSUP,
+                            getattr(errno, "EOPNOTSUPP", errno.ENOTSUP), errno.ETXTBSY, errno.EPERM}
+
+
+def copy_file(src, dst, workers=1):
+    """
+    Копирует файл src в файл dst вместе с временем изменения и правами (как shutil.copy2).
+    Данные копируются ядром (copy_file_range, затем sendfile), без них - через буфер
+    COPY_BUFFER_SIZE. workers > 1 - параллельное чтение файлов от PARALLEL_MIN_SIZE.
+    Подходит как copy_function для shutil.move. Возвращает dst
+    """
+    _copy(src, dst, workers, None)
+    return dst
+
+
+def copy_file_with_checksum(src, dst, workers=1, algorithm=CHECKSUM_ALGORITHM):
+    """Копирует файл как copy_file и возвращает контрольную сумму данных (hex), посчитанную за тот же проход"""
+    hasher = hashlib.new(algorithm)
+    _copy(src, dst, workers, hasher)
+    return hasher.hexdigest()
+
+
+def file_checksum(path, algorithm=CHECKSUM_ALGORITHM):
+    """Контрольная сумма данных файла (hex) - для сверки с copy_file_with_checksum"""
+    hasher = hashlib.new(algorithm)
+    with open(path, "rb") as source, mmap.mmap(-1, COPY_BUFFER_SIZE) as buffer:
+        view = memoryview(buffer)
+        try:
+            while True:
+                read = source.readinto(view)
+                if not read:
+                    break
+                hasher.update(view[:read])
+        finally:
+            view.release()
+    return hasher.hexdigest()
+
+
+def _copy(src, dst, workers, hasher):
+    with open(src, "rb") as source, open(dst, "wb") as target:
+        size = os.fstat(source.fileno()).st_size
+        if workers > 1 and size >= PARALLEL_MIN_SIZE:
+            _copy_parallel(src, size, target, workers, hasher)
+        elif hasher is not None or not _copy_kernel(source.fileno(), target.fileno(), size):
+            _copy_buffered(source, target, hasher)
+    shutil.copystat(src, dst)
+
+
+def _copy_kernel(src_fd, dst_fd, size):
+    """
+    Копирование без передачи данных через Python. False - ядро не может скопировать эти файлы
+    (ничего не записано, нужен обычный способ)
+    """
+    for name in ("copy_file_range", "sendfile"):
+        kernel_copy = getattr(os, name, None)
+        if kernel_copy is None:
+            continue
+        copied = 0
+        try:
+            while copied < size:
+                if name == "copy_file_range":
+                    sent = kernel_copy(src_fd, dst_fd, min(size - copied, 1 << 30))
+                else:
+                    sent = kernel_copy(dst_fd, src_fd, copied, min(size - copied, 1 << 30))
+                if sent == 0:
+                    break  # файл укоротился во время копирования - копируем, сколько есть
+                copied += sent
+        except OSError as e:
+            if copied or e.errno not in _KERNEL_COPY_UNSUPPORTED:
+                raise
+            continue
+        if copied == 0 and size > 0:
+            continue  # ФС не отдает данные этим вызовом (например, виртуальные файлы)
+        return True
+    return False
+
+
+def _copy_buffered(source, target, hasher):
+    # Анонимный mmap выровнен по странице - чтение крупными выровненными блоками
+    with mmap.mmap(-1, COPY_BUFFER_SIZE) as buffer:
+        view = memoryview(buffer)
+        try:
+            while True:
+                read = source.readinto(view)
+                if not read:
+                    break
+                chunk = view[:read]
+                if hasher is not None:
+                    hasher.update(chunk)
+                target.write(chunk)
+                chunk.release()
+        finally:
+            view.release()
+
+
+def _read_chunk(src, offset, length):
+    # Каждая часть читается своим дескриптором: позиция чтения у потоков не общая (в Windows нет pread)
+    with open(src, "rb", buffering=0) as source:
+        source.seek(offset)
+        data = bytearray(length)
+        view = memoryview(data)
+        filled = 0
+        while filled < length:
+            read = source.readinto(view[filled:])
+            if not read:
+                break
+            filled += read
+        view.release()
+        del data[filled:]
+        return data
+
+
+def _copy_parallel(src, size, target, workers, hasher):
+    """Части читаются параллельно, пишутся и хешируются по порядку; в памяти не больше 2 частей на поток"""
+    offsets = range(0, size, PARALLEL_CHUNK_SIZE)
+    window = workers * 2
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fast_copy") as pool:
+        pending = []
+        next_index = 0
+        while next_index < len(offsets) or pending:
+            while next_index < len(offsets) and len(pending) < window:
+                pending.append(pool.submit(_read_chunk, src, offsets[next_index], PARALLEL_CHUNK_SIZE))
+                next_index += 1
+            data = pending.pop(0).result()
+            if hasher is not None:
+                hasher.update(data)
+            target.write(data)
+            if len(data) < PARALLEL_CHUNK_SIZE:
+                # Конец файла раньше ожидаемого (файл укоротился) - остальные части не нужны
+                for future in pending:
+                    future.cancel()
+                break
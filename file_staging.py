@@ -0,0 +1,308 @@
+# file_staging.py
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict, deque
+
+from fast_copy import copy_file, copy_file_with_checksum, file_checksum
+
+# Файлы меньше этого размера конвейер пропускает, не читая (см. process_single_file)
+MIN_STAGED_FILE_BYTES = 1024 * 1024
+# Рядом с заменяемым файлом на хранилище: результат до подмены исходного и резервная копия,
+# которую делала замена по месту в прежних версиях (убирается при восстановлении после сбоя)
+REPLACE_SUFFIX = '.compressed.tmp'
+BACKUP_SUFFIX = '.backup'
+
+
+def is_network_path(path):
+    """Сетевой путь (UNC \\\\server\\share или URL)"""
+    return path.startswith('\\\\') or '://' in path
+
+
+class PrefetchCache:
+    """
+    Упреждающее чтение сетевых файлов: фоновый поток копирует следующие файлы очереди
+    в локальную папку, пока текущий файл сжимается. Кэш ограничен числом файлов и байтами.
+    take() отдает готовую копию заданию (файл переносится, а не копируется). Если исходный
+    файл изменился после копирования, копия отбрасывается, и задание копирует файл само
+    """
+
+    def __init__(self, max_files=2, max_bytes=1024 * 1024 * 1024, workers=1):
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.workers = workers  # потоков чтения крупного файла (fast_copy)
+        self.cache_dir = tempfile.mkdtemp(prefix="pdf_compress_prefetch_")
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # исходный путь -> состояние копии
+        self._queue = deque()
+        self._staged_bytes = 0
+        self._counter = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def prefetch(self, paths):
+        """
+        Окно очереди: файлы, которые понадобятся следующими (по порядку). Копии файлов вне окна
+        удаляются - они уже пройдены или пропущены
+        """
+        window = list(paths)[:self.max_files]
+        with self._cond:
+            for path in list(self._entries):
+                if path not in window:
+                    self._drop(path)
+            for path in window:
+                if path not in self._entries:
+                    self._counter += 1
+                    self._entries[path] = {"state": "queued", "local": None, "size": 0, "stamp": None,
+                                           "number": self._counter}
+                    self._queue.append(path)
+            self._cond.notify_all()
+
+    def take(self, path, dest_path):
+        """
+        Переносит готовую копию path в dest_path. Если копирование идет - дожидается его.
+        Возвращает False, если копии нет (задание копирует файл само)
+        """
+        with self._cond:
+            entry = self._entries.get(path)
+            if entry is not None and entry["state"] == "queued":
+                self._drop(path)  # копирование не начиналось - задание скопирует файл само
+                entry = None
+            while entry is not None and entry["state"] == "copying":
+                self._cond.wait()
+                entry = self._entries.get(path)
+            if entry is None or entry["state"] != "ready":
+                self.misses += 1
+                if entry is not None:
+                    self._drop(path)
+                return False
+            del self._entries[path]
+            self._staged_bytes -= entry["size"]
+            self._cond.notify_all()
+
+        try:
+            current = os.stat(path)
+            fresh = (current.st_size, current.st_mtime) == entry["stamp"]
+            if fresh:
+                os.replace(entry["local"], dest_path)
+        except OSError:
+            fresh = False
+        if not fresh:
+            self._remove_file(entry["local"])
+            with self._cond:
+                self.misses += 1
+            return False
+        with self._cond:
+            self.hits += 1
+        return True
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            for path in list(self._entries):
+                self._drop(path)
+            self._cond.notify_all()
+        self._thread.join(timeout=5)
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def _drop(self, path):
+        """Удаляет запись (под блокировкой); идущее копирование удалит свой файл само"""
+        entry = self._entries.pop(path)
+        if entry["state"] == "ready":
+            self._staged_bytes -= entry["size"]
+            self._remove_file(entry["local"])
+        elif entry["state"] == "queued":
+            try:
+                self._queue.remove(path)
+            except ValueError:
+                pass
+
+    @staticmethod
+    def _remove_file(local_path):
+        try:
+            if local_path and os.path.exists(local_path):
+                os.remove(local_path)
+        except OSError:
+            pass
+
+    def _next_job(self):
+        """Следующий файл для копирования, когда в кэше есть место; None при закрытии"""
+        with self._cond:
+            while True:
+                if self._closed:
+                    return None
+                if self._queue and self._staged_bytes < self.max_bytes:
+                    path = self._queue.popleft()
+                    entry = self._entries[path]
+                    entry["state"] = "copying"
+                    return path, entry
+                self._cond.wait()
+
+    def _run(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            path, entry = job
+            local_path = os.path.join(self.cache_dir, f"prefetch_{entry['number']}.pdf")
+            state = "failed"
+            try:
+                stat = os.stat(path)
+                if MIN_STAGED_FILE_BYTES <= stat.st_size <= self.max_bytes:
+                    copy_file(path, local_path, workers=self.workers)
+                    entry["stamp"] = (stat.st_size, stat.st_mtime)
+                    entry["size"] = stat.st_size
+                    state = "ready"
+            except OSError:
+                pass
+
+            with self._cond:
+                if self._entries.get(path) is entry:
+                    entry["state"] = state
+                    if state == "ready":
+                        entry["local"] = local_path
+                        self._staged_bytes += entry["size"]
+                else:
+                    state = "dropped"  # файл ушел из окна, пока копировался
+                self._cond.notify_all()
+            if state != "ready":
+                self._remove_file(local_path)
+
+
+class WriteBackQueue:
+    """
+    Фоновая запись результатов на хранилище: замена исходного файла сжатым (через временный
+    файл рядом с исходным) выполняется в отдельном потоке, пока сжимается следующий файл.
+    Итоги забираются потоком обработки через collect()/drain() - запись в БД остается в нем.
+    Не больше max_pending замен в ожидании: submit ждет, если запись не успевает
+    """
+
+    def __init__(self, max_pending=2):
+        self.max_pending = max_pending
+        self.spool_dir = tempfile.mkdtemp(prefix="pdf_compress_writeback_")
+        self._pending = 0
+        self._jobs = deque()
+        self._done = deque()
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, result_path, file_path, context=None):
+        """
+        Ставит в очередь замену file_path файлом result_path. Файл результата сначала переносится
+        в папку очереди: временная папка задания удаляется сразу после задания
+        """
+        with self._cond:
+            while self._pending >= self.max_pending:
+                self._cond.wait()
+            self._pending += 1
+        spooled = os.path.join(self.spool_dir, f"{id(context)}_{os.path.basename(result_path)}")
+        try:
+            shutil.move(result_path, spooled)
+        except Exception:
+            with self._cond:
+                self._pending -= 1
+                self._cond.notify_all()
+            raise
+        with self._cond:
+            self._jobs.append((spooled, file_path, context))
+            self._cond.notify_all()
+
+    def collect(self):
+        """Завершенные замены: список (file_path, context, ошибка или None)"""
+        with self._cond:
+            done = list(self._done)
+            self._done.clear()
+        return done
+
+    def drain(self):
+        """Ждет завершения всех замен и возвращает их итоги"""
+        with self._cond:
+            while self._pending:
+                self._cond.wait()
+        return self.collect()
+
+    def close(self):
+        self.drain()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout=5)
+        shutil.rmtree(self.spool_dir, ignore_errors=True)
+
+    @staticmethod
+    def replace_file(result_path, file_path):
+        """
+        Заменяет file_path файлом result_path. Результат записывается рядом под временным именем
+        и подменяет исходный файл через os.replace: исходный файл не перезаписывается по месту,
+        и оборванная запись оставляет его целым - резервная копия не нужна. Перед подменой
+        записанный файл читается с хранилища и сверяется с результатом по контрольной сумме
+        """
+        staged_path = file_path + REPLACE_SUFFIX
+        try:
+            checksum = copy_file_with_checksum(result_path, staged_path)
+            if file_checksum(staged_path) != checksum:
+                raise OSError(f"Записанный файл не совпадает с результатом сжатия: {staged_path}")
+            os.replace(staged_path, file_path)
+        except Exception:
+            try:
+                if os.path.exists(staged_path):
+                    os.remove(staged_path)
+            except OSError:
+                pass
+            raise
+        try:
+            os.remove(result_path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def recover_replace(file_path):
+        """
+        Убирает следы замены, оборванной сбоем программы: недописанный результат удаляется.
+        Резервная копия (замена по месту в прежних версиях) больше файла, только если файл
+        остался недописанным или уже заменен - тогда она возвращается на место (файл будет
+        сжат заново), иначе это недописанная копия, и она удаляется.
+        Возвращает True, если исходный файл восстановлен из резервной копии
+        """
+        try:
+            staged_path = file_path + REPLACE_SUFFIX
+            if os.path.exists(staged_path):
+                os.remove(staged_path)
+            backup_path = file_path + BACKUP_SUFFIX
+            if os.path.exists(backup_path):
+                if not os.path.exists(file_path) or os.path.getsize(backup_path) > os.path.getsize(file_path):
+                    os.replace(backup_path, file_path)
+                    return True
+                os.remove(backup_path)
+        except OSError:
+            pass
+        return False
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._jobs and not self._closed:
+                    self._cond.wait()
+                if not self._jobs:
+                    return
+                result_path, file_path, context = self._jobs.popleft()
+            error = None
+            try:
+                self.replace_file(result_path, file_path)
+            except Exception as e:
+                error = e
+                try:
+                    if os.path.exists(result_path):
+                        os.remove(result_path)
+                except OSError:
+                    pass
+            with self._cond:
+                self._done.append((file_path, context, error))
+                self._pending -= 1
+                self._cond.notify_all()
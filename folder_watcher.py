@@ -0,0 +1,265 @@
+# folder_watcher.py
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from directory_index import MAX_DEPTH_BY_SETTING
+
+# Флаги inotify (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+# Сетевые ФС: события inotify о чужих изменениях не приходят, нужен опрос
+NETWORK_FILESYSTEMS = {'cifs', 'smb3', 'smbfs', 'nfs', 'nfs4', 'fuse.sshfs', '9p'}
+
+STABLE_SECS = 5            # размер и mtime файла не меняются столько секунд - файл дописан
+CHECK_INTERVAL_SECS = 1    # период проверки кандидатов
+POLL_INTERVAL_SECS = 10    # период опроса директорий в режиме polling
+
+
+def is_network_path(path):
+    """Лежит ли путь на сетевой ФС (UNC-путь или монтирование cifs/nfs в Linux)"""
+    if path.startswith('\\\\') or path.startswith('//'):
+        return True
+    if not sys.platform.startswith('linux'):
+        return False
+    try:
+        real_path = os.path.realpath(path)
+        best_mount, best_type = '', None
+        with open('/proc/mounts') as mounts:
+            for line in mounts:
+                parts = line.split()
+                if len(parts) < 3:
+                    continue
+                mount_point = parts[1].replace('\\040', ' ')
+                if (real_path == mount_point or real_path.startswith(mount_point.rstrip('/') + '/')) \
+                        and len(mount_point) > len(best_mount):
+                    best_mount, best_type = mount_point, parts[2]
+        return best_type in NETWORK_FILESYSTEMS
+    except OSError:
+        return False
+
+
+def is_pdf(name):
+    return name.lower().endswith('.pdf')
+
+
+class Inotify:
+    """Минимальная обертка над inotify через ctypes (только Linux)"""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, path, mask=WATCH_MASK):
+        wd = self._add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed: {path}")
+        return wd
+
+    def read_events(self, timeout):
+        """Список событий (wd, mask, name), дождавшись их не дольше timeout секунд"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, name_len = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + name_len].rstrip(b'\0'))
+            offset += name_len
+            events.append((wd, mask, name))
+        return events
+
+    def close(self):
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+
+class FolderWatcher:
+    """
+    Режим наблюдения: новые PDF в папке отдаются на сжатие вскоре после сохранения.
+    Локальные папки в Linux отслеживаются через inotify, сетевые (SMB/NFS) и прочие ОС - опросом
+    с листингом только изменившихся директорий. Повторные события по файлу сбрасывают таймер
+    (debounce), файл отдается в on_file_ready, только когда его размер и mtime не менялись STABLE_SECS.
+    """
+
+    def __init__(self, directory, depth, on_file_ready, log_callback=None, stable_secs=STABLE_SECS,
+                 poll_interval=POLL_INTERVAL_SECS):
+        self.directory = directory
+        self.max_depth = MAX_DEPTH_BY_SETTING.get(depth)
+        self.on_file_ready = on_file_ready
+        self.log_callback = log_callback
+        self.stable_secs = stable_secs
+        self.poll_interval = poll_interval
+        self.mode = None
+        self.candidates = {}  # путь -> (размер, mtime, время последнего изменения)
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _log(self, message, level="info"):
+        if self.log_callback:
+            self.log_callback(message, level)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+
+    @property
+    def stopped(self):
+        return self._stop_event.is_set()
+
+    def _run(self):
+        try:
+            if sys.platform.startswith('linux') and not is_network_path(self.directory):
+                try:
+                    self.mode = "inotify"
+                    self._run_inotify()
+                    return
+                except OSError as e:
+                    self._log(f"inotify недоступен ({e}), переключение на опрос", "warning")
+            self.mode = "polling"
+            self._run_polling()
+        except Exception as e:
+            self._log(f"Ошибка наблюдения за папкой: {e}", "error")
+
+    def add_candidate(self, path):
+        """Новое событие по файлу: таймер стабильности начинается заново"""
+        self.candidates[path] = (None, None, time.time())
+
+    def check_candidates(self):
+        """Отдает файлы, размер и mtime которых не менялись stable_secs секунд"""
+        now = time.time()
+        for path, (size, mtime, changed_at) in list(self.candidates.items()):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                del self.candidates[path]  # файл удален или переименован
+                continue
+            if (stat.st_size, stat.st_mtime) != (size, mtime):
+                self.candidates[path] = (stat.st_size, stat.st_mtime, now)
+            elif stat.st_size > 0 and now - changed_at >= self.stable_secs:
+                del self.candidates[path]
+                self.on_file_ready(path)
+
+    def _run_inotify(self):
+        inotify = Inotify()
+        watches = {}  # wd -> (путь, уровень)
+
+        def watch_tree(path, level, report_existing):
+            stack = [(path, level)]
+            while stack:
+                current, current_level = stack.pop()
+                try:
+                    watches[inotify.add_watch(current)] = (current, current_level)
+                    with os.scandir(current) as entries:
+                        for entry in entries:
+                            if entry.is_dir(follow_symlinks=False):
+                                if self.max_depth is None or current_level < self.max_depth:
+                                    stack.append((entry.path, current_level + 1))
+                            elif report_existing and is_pdf(entry.name):
+                                self.add_candidate(entry.path)
+                except OSError as e:
+                    self._log(f"Не удалось наблюдать за {current}: {e}", "warning")
+
+        try:
+            watch_tree(self.directory, 0, report_existing=False)
+            self._log(f"Наблюдение (inotify): папок под наблюдением - {len(watches)}")
+            while not self.stopped:
+                for wd, mask, name in inotify.read_events(CHECK_INTERVAL_SECS):
+                    if mask & IN_Q_OVERFLOW:
+                        # События потеряны: пересканируем дерево - новые папки получат наблюдение, а
+                        # уже лежащие PDF станут кандидатами (обработанные отсеет проверка по БД)
+                        self._log("Переполнение очереди inotify: часть событий потеряна, папка "
+                                  "будет просканирована заново", "warning")
+                        watch_tree(self.directory, 0, report_existing=True)
+                        continue
+                    if mask & IN_IGNORED:
+                        watches.pop(wd, None)
+                        continue
+                    if wd not in watches or not name:
+                        continue
+                    base, level = watches[wd]
+                    path = os.path.join(base, name)
+                    if mask & IN_ISDIR:
+                        # Новая папка (или перемещенная целиком) - наблюдаем и берем уже лежащие в ней PDF
+                        if mask & (IN_CREATE | IN_MOVED_TO) and (self.max_depth is None or level < self.max_depth):
+                            watch_tree(path, level + 1, report_existing=True)
+                    elif is_pdf(name):
+                        self.add_candidate(path)
+                self.check_candidates()
+        finally:
+            inotify.close()
+
+    def _run_polling(self):
+        dir_state = {}  # путь -> (mtime, поддиректории, имена PDF)
+
+        def poll(report_new):
+            stack = [(self.directory, 0)]
+            while stack:
+                path, level = stack.pop()
+                try:
+                    mtime = os.stat(path).st_mtime
+                except OSError:
+                    dir_state.pop(path, None)
+                    continue
+                state = dir_state.get(path)
+                if state is None or state[0] != mtime:
+                    pdf_names = set()
+                    subdirs = []
+                    try:
+                        with os.scandir(path) as entries:
+                            for entry in entries:
+                                if entry.is_dir(follow_symlinks=False):
+                                    subdirs.append(entry.name)
+                                elif is_pdf(entry.name):
+                                    pdf_names.add(entry.name)
+                    except OSError:
+                        continue
+                    if report_new:
+                        known = state[2] if state else set()
+                        for name in pdf_names - known:
+                            self.add_candidate(os.path.join(path, name))
+                    state = (mtime, subdirs, pdf_names)
+                    dir_state[path] = state
+                if self.max_depth is None or level < self.max_depth:
+                    stack.extend((os.path.join(path, name), level + 1) for name in state[1])
+
+        poll(report_new=False)
+        self._log(f"Наблюдение (опрос каждые {self.poll_interval} сек): папок - {len(dir_state)}")
+        next_poll = time.time() + self.poll_interval
+        while not self.stopped:
+            if time.time() >= next_poll:
+                poll(report_new=True)
+                next_poll = time.time() + self.poll_interval
+            self.check_candidates()
+            self._stop_event.wait(CHECK_INTERVAL_SECS)
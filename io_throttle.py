@@ -0,0 +1,123 @@
+# io_throttle.py
+import os
+import threading
+import time
+
+# Потолки по умолчанию, если в настройках 0 (= без ограничения сверху)
+UNLIMITED_MB_PER_SEC = 1024.0
+UNLIMITED_FILES_PER_SEC = 100.0
+
+# AIMD: аддитивный рост скорости за каждую быструю операцию и мультипликативное снижение при задержке
+AIMD_INCREASE_SHARE = 0.05        # доля потолка, прибавляемая к скорости
+AIMD_DECREASE_FACTOR = 0.5
+MIN_RATE_SHARE = 0.02             # скорость не опускается ниже этой доли потолка
+
+# Перегрузка хранилища: задержка stat выше базовой в N раз и выше абсолютного порога
+LATENCY_CONGESTION_FACTOR = 3.0
+LATENCY_FLOOR_SECS = 0.05
+LATENCY_BASELINE_ALPHA = 0.05     # скорость, с которой базовая задержка подстраивается вверх
+
+
+class TokenBucket:
+    """
+    Корзина токенов: rate токенов в секунду, не больше capacity в запасе.
+    Запрос больше запаса допускается в долг - следующий ждет, пока долг не погасится.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def consume(self, amount, cancel_check=None):
+        """Списывает amount токенов, при нехватке ждет. Возвращает время ожидания, сек"""
+        waited = 0.0
+        with self._lock:
+            self._refill()
+            self.tokens -= amount
+            deficit = -self.tokens
+        while deficit > 0:
+            if cancel_check and cancel_check():
+                break
+            pause = min(deficit / self.rate, 0.5)
+            time.sleep(pause)
+            waited += pause
+            with self._lock:
+                self._refill()
+                deficit = -self.tokens
+        return waited
+
+
+class AdaptiveIOThrottle:
+    """
+    Ограничение нагрузки на файловое хранилище: байты чтения/записи в секунду и файлы в секунду.
+    Скорость подстраивается по задержке хранилища (AIMD): пока stat отвечает быстро, скорость
+    растет до потолка из настроек, при росте задержки - снижается вдвое. Днем под нагрузкой
+    NAS получает паузы, ночью обработка идет на полной скорости.
+    """
+
+    def __init__(self, max_mb_per_sec=0, max_files_per_sec=0):
+        self.max_bytes_per_sec = (max_mb_per_sec or UNLIMITED_MB_PER_SEC) * 1024 * 1024
+        self.max_files_per_sec = max_files_per_sec or UNLIMITED_FILES_PER_SEC
+        self.bytes_bucket = TokenBucket(self.max_bytes_per_sec, self.max_bytes_per_sec)
+        self.files_bucket = TokenBucket(self.max_files_per_sec, max(self.max_files_per_sec, 1))
+        self.baseline_latency = None
+        self.last_latency = None
+        self.total_wait_secs = 0.0
+
+    @property
+    def rate_share(self):
+        """Текущая скорость как доля потолка"""
+        return self.bytes_bucket.rate / self.max_bytes_per_sec
+
+    def _set_share(self, share):
+        share = min(max(share, MIN_RATE_SHARE), 1.0)
+        self.bytes_bucket.rate = self.max_bytes_per_sec * share
+        self.files_bucket.rate = self.max_files_per_sec * share
+
+    def observe_latency(self, latency_secs):
+        """Учитывает задержку операции с хранилищем и подстраивает скорость (AIMD)"""
+        self.last_latency = latency_secs
+        if self.baseline_latency is None or latency_secs < self.baseline_latency:
+            self.baseline_latency = latency_secs
+        else:
+            # Медленно подтягиваем базу вверх, чтобы одна удачная операция не задала ее навсегда
+            self.baseline_latency += (latency_secs - self.baseline_latency) * LATENCY_BASELINE_ALPHA
+
+        congested = (latency_secs > LATENCY_FLOOR_SECS and
+                     latency_secs > self.baseline_latency * LATENCY_CONGESTION_FACTOR)
+        if congested:
+            self._set_share(self.rate_share * AIMD_DECREASE_FACTOR)
+        else:
+            self._set_share(self.rate_share + AIMD_INCREASE_SHARE)
+        return congested
+
+    def probe(self, path):
+        """Замеряет задержку stat на хранилище для файла. Возвращает True при перегрузке"""
+        start = time.monotonic()
+        try:
+            os.stat(path)
+        except OSError:
+            return False
+        return self.observe_latency(time.monotonic() - start)
+
+    def before_file(self, cancel_check=None):
+        """Ожидание перед началом обработки очередного файла"""
+        waited = self.files_bucket.consume(1, cancel_check)
+        self.total_wait_secs += waited
+        return waited
+
+    def account_bytes(self, nbytes, cancel_check=None):
+        """Учитывает прочитанные/записанные байты, при превышении скорости ждет"""
+        if nbytes <= 0:
+            return 0.0
+        waited = self.bytes_bucket.consume(nbytes, cancel_check)
+        self.total_wait_secs += waited
+        return waited
@@ -0,0 +1,149 @@
+# log_sink.py
+import atexit
+import glob
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+from datetime import datetime
+
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024  # 10 MB
+FLUSH_INTERVAL_SECS = 0.5
+BATCH_SIZE = 1000
+
+
+class AsyncLogSink:
+    """
+    Файловый журнал с фоновой записью: сообщения кладутся в очередь без обращения к диску,
+    поток-писатель пачками дописывает их в открытый файл. Размер файла считается в памяти,
+    при превышении max_bytes журнал ротируется, а закрытый файл сжимается в .gz.
+    В режиме json_lines каждая запись - отдельный JSON-объект в строке (log_*.jsonl).
+    """
+
+    def __init__(self, logs_dir, max_bytes=DEFAULT_MAX_BYTES, json_lines=False, compress_rotated=True):
+        self.logs_dir = logs_dir
+        self.max_bytes = max_bytes
+        self.json_lines = json_lines
+        self.compress_rotated = compress_rotated
+        self.extension = ".jsonl" if json_lines else ".txt"
+        self.current_path = None
+        self._file = None
+        self._size = 0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def open_log(self):
+        """
+        Выбирает файл журнала: последний, если он меньше max_bytes, иначе новый.
+        Возвращает (имя файла, создан ли новый)
+        """
+        with self._lock:
+            self._close_file()
+            log_files = glob.glob(os.path.join(self.logs_dir, f"log_*{self.extension}"))
+            if log_files:
+                latest_log = max(log_files, key=os.path.getctime)
+                size = os.path.getsize(latest_log)
+                if size < self.max_bytes:
+                    self._open_file(latest_log, size)
+                    return os.path.basename(latest_log), False
+            return os.path.basename(self._create_file()), True
+
+    def write(self, message, level="info", **fields):
+        """Ставит запись в очередь; вызывающий поток не ждет диска"""
+        self._queue.put((datetime.now(), level, message, fields))
+
+    def flush(self, timeout=5):
+        """Дожидается записи всех поставленных в очередь сообщений"""
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self):
+        if self._stopped.is_set():
+            return
+        self.flush()
+        self._stopped.set()
+        self._thread.join(timeout=5)
+        with self._lock:
+            self._close_file()
+
+    def _format(self, timestamp, level, message, fields):
+        if self.json_lines:
+            record = {"ts": timestamp.isoformat(timespec="milliseconds"), "level": level, "message": message}
+            record.update(fields)
+            return json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        return f"[{timestamp.strftime('%H:%M:%S')}] {message}\n"
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                item = self._queue.get(timeout=FLUSH_INTERVAL_SECS)
+            except queue.Empty:
+                continue
+            batch = [item]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._write_batch(batch)
+
+    def _write_batch(self, batch):
+        waiters = [item for item in batch if isinstance(item, threading.Event)]
+        lines = [self._format(*item) for item in batch if not isinstance(item, threading.Event)]
+        if lines:
+            data = "".join(lines).encode("utf-8")
+            try:
+                with self._lock:
+                    if self._file is not None:
+                        self._file.write(data)
+                        self._file.flush()
+                        self._size += len(data)
+                        if self._size >= self.max_bytes:
+                            self._rotate()
+            except Exception as e:
+                print(f"Ошибка записи в файл журнала: {e}")
+        for waiter in waiters:
+            waiter.set()
+
+    def _open_file(self, path, size):
+        self._file = open(path, "ab")
+        self.current_path = path
+        self._size = size
+
+    def _create_file(self):
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        path = os.path.join(self.logs_dir, f"log_{timestamp}{self.extension}")
+        self._open_file(path, 0)
+        if not self.json_lines:
+            header = (f"PDF Compressor Log - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+                      + "=" * 50 + "\n\n").encode("utf-8")
+            self._file.write(header)
+            self._size += len(header)
+        return path
+
+    def _close_file(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except Exception:
+                pass
+            self._file = None
+
+    def _rotate(self):
+        finished_path = self.current_path
+        self._close_file()
+        self._create_file()
+        if self.compress_rotated and finished_path:
+            try:
+                with open(finished_path, "rb") as source, gzip.open(finished_path + ".gz", "wb") as target:
+                    shutil.copyfileobj(source, target)
+                os.remove(finished_path)
+            except Exception as e:
+                print(f"Ошибка сжатия журнала {finished_path}: {e}")
@@ -3,7 +3,6 @@ import os
 import traceback
 from datetime import datetime
 from compressor_app import main
-from models.database import create_tables
 
 def write_to_log(error_message):
     """Простая запись ошибки в текстовый файл"""
@@ -20,7 +19,6 @@ def write_to_log(error_message):
 
 if __name__ == '__main__':
     try:
-        create_tables()
         main()
     except Exception as e:
         # Формируем полное сообщение об ошибке
@@ -0,0 +1,145 @@
+# memory_scheduler.py
+import ctypes
+import os
+import threading
+import time
+
+# Оценка пикового потребления памяти заданиями
+OCR_DEFAULT_DPI = 150                 # DPI по умолчанию в OCRProcessor.process_with_tesseract
+OCR_CHANNELS = 3                      # RGB
+OCR_PAGE_INCHES = (8.27, 11.69)       # A4
+OCR_OVERHEAD_FACTOR = 4.0             # Tesseract держит несколько копий страницы (бинаризация, слои)
+GS_MEMORY_FACTOR = 3.0                # Ghostscript: пик ≈ объем страницы × коэффициент
+GS_BASE_MB = 64                       # постоянная часть (интерпретатор, шрифты)
+GS_MAX_INPUT_MB = 256                 # без числа страниц: учитываемая часть файла (gs читает файл потоком)
+
+# Бюджет по умолчанию - доля физической памяти, если в настройках 0
+DEFAULT_BUDGET_SHARE = 0.7
+DEFAULT_BUDGET_MB = 2048              # если объем памяти определить не удалось
+ADMISSION_POLL_SECS = 0.5
+ADMISSION_MAX_WAIT_SECS = 300
+
+
+def estimate_ocr_memory_mb(pages, dpi, pages_in_memory=None):
+    """
+    Пик памяти OCR: страниц_в_памяти × DPI² × площадь страницы × каналы.
+    pages_in_memory - сколько страниц растра одновременно в памяти
+    (pdf2image держит все страницы, pdftoppm + постраничный Tesseract - одну).
+    """
+    pages = max(pages or 1, 1)
+    in_memory = pages if pages_in_memory is None else min(pages_in_memory, pages)
+    page_bytes = (dpi * OCR_PAGE_INCHES[0]) * (dpi * OCR_PAGE_INCHES[1]) * OCR_CHANNELS
+    return in_memory * page_bytes * OCR_OVERHEAD_FACTOR / (1024 * 1024)
+
+
+def estimate_gs_memory_mb(file_size_bytes, pages=None):
+    """
+    Пик памяти Ghostscript. pdfwrite читает файл потоком и держит в памяти ресурсы текущей
+    страницы, поэтому оценка - по среднему объему страницы; без числа страниц - по размеру
+    файла, но не больше GS_MAX_INPUT_MB
+    """
+    file_mb = file_size_bytes / (1024 * 1024)
+    held_mb = file_mb / pages if pages and pages > 0 else min(file_mb, GS_MAX_INPUT_MB)
+    return GS_BASE_MB + held_mb * GS_MEMORY_FACTOR
+
+
+def get_memory_info_mb():
+    """Возвращает (всего, доступно) физической памяти в МБ или (None, None)"""
+    try:
+        if os.name == 'nt':
+            class MEMORYSTATUSEX(ctypes.Structure):
+                _fields_ = [
+                    ("dwLength", ctypes.c_ulong),
+                    ("dwMemoryLoad", ctypes.c_ulong),
+                    ("ullTotalPhys", ctypes.c_ulonglong),
+                    ("ullAvailPhys", ctypes.c_ulonglong),
+                    ("ullTotalPageFile", ctypes.c_ulonglong),
+                    ("ullAvailPageFile", ctypes.c_ulonglong),
+                    ("ullTotalVirtual", ctypes.c_ulonglong),
+                    ("ullAvailVirtual", ctypes.c_ulonglong),
+                    ("ullAvailExtendedVirtual", ctypes.c_ulonglong),
+                ]
+
+            status = MEMORYSTATUSEX()
+            status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+            if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+                return status.ullTotalPhys / (1024 * 1024), status.ullAvailPhys / (1024 * 1024)
+        else:
+            info = {}
+            with open('/proc/meminfo') as f:
+                for line in f:
+                    key, value = line.split(':', 1)
+                    info[key] = int(value.split()[0])  # кБ
+            total = info.get('MemTotal')
+            available = info.get('MemAvailable', info.get('MemFree'))
+            if total:
+                return total / 1024, (available or 0) / 1024
+    except Exception:
+        pass
+    return None, None
+
+
+class MemoryAdmissionController:
+    """
+    Допуск заданий по оценке пиковой памяти: задание стартует, только если сумма оценок
+    запущенных заданий вместе с ним укладывается в бюджет и в свободную память системы.
+    Мелкие задания идут параллельно, крупное ждет завершения других заданий, а не роняет
+    обработку с MemoryError. Задание больше бюджета или памяти системы не допускается сразу,
+    остальные ждут (и одиночное задание - пока другие программы освободят память) не дольше
+    max_wait_secs.
+    """
+
+    def __init__(self, budget_mb=None):
+        total_mb, _ = get_memory_info_mb()
+        if budget_mb:
+            self.budget_mb = budget_mb
+        elif total_mb:
+            self.budget_mb = int(total_mb * DEFAULT_BUDGET_SHARE)
+        else:
+            self.budget_mb = DEFAULT_BUDGET_MB
+        self.in_use_mb = 0.0
+        self.running_jobs = 0
+        self._condition = threading.Condition()
+
+    def _fits(self, estimate_mb):
+        if self.in_use_mb + estimate_mb > self.budget_mb:
+            return False
+        _, available_mb = get_memory_info_mb()
+        return available_mb is None or estimate_mb <= available_mb
+
+    def acquire(self, estimate_mb, cancel_check=None, max_wait_secs=ADMISSION_MAX_WAIT_SECS):
+        """
+        Ждет, пока задание поместится в бюджет и в свободную память. Возвращает False при отмене,
+        по истечении ожидания или сразу, если задание не поместится никогда
+        """
+        total_mb, _ = get_memory_info_mb()
+        if estimate_mb > self.budget_mb or (total_mb is not None and estimate_mb > total_mb):
+            return False  # не поместится никогда - ждать бессмысленно
+        deadline = time.time() + max_wait_secs
+        with self._condition:
+            while not self._fits(estimate_mb):
+                if cancel_check and cancel_check():
+                    return False
+                if time.time() > deadline:
+                    return False
+                # Без заданий память освобождают только другие программы - опрос свободной памяти
+                self._condition.wait(ADMISSION_POLL_SECS)
+            self.in_use_mb += estimate_mb
+            self.running_jobs += 1
+            return True
+
+    def try_acquire(self, estimate_mb):
+        """Допускает задание без ожидания, если оно помещается прямо сейчас"""
+        with self._condition:
+            if not self._fits(estimate_mb):
+                return False
+            self.in_use_mb += estimate_mb
+            self.running_jobs += 1
+            return True
+
+    def release(self, estimate_mb):
+        """Возвращает память задания в бюджет"""
+        with self._condition:
+            self.in_use_mb = max(self.in_use_mb - estimate_mb, 0.0)
+            self.running_jobs = max(self.running_jobs - 1, 0)
+            self._condition.notify_all()
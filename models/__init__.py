@@ -1,16 +1,28 @@
 # models/__init__.py
 __all__ = [
     'ProcessedFile',
+    'Directory',
     'Setting',
     'FailReason',
     'NestingDepth',
-    'CompressionMethod'
+    'CompressionMethod',
+    'ProcessingRun',
+    'RunFile',
+    'DirectorySnapshot',
+    'FileTiming',
+    'DailyStats'
 ]
 
 from .models import (
     ProcessedFile,
+    Directory,
     Setting,
     FailReason,
     NestingDepth,
-    CompressionMethod
+    CompressionMethod,
+    ProcessingRun,
+    RunFile,
+    DirectorySnapshot,
+    FileTiming,
+    DailyStats
 )
\ No newline at end of file
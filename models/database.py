@@ -5,9 +5,10 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
 
-# База данных в папке с программой
+# База данных в папке с программой; PDF_COMPRESSOR_DB_URL задает другую БД (бенчмарки, отладка)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DATABASE_URL = f"sqlite:///{os.path.join(BASE_DIR, '..', 'pdf_compressor.db')}"
+DATABASE_URL = (os.environ.get("PDF_COMPRESSOR_DB_URL")
+                or f"sqlite:///{os.path.join(BASE_DIR, '..', 'pdf_compressor.db')}")
 
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -3,9 +3,11 @@
 import pytz
 from sqlalchemy import (Column,
                         Integer,
+                        BigInteger,
                         String,
                         Boolean,
                         DateTime,
+                        Date,
                         Float,
                         Text,
                         ForeignKey,
@@ -70,6 +72,29 @@ class Setting(Base):
     # ✅ НОВОЕ ПОЛЕ: максимально допустимый размер страницы, КБайт
     kbytes_per_page_border = Column(Float, nullable=True, default=None)
 
+    # Таймаут файла по истории обработки (сек/стр, сек/МБ) вместо фиксированного procession_timeout
+    adaptive_timeout = Column(Boolean, nullable=False, default=False)
+
+    # Бюджет памяти для одновременно выполняемых заданий, МБ (0 - доля физической памяти)
+    memory_budget_mb = Column(Integer, nullable=False, default=0)
+
+    # Потолки нагрузки на хранилище (0 - без ограничения); заменяют паузу timeout_iterations/timeout_interval_secs
+    io_max_mb_per_sec = Column(Float, nullable=False, default=0)
+    io_max_files_per_sec = Column(Float, nullable=False, default=0)
+
+    # Замер времени этапов обработки каждого файла (таблица file_timing)
+    collect_timings = Column(Boolean, nullable=False, default=False)
+
+    # Политика запуска: окно обработки "ЧЧ:ММ" ("" - без окна) и бюджеты окна (0 - без ограничения)
+    run_window_start = Column(String(5), nullable=False, default="")
+    run_window_end = Column(String(5), nullable=False, default="")
+    run_max_hours = Column(Float, nullable=False, default=0)
+    run_max_read_gb = Column(Float, nullable=False, default=0)
+    run_max_cpu_hours = Column(Float, nullable=False, default=0)
+
+    # Гонка стратегий: уровни Ghostscript через запятую, запускаемые параллельно
+    race_levels = Column(String(20), nullable=False, default="1,2,3")
+
     info = Column(Text, nullable=True)
 
     # Constraint для уникальности комбинации полей
@@ -85,6 +110,17 @@ class Setting(Base):
             'timeout_interval_secs',
             'ocr_max_pages',
             'kbytes_per_page_border',  # ✅ ДОБАВЛЕНО
+            'adaptive_timeout',
+            'memory_budget_mb',
+            'io_max_mb_per_sec',
+            'io_max_files_per_sec',
+            'collect_timings',
+            'run_window_start',
+            'run_window_end',
+            'run_max_hours',
+            'run_max_read_gb',
+            'run_max_cpu_hours',
+            'race_levels',
             name='uq_setting_combination'
         ),
         CheckConstraint('compression_level >= 1 AND compression_level <= 3', name='chk_compression_level'),
@@ -103,11 +139,23 @@ class Setting(Base):
     compression_method = relationship("CompressionMethod")
 
 
+class Directory(Base):
+    """Папка с обработанными файлами: путь хранится один раз, processed_files ссылаются на него по id"""
+    __tablename__ = "directory"
+
+    id = Column(Integer, primary_key=True, index=True)
+    dir_path = Column(Text, nullable=False, unique=True)  # нормализованный путь папки без "/" в конце
+
+    files = relationship("ProcessedFile", back_populates="directory")
+
+
 class ProcessedFile(Base):
     __tablename__ = "processed_files"
 
     id = Column(Integer, primary_key=True, index=True)
-    file_full_path = Column(String(200), nullable=False, unique=True)
+    directory_id = Column(Integer, ForeignKey("directory.id"), nullable=False, index=True)
+    file_name = Column(Text, nullable=False)
+    path_hash = Column(BigInteger, nullable=False, index=True)  # 64-битный хеш нормализованного пути
     is_successful = Column(Boolean, nullable=False)
     fail_reason_id = Column(Integer, ForeignKey("fail_reason.id"), nullable=True)
     processed_date = Column(DateTime(timezone=True),
@@ -120,6 +168,116 @@ class ProcessedFile(Base):
     # ✅ НОВЫЕ ПОЛЯ
     file_pages = Column(Integer, nullable=True, default=None)  # количество страниц
     file_origin_size_kbytes = Column(Float, nullable=True, default=None)  # исходный размер в КБ
+    compression_tier = Column(String(50), nullable=True, default=None)  # ступень/стратегия, давшая результат
+    processing_seconds = Column(Float, nullable=True, default=None)  # время сжатия файла, сек
+    timeout_secs = Column(Float, nullable=True, default=None)  # таймаут, примененный к файлу, сек
+    department = Column(String(100), nullable=True, index=True)  # отдел по пути (path_dimensions)
+    department_legacy = Column(String(100), nullable=True, index=True)  # отдел по правилам прежних сводных
+    top_folder = Column(String(200), nullable=True, index=True)  # папка верхнего уровня на шаре/диске
+
+    __table_args__ = (
+        UniqueConstraint('directory_id', 'file_name', name='uq_processed_file_path'),
+    )
 
     setting = relationship("Setting", back_populates="processed_files")
     fail_reason_rel = relationship("FailReason", back_populates="processed_files")
+    directory = relationship("Directory", back_populates="files")
+
+    @property
+    def file_full_path(self):
+        """Полный нормализованный путь файла"""
+        return f"{self.directory.dir_path}/{self.file_name}"
+
+
+class ProcessingRun(Base):
+    """Запуск обработки директории: список найденных файлов сохраняется для продолжения после сбоя"""
+    __tablename__ = "processing_run"
+
+    id = Column(Integer, primary_key=True, index=True)
+    root_directory = Column(String(500), nullable=False)
+    nesting_depth_id = Column(Integer, nullable=False)
+    setting_id = Column(Integer, ForeignKey("setting.id"), nullable=True)
+    status = Column(String(20), nullable=False, default="running")  # running / interrupted / completed
+    total_files = Column(Integer, nullable=False, default=0)
+    scan_seconds = Column(Float, nullable=True, default=None)  # время сканирования директории
+    stop_reason = Column(String(100), nullable=True, default=None)  # почему запуск остановлен политикой запуска
+    created_at = Column(DateTime(timezone=True),
+                        default=lambda: datetime.now(pytz.timezone('Asia/Novosibirsk')),
+                        nullable=False)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    files = relationship("RunFile", back_populates="run", cascade="all, delete-orphan")
+
+
+class RunFile(Base):
+    """Файл в очереди запуска и его состояние: pending / running / writing / done / failed"""
+    __tablename__ = "run_file"
+
+    id = Column(Integer, primary_key=True, index=True)
+    run_id = Column(Integer, ForeignKey("processing_run.id"), nullable=False, index=True)
+    position = Column(Integer, nullable=False)  # порядок обхода
+    file_path = Column(Text, nullable=False)
+    state = Column(String(20), nullable=False, default="pending", index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    temp_dir = Column(Text, nullable=True)  # временная папка задания, удаляется при восстановлении после сбоя
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    run = relationship("ProcessingRun", back_populates="files")
+
+
+class DirectorySnapshot(Base):
+    """Снимок директории для инкрементального сканирования"""
+    __tablename__ = "directory_snapshot"
+
+    id = Column(Integer, primary_key=True, index=True)
+    dir_path = Column(String(1000), nullable=False, unique=True, index=True)  # нормализованный путь
+    mtime = Column(Float, nullable=False)
+    entry_count = Column(Integer, nullable=False, default=0)
+    pdf_count = Column(Integer, nullable=False, default=0)
+    subdirs = Column(Text, nullable=True)  # JSON-список имен поддиректорий
+    # Все PDF директории записаны в processed_files (при неизменном mtime ее можно не листать)
+    is_complete = Column(Boolean, nullable=False, default=False)
+    last_scan = Column(DateTime(timezone=True),
+                       default=lambda: datetime.now(pytz.timezone('Asia/Novosibirsk')),
+                       nullable=False)
+
+
+class FileTiming(Base):
+    """Время этапов обработки файла и ресурсы внешних процессов (при включенном замере)"""
+    __tablename__ = "file_timing"
+
+    id = Column(Integer, primary_key=True, index=True)
+    processed_file_id = Column(Integer, ForeignKey("processed_files.id"), nullable=False, unique=True, index=True)
+    stat_secs = Column(Float, nullable=True)  # проверка доступности и размера файла
+    db_lookup_secs = Column(Float, nullable=True)  # проверка, не обрабатывался ли файл
+    page_count_secs = Column(Float, nullable=True)  # подсчет страниц и проверки лимитов
+    admission_secs = Column(Float, nullable=True)  # таймаут, ограничение нагрузки и допуск по памяти
+    copy_secs = Column(Float, nullable=True)  # копирование на локальный диск (входит в compress_secs)
+    compress_secs = Column(Float, nullable=True)
+    replace_secs = Column(Float, nullable=True)
+    db_write_secs = Column(Float, nullable=True)
+    total_secs = Column(Float, nullable=True)
+    child_cpu_secs = Column(Float, nullable=True)  # CPU внешних процессов (Ghostscript, Tesseract, pdftoppm)
+    child_peak_rss_mb = Column(Float, nullable=True)  # пик памяти самого тяжелого внешнего процесса
+    child_processes = Column(Integer, nullable=False, default=0)
+
+    processed_file = relationship("ProcessedFile")
+
+
+class DailyStats(Base):
+    """
+    Суточная сводка processed_files для окна статистики: счетчики и экономия по дню, настройке,
+    успешности и причине ошибки. Строка обновляется вместе с каждой записью в processed_files
+    """
+    __tablename__ = "daily_stats"
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False, index=True)
+    setting_id = Column(Integer, nullable=False)
+    is_successful = Column(Boolean, nullable=False)
+    fail_reason_id = Column(Integer, nullable=True)
+    file_count = Column(Integer, nullable=False, default=0)
+    saved_kbytes = Column(Float, nullable=False, default=0.0)  # сумма положительной экономии успешных файлов
+    first_time = Column(DateTime, nullable=True)  # время первого файла за день
+    last_time = Column(DateTime, nullable=True)  # время последнего файла за день
@@ -2,54 +2,63 @@
 import os
 import io
 import tempfile
-import subprocess
+import time
 import traceback
 import shutil
 from typing import Optional, List
 import datetime
+from importlib.util import find_spec
 
-# Проверяем наличие зависимостей OCR
-OCR_AVAILABLE = False
-OCR_DEPENDENCIES = []
-
-try:
-    from pdf2image import convert_from_path
-    OCR_DEPENDENCIES.append("pdf2image")
-except ImportError:
-    OCR_DEPENDENCIES.append("❌ pdf2image")
+from process_supervisor import ProcessSupervisor, STATUS_OK, STATUS_TIMEOUT, STATUS_CANCELLED
+from tool_probe import probe_tool
+from file_staging import is_network_path
+from fast_copy import copy_file
 
-try:
-    import pytesseract
-    OCR_DEPENDENCIES.append("pytesseract")
-except ImportError:
-    OCR_DEPENDENCIES.append("❌ pytesseract")
+# Таймаут сжатия Ghostscript после OCR, если таймаут файла не задан, сек
+OCR_GS_DEFAULT_TIMEOUT_SECS = 600
 
-try:
-    from PyPDF2 import PdfMerger
-    OCR_DEPENDENCIES.append("PyPDF2")
-except ImportError:
-    OCR_DEPENDENCIES.append("❌ PyPDF2")
+# Проверяем наличие зависимостей OCR. Модули только ищутся, а импортируются при первом
+# использовании - запуск программы не ждет загрузки pdf2image/PIL/PyPDF2
+OCR_AVAILABLE = False
+OCR_DEPENDENCIES = [
+    name if find_spec(name) is not None else f"❌ {name}"
+    for name in ("pdf2image", "pytesseract", "PyPDF2")
+]
 
 # Проверяем, установлены ли все зависимости
 if all("❌" not in dep for dep in OCR_DEPENDENCIES):
     OCR_AVAILABLE = True
 
 
+class OCRCancelled(Exception):
+    """OCR-обработка прервана по требованию пользователя"""
+
+
+class OCRTimeout(Exception):
+    """OCR-обработка не уложилась в таймаут файла"""
+
+
 class OCRProcessor:
-    def __init__(self, db_ops=None, add_to_log_callback=None):
+    def __init__(self, db_ops=None, add_to_log_callback=None, cancel_check=None, supervisor=None):
         self.db_ops = db_ops
         self.add_to_log = add_to_log_callback or (lambda msg, level="info": print(f"[{level}] {msg}"))
+
+        # Отмена и запуск внешних процессов (pdftoppm, tesseract, gs) через общий супервизор
+        self.cancel_check = cancel_check or (lambda: False)
+        self.supervisor = supervisor or ProcessSupervisor()
+        self.pdftoppm_path = shutil.which('pdftoppm')
+        self.temp_root = None  # папка для временных файлов задания (None - системная временная папка)
+        self.prefetcher = None  # упреждающее чтение сетевых файлов (file_staging.PrefetchCache) или None
+        self.copy_workers = 1  # потоков чтения крупного сетевого файла (fast_copy)
+        self.deadline = None  # time.time(), к которому должна завершиться обработка файла (None - без таймаута)
+        self.timed_out = False  # последняя обработка остановлена по таймауту файла
         
         # Путь к Tesseract (автоматически определится)
         self.tesseract_path = None
         
         if OCR_AVAILABLE:
+            # Tesseract запускается напрямую по этому пути (ocr_page), без pytesseract
             self.tesseract_path = self.get_tesseract_path()
-            if self.tesseract_path:
-                try:
-                    pytesseract.pytesseract.tesseract_cmd = self.tesseract_path
-                except Exception as e:
-                    self._safe_log(f"Ошибка настройки Tesseract: {e}", "warning")
         else:
             self._safe_log("OCR зависимости не установлены: " + ", ".join(OCR_DEPENDENCIES), "warning")
         
@@ -83,14 +92,10 @@ class OCRProcessor:
         for path in possible_paths:
             if path == 'tesseract':
                 # Проверяем наличие в PATH
-                try:
-                    result = subprocess.run(['which', 'tesseract'], capture_output=True, text=True, timeout=2)
-                    if result.returncode == 0:
-                        found_path = result.stdout.strip()
-                        self._safe_log(f"Tesseract найден: {found_path}", "success")
-                        return found_path
-                except:
-                    continue
+                found_path = shutil.which('tesseract')
+                if found_path:
+                    self._safe_log(f"Tesseract найден: {found_path}", "success")
+                    return found_path
             elif os.path.exists(path):
                 self._safe_log(f"Tesseract найден: {path}", "success")
                 return path
@@ -109,25 +114,39 @@ class OCRProcessor:
             return False
             
         try:
-            # Проверяем, что Tesseract работает
-            version = subprocess.run([self.tesseract_path, '--version'], 
-                                    capture_output=True, text=True, timeout=5)
-            if version.returncode == 0:
-                self._safe_log(f"OCR доступен: Tesseract {version.stdout.split()[1]}", "success")
+            # Проверяем, что Tesseract работает (результат кэшируется по пути и времени изменения)
+            path, version = probe_tool(self.tesseract_path)
+            if path:
+                self._safe_log(f"OCR доступен: Tesseract {version.split()[1]}", "success")
                 return True
         except Exception as e:
             self._safe_log(f"Ошибка проверки Tesseract: {e}", "warning")
             
         return False
     
+    def remaining_timeout(self) -> Optional[float]:
+        """Сколько секунд осталось до таймаута файла (None - без таймаута); OCRTimeout, если он истек"""
+        if self.deadline is None:
+            return None
+        remaining = self.deadline - time.time()
+        if remaining <= 0:
+            raise OCRTimeout()
+        return remaining
+
     def process_with_tesseract(self, input_path: str, output_path: str, dpi: int = 150, 
-                            languages: List[str] = None) -> bool:
-        """Обрабатывает PDF через Tesseract OCR"""
+                            languages: List[str] = None, timeout_secs: Optional[float] = None) -> bool:
+        """
+        Обрабатывает PDF через Tesseract OCR. timeout_secs - таймаут файла на все этапы
+        (pdftoppm, Tesseract по страницам); при его истечении self.timed_out = True
+        """
+        self.deadline = time.time() + timeout_secs if timeout_secs else None
+        self.timed_out = False
         if not self.ocr_available:
             self._safe_log("OCR недоступен. Установите зависимости и Tesseract.", "error")
             return False
             
         temp_files = []
+        work_dir = tempfile.mkdtemp(prefix="pdf_ocr_", dir=self.temp_root)
         
         try:
             self._safe_log(f"Начало OCR-обработки файла: {os.path.basename(input_path)}")
@@ -140,7 +159,7 @@ class OCRProcessor:
             
             # Для сетевых файлов копируем локально
             local_input = input_path
-            if input_path.startswith('\\\\') or '://' in input_path:
+            if is_network_path(input_path):
                 local_input = self.copy_to_local(input_path)
                 if not local_input:
                     raise Exception("Не удалось скопировать сетевой файл")
@@ -151,7 +170,9 @@ class OCRProcessor:
             start_time = datetime.datetime.now()
             
             try:
-                pages = convert_from_path(local_input, dpi=dpi)
+                page_images = self.render_pages(local_input, dpi, work_dir)
+            except (OCRCancelled, OCRTimeout):
+                raise
             except MemoryError as e:
                 self._safe_log(f"❌ Недостаточно памяти для конвертации PDF: {os.path.basename(input_path)}", "error")
                 self._safe_log("Файл слишком большой или содержит слишком много страниц для обработки с текущим DPI", "error")
@@ -162,32 +183,25 @@ class OCRProcessor:
             
             conversion_time = (datetime.datetime.now() - start_time).total_seconds()
             
-            self._safe_log(f"Получено {len(pages)} страниц за {conversion_time:.1f} секунд")
+            self._safe_log(f"Получено {len(page_images)} страниц за {conversion_time:.1f} секунд")
             
-            if len(pages) == 0:
+            if len(page_images) == 0:
                 raise Exception("PDF не содержит страниц или поврежден")
             
             # 2. Обрабатываем каждую страницу через Tesseract
             pdf_pages = []
             
-            for i, page in enumerate(pages, 1):
-                if i % 5 == 0 or i == len(pages):
-                    self._safe_log(f"OCR страницы {i}/{len(pages)}...")
-                
-                # Создаем временный файл для изображения
-                with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as temp_img:
-                    page.save(temp_img.name, 'PNG', optimize=True)
-                    temp_files.append(temp_img.name)
+            for i, image_path in enumerate(page_images, 1):
+                if self.cancel_check():
+                    raise OCRCancelled()
+                if i % 5 == 0 or i == len(page_images):
+                    self._safe_log(f"OCR страницы {i}/{len(page_images)}...")
                 
                 # Выполняем OCR и получаем PDF с текстовым слоем
                 try:
-                    page_pdf_bytes = pytesseract.image_to_pdf_or_hocr(
-                        temp_img.name, 
-                        extension='pdf', 
-                        lang=lang_str,
-                        config='--psm 1 --oem 3'
-                    )
-                    pdf_pages.append(page_pdf_bytes)
+                    pdf_pages.append(self.ocr_page(image_path, lang_str))
+                except (OCRCancelled, OCRTimeout):
+                    raise
                 except Exception as e:
                     self._safe_log(f"Ошибка OCR страницы {i}: {e}", "warning")
                     # Продолжаем со следующей страницы
@@ -198,6 +212,7 @@ class OCRProcessor:
             
             # 3. Объединяем PDF-страницы
             self._safe_log("Объединение страниц...")
+            from PyPDF2 import PdfMerger
             merger = PdfMerger()
             
             for page_bytes in pdf_pages:
@@ -221,6 +236,13 @@ class OCRProcessor:
             else:
                 raise Exception("Результирующий файл пуст или не создан")
             
+        except OCRCancelled:
+            self._safe_log(f"OCR-обработка прервана по требованию пользователя: {os.path.basename(input_path)}", "warning")
+            return False
+        except OCRTimeout:
+            self.timed_out = True
+            self._safe_log(f"Таймаут OCR-обработки файла: {os.path.basename(input_path)}", "error")
+            return False
         except Exception as e:
             self._safe_log(f"Ошибка OCR-обработки: {str(e)}", "error")
             if hasattr(e, '__traceback__'):
@@ -235,22 +257,82 @@ class OCRProcessor:
                         os.remove(temp_file)
                 except Exception as e:
                     self._safe_log(f"Не удалось удалить временный файл {temp_file}: {e}", "warning")
+            shutil.rmtree(work_dir, ignore_errors=True)
+    
+    def render_pages(self, pdf_path: str, dpi: int, work_dir: str) -> List[str]:
+        """
+        Растеризует страницы PDF в PNG-файлы в work_dir и возвращает их пути по порядку.
+        pdftoppm запускается через супервизор (прерывается сразу по отмене);
+        без pdftoppm в PATH используется pdf2image.
+        """
+        prefix = os.path.join(work_dir, "page")
+        
+        if self.pdftoppm_path:
+            result = self.supervisor.run(
+                [self.pdftoppm_path, '-r', str(dpi), '-png', pdf_path, prefix],
+                timeout=self.remaining_timeout(),
+                cancel_check=self.cancel_check
+            )
+            if result.status == STATUS_CANCELLED:
+                raise OCRCancelled()
+            if result.status == STATUS_TIMEOUT:
+                raise OCRTimeout()
+            if result.status != STATUS_OK:
+                raise Exception(f"pdftoppm завершился с ошибкой: {result.stderr[:500]}")
+        else:
+            from pdf2image import convert_from_path
+            for i, page in enumerate(convert_from_path(pdf_path, dpi=dpi), 1):
+                if self.cancel_check():
+                    raise OCRCancelled()
+                self.remaining_timeout()
+                page.save(f"{prefix}-{i:06d}.png", 'PNG', optimize=True)
+        
+        # pdftoppm дополняет номер страницы нулями до одинаковой длины - сортировка по имени верна
+        return sorted(
+            os.path.join(work_dir, name) for name in os.listdir(work_dir)
+            if name.startswith("page-") and name.endswith(".png")
+        )
+    
+    def ocr_page(self, image_path: str, lang_str: str) -> bytes:
+        """Распознает одну страницу через Tesseract и возвращает PDF с текстовым слоем"""
+        output_base = os.path.splitext(image_path)[0]
+        result = self.supervisor.run(
+            [self.tesseract_path, image_path, output_base, '-l', lang_str, '--psm', '1', '--oem', '3', 'pdf'],
+            timeout=self.remaining_timeout(),
+            output_path=output_base + '.pdf',
+            cancel_check=self.cancel_check
+        )
+        if result.status == STATUS_CANCELLED:
+            raise OCRCancelled()
+        if result.status == STATUS_TIMEOUT:
+            raise OCRTimeout()
+        if result.status != STATUS_OK:
+            raise Exception(f"Tesseract завершился с ошибкой: {result.stderr[:500]}")
+        
+        with open(output_base + '.pdf', 'rb') as f:
+            page_pdf_bytes = f.read()
+        os.remove(output_base + '.pdf')
+        os.remove(image_path)
+        return page_pdf_bytes
     
     def process_with_tesseract_and_ghostscript(self, input_path: str, output_path: str, 
-                                            compression_level: int = 2) -> bool:
-        """Комбинированная обработка: OCR + Ghostscript сжатие"""
+                                            compression_level: int = 2,
+                                            timeout_secs: Optional[float] = None) -> bool:
+        """Комбинированная обработка: OCR + Ghostscript сжатие; timeout_secs - таймаут файла на оба этапа"""
+        self.deadline = time.time() + timeout_secs if timeout_secs else None
+        self.timed_out = False
         if not self.ocr_available:
             self._safe_log("OCR недоступен. Установите зависимости и Tesseract.", "error")
             return False
             
-        temp_dir = tempfile.gettempdir()
+        temp_dir = self.temp_root or tempfile.gettempdir()
         temp_ocr_pdf = os.path.join(temp_dir, f"temp_ocr_{os.path.basename(input_path)}")
         
         try:
             # 1. OCR-обработка
             self._safe_log("Этап 1/2: OCR-обработка...")
             try:
-                ocr_success = self.process_with_tesseract(input_path, temp_ocr_pdf)
+                ocr_success = self.process_with_tesseract(input_path, temp_ocr_pdf, timeout_secs=timeout_secs)
             except MemoryError as e:
                 self._safe_log(f"❌ Недостаточно памяти на этапе OCR", "error")
                 return False
@@ -296,25 +378,35 @@ class OCRProcessor:
             ]
             
             self._safe_log(f"Запуск Ghostscript с уровнем сжатия {compression_level}...")
-            result = subprocess.run(
+            try:
+                gs_timeout = self.remaining_timeout()
+            except OCRTimeout:
+                self.timed_out = True
+                self._safe_log("Таймаут файла истек до сжатия Ghostscript", "error")
+                return False
+            result = self.supervisor.run(
                 command,
-                capture_output=True,
-                text=True,
-                timeout=600  # 10 минут таймаут для больших файлов
+                timeout=gs_timeout or OCR_GS_DEFAULT_TIMEOUT_SECS,
+                cancel_check=self.cancel_check
             )
             
-            if result.returncode == 0:
+            if result.status == STATUS_OK:
                 output_size = os.path.getsize(output_path)
                 self._safe_log(f"Комбинированная обработка завершена успешно. Размер: {output_size/1024:.1f} KB", "success")
                 return True
+            elif result.status == STATUS_TIMEOUT:
+                self.timed_out = True
+                self._safe_log(f"Таймаут при сжатии Ghostscript ({timeout_secs or OCR_GS_DEFAULT_TIMEOUT_SECS:.0f} сек)",
+                               "error")
+                return False
+            elif result.status == STATUS_CANCELLED:
+                self._safe_log("Сжатие Ghostscript прервано по требованию пользователя", "warning")
+                return False
             else:
                 error_msg = result.stderr[:500] if result.stderr else "Неизвестная ошибка"
                 self._safe_log(f"Ошибка Ghostscript: {error_msg}", "error")
                 return False
                 
-        except subprocess.TimeoutExpired:
-            self._safe_log("Таймаут при сжатии Ghostscript (10 минут)", "error")
-            return False
         except MemoryError as e:
             self._safe_log(f"❌ Недостаточно памяти при комбинированной обработке", "error")
             return False
@@ -330,16 +422,18 @@ class OCRProcessor:
                 self._safe_log(f"Не удалось удалить временный файл: {e}", "warning")
     
     def copy_to_local(self, network_path: str) -> Optional[str]:
-        """Копирует файл на локальный диск"""
+        """Копирует файл на локальный диск (или берет копию, уже подготовленную упреждающим чтением)"""
         try:
-            temp_dir = tempfile.gettempdir()
+            temp_dir = self.temp_root or tempfile.gettempdir()
             filename = os.path.basename(network_path)
             # Добавляем timestamp для уникальности
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
             local_path = os.path.join(temp_dir, f"temp_{timestamp}_{filename}")
             
+            if self.prefetcher and self.prefetcher.take(network_path, local_path):
+                return local_path
             self._safe_log(f"Копирование сетевого файла на локальный диск: {local_path}")
-            shutil.copy2(network_path, local_path)
+            copy_file(network_path, local_path, workers=self.copy_workers)
             
             return local_path
         except Exception as e:
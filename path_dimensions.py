@@ -0,0 +1,117 @@
+# path_dimensions.py
+import re
+
+# Правила отнесения файла к отделу по пути (как в сводной "Сводная только по отделам НОВЫЕ
+# ПОКАЗАТЕЛИ!!!.sql"). Порядок важен: побеждает первое правило, подстрока которого есть в пути
+DEPARTMENT_RULES = [
+    ("ОГДиП", ["отделение гигиены детей и подростков", "огдип"]),
+    ("ОКГ", ["отделение коммунальной гигиены", "окг"]),
+    ("ОГиФТ", ["отделение гигиены и физиологии труда", "огифт"]),
+    ("ОГП", ["отделение гигиены питания", "огп"]),
+    ("СГО", ["санитарно-гигиенический отдел"]),
+    ("ОЖД", ["кемеровский филиал жд"]),
+    ("ЭО", ["эпидемиологический отдел", "эо"]),
+    ("ПЭО", ["планово-экономический отдел"]),
+    ("ОК", ["отдел кадров"]),
+    ("Руководящие документы", ["руководящие документы"]),
+    ("СГМ", ["отделение социально-гигиенического мониторинга"]),
+    ("ОГВиА", ["отделение гигиенического воспитания и аттестации"]),
+    ("ОИТО", ["отделение информационно-технического обеспечения"]),
+    ("ЮО", ["юридический отдел", "юо"]),
+    ("ИЛЦ", ["илц"]),
+    ("ОКС", ["контрактная служба", "конктракт"]),
+    ("ОХОиМТС", ["охоимтс"]),
+    ("БУХ", ["бухгалтерия"]),
+    ("АДМ", ["администрация"]),
+    ("ООДЦ", ["оодц"]),
+    ("ОК", ["кадры", "ок"]),
+]
+DEFAULT_DEPARTMENT = "другое"
+
+# Правила прежних сводных ("Расширенная сводная", "Сводная по отделам и успешности сжатия",
+# "Сводная только по отделам"): другой порядок, подписи и значение по умолчанию.
+# Хранятся отдельно (processed_files.department_legacy), чтобы эти отчеты не изменились
+LEGACY_DEPARTMENT_RULES = [
+    ("ОГДиП", ["огдип"]),
+    ("ОКГ", ["окг"]),
+    ("ЭО", ["эо"]),
+    ("ОГиФТ", ["огифт"]),
+    ("СГМ", ["сгм"]),
+    ("ЮО", ["юр. отдел", "юо"]),
+    ("ИЛЦ", ["илц"]),
+    ("СГО", ["сго"]),
+    ("ОКС", ["окс", "конктракт"]),
+    ("охоимтс", ["охоимтс"]),
+    ("ООДЦ", ["оодц"]),
+    ("бухгалтерия", ["бухгалтерия"]),
+    ("ОК", ["кадры", "отдел кадров", "ок"]),
+    ("администрация", ["администрация"]),
+]
+LEGACY_DEFAULT_DEPARTMENT = "Другое"
+
+
+class DepartmentMatcher:
+    """
+    Все подстроки правил собраны в одно регулярное выражение вида (?=(a|b|...)):
+    в каждой позиции пути движок re находит подстроку самого приоритетного правила,
+    начинающуюся в этой позиции, - путь просматривается один раз вместо цепочки LIKE.
+    Из найденных совпадений берется правило с наименьшим номером, как в CASE WHEN
+    """
+
+    def __init__(self, rules=DEPARTMENT_RULES, default=DEFAULT_DEPARTMENT):
+        self.default = default
+        self.departments = [department for department, _ in rules]
+        self.priority = {}  # подстрока -> номер правила
+        for index, (_, patterns) in enumerate(rules):
+            for pattern in patterns:
+                self.priority.setdefault(pattern, index)
+        ordered = sorted(self.priority, key=lambda pattern: (self.priority[pattern], -len(pattern)))
+        self.regex = re.compile("(?=(" + "|".join(re.escape(pattern) for pattern in ordered) + "))")
+
+    def classify(self, path):
+        if not path:
+            return self.default
+        best = None
+        for match in self.regex.finditer(path.lower()):
+            index = self.priority[match.group(1)]
+            if best is None or index < best:
+                best = index
+                if best == 0:
+                    break
+        return self.departments[best] if best is not None else self.default
+
+
+_matcher = DepartmentMatcher()
+_legacy_matcher = DepartmentMatcher(LEGACY_DEPARTMENT_RULES, LEGACY_DEFAULT_DEPARTMENT)
+
+
+def classify_department(path):
+    """Отдел по пути файла (DEFAULT_DEPARTMENT, если ни одно правило не подошло)"""
+    return _matcher.classify(path)
+
+
+def classify_legacy_department(path):
+    """Отдел по правилам прежних сводных (LEGACY_DEFAULT_DEPARTMENT, если ни одно правило не подошло)"""
+    return _legacy_matcher.classify(path)
+
+
+def top_level_folder(path):
+    """
+    Папка верхнего уровня нормализованного пути: первая папка после диска (c:/folder/...),
+    для остальных путей - после сервера и шары (normalize_path хранит //server/share как /server/share;
+    в Linux это точка монтирования вида /mnt/share)
+    """
+    if not path:
+        return None
+    parts = [part for part in path.replace('\\', '/').split('/') if part]
+    if parts and parts[0].endswith(':'):
+        folders = parts[1:-1]
+    else:
+        folders = parts[2:-1]
+    return folders[0] if folders else None
+
+
+def path_dimensions(path):
+    """Измерения, вычисляемые по пути один раз при записи файла"""
+    return {"department": classify_department(path), "department_legacy": classify_legacy_department(path),
+            "top_folder": top_level_folder(path)}
@@ -0,0 +1,96 @@
+# path_normalizer.py
+import os
+import re
+from functools import lru_cache
+
+# Сколько нормализованных папок держать в кэше (файлы одной папки нормализуются через нее)
+DIRECTORY_CACHE_SIZE = 65536
+
+_SLASHES = re.compile(r'/+')
+_SPECIAL_NAMES = ('', '.', '..')
+
+
+def normalize_full(file_path):
+    """
+    Нормализация пути для сетевых и локальных путей: абсолютный путь, прямые слеши,
+    нижний регистр для Windows и сетевых путей (//server/share), без повторных и конечных слешей.
+    Сетевой путь //server/share хранится как /server/share
+    """
+    try:
+        # Приводим к абсолютному пути, если это возможно
+        try:
+            abs_path = os.path.abspath(file_path)
+        except:
+            abs_path = file_path
+
+        normalized = abs_path.replace('\\', '/')
+        # Для Windows путей (включая сетевые) приводим к нижнему регистру
+        if os.name == 'nt' or normalized.startswith('//'):
+            normalized = normalized.lower()
+        return _SLASHES.sub('/', normalized.rstrip('/'))
+
+    except Exception as e:
+        print(f"Ошибка нормализации пути {file_path}: {e}")
+        # Возвращаем упрощенную версию в случае ошибки
+        return file_path.replace('\\', '/').lower()
+
+
+class PathNormalizer:
+    """
+    Нормализация путей с кэшем по папкам. Путь файла делится на папку и имя: папка нормализуется
+    один раз (abspath, регулярное выражение) и берется из LRU-кэша для всех ее файлов, к имени
+    применяется только нижний регистр, если он действует для папки. Результат совпадает с
+    normalize_full. Относительные пути (зависят от текущей папки) и имена, которые abspath
+    может изменить (".", "..", точка или пробел в конце в Windows), нормализуются целиком
+    """
+
+    def __init__(self, cache_size=DIRECTORY_CACHE_SIZE):
+        self._normalize_directory = lru_cache(maxsize=cache_size)(self._directory_form)
+        # В Windows разделители - оба слеша; в остальных ОС обратный слеш - часть имени
+        self.separators = '/\\' if os.name == 'nt' else '/'
+
+    @staticmethod
+    def _directory_form(dir_path):
+        """(нормализованная папка, приводится ли регистр к нижнему)"""
+        abs_path = os.path.abspath(dir_path).replace('\\', '/')
+        lower = os.name == 'nt' or abs_path.startswith('//')
+        if lower:
+            abs_path = abs_path.lower()
+        return _SLASHES.sub('/', abs_path.rstrip('/')), lower
+
+    def normalize(self, file_path):
+        try:
+            cut = max(file_path.rfind(separator) for separator in self.separators)
+            dir_path, file_name = file_path[:cut], file_path[cut + 1:]
+            # Файлы в корне ("/", "//") нормализуются целиком: abspath корня отличается от abspath пути
+            if (cut <= 0 or not dir_path.strip(self.separators) or file_name in _SPECIAL_NAMES or file_name[-1] in '. '
+                    or '\\' in file_name or not os.path.isabs(file_path)):
+                return normalize_full(file_path)
+            dir_path, lower = self._normalize_directory(dir_path)
+        except Exception:
+            return normalize_full(file_path)
+        return f"{dir_path}/{file_name.lower() if lower else file_name}"
+
+    def normalize_many(self, file_paths):
+        """Нормализует пакет путей (например, результат сканирования), порядок сохраняется"""
+        normalize = self.normalize
+        return [normalize(path) for path in file_paths]
+
+    def cache_info(self):
+        return self._normalize_directory.cache_info()
+
+    def cache_clear(self):
+        self._normalize_directory.cache_clear()
+
+
+_normalizer = PathNormalizer()
+
+
+def normalize_path(file_path):
+    """Нормализованный путь для хранения и поиска в БД"""
+    return _normalizer.normalize(file_path)
+
+
+def normalize_paths(file_paths):
+    """Нормализованные пути пакета файлов"""
+    return _normalizer.normalize_many(file_paths)
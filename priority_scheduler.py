@@ -0,0 +1,154 @@
+# priority_scheduler.py
+import math
+import os
+
+from path_dimensions import classify_department
+
+# Оценки без истории: доля экономии, сек на МБ и постоянная часть времени файла (запуск, копирование)
+DEFAULT_SAVING_RATIO = 0.3
+DEFAULT_SECS_PER_MB = 1.0
+BASE_FILE_SECS = 2.0
+# Вес априорной оценки в "файлах": папке с парой записей доверяем меньше, чем отделу
+PRIOR_WEIGHT_FILES = 5
+# Минимум записей в группе КБ/стр, чтобы брать ее долю экономии
+MIN_DENSITY_SAMPLES = 20
+# Файлы меньше порога конвейер пропускает без сжатия - экономии от них нет
+MIN_FILE_BYTES = 1024 * 1024
+
+
+def density_bucket(kbytes_per_page):
+    """Группа плотности: степень двойки КБ/стр (..., 64-128, 128-256, ...)"""
+    return int(math.floor(math.log2(kbytes_per_page))) if kbytes_per_page > 0 else None
+
+
+class GroupStats:
+    """Суммы по записям processed_files группы (папка, отдел или вся история)"""
+
+    __slots__ = ("files", "origin_kb", "saved_kb", "paged_origin_kb", "pages", "timed_origin_kb", "seconds")
+
+    def __init__(self):
+        self.files = 0
+        self.origin_kb = 0.0
+        self.saved_kb = 0.0
+        self.paged_origin_kb = 0.0
+        self.pages = 0
+        self.timed_origin_kb = 0.0
+        self.seconds = 0.0
+
+    def add(self, row):
+        self.files += row.files or 0
+        self.origin_kb += row.origin_kb or 0.0
+        self.saved_kb += row.saved_kb or 0.0
+        self.paged_origin_kb += row.paged_origin_kb or 0.0
+        self.pages += row.pages or 0
+        self.timed_origin_kb += row.timed_origin_kb or 0.0
+        self.seconds += row.seconds or 0.0
+
+    def kbytes_per_page(self):
+        return self.paged_origin_kb / self.pages if self.pages else None
+
+    def saving_ratio(self, prior):
+        """Доля экономии, сглаженная к prior: PRIOR_WEIGHT_FILES файлов среднего размера группы"""
+        if not self.files or self.origin_kb <= 0:
+            return prior
+        weight_kb = PRIOR_WEIGHT_FILES * self.origin_kb / self.files
+        return (self.saved_kb + prior * weight_kb) / (self.origin_kb + weight_kb)
+
+    def secs_per_mb(self, prior):
+        if self.timed_origin_kb <= 0 or not self.files:
+            return prior
+        weight_mb = PRIOR_WEIGHT_FILES * self.timed_origin_kb / 1024.0 / self.files
+        return (self.seconds + prior * weight_mb) / (self.timed_origin_kb / 1024.0 + weight_mb)
+
+
+class SavingsPriorityModel:
+    """
+    Порядок очереди по ожидаемой экономии на секунду обработки. Для файла оцениваются
+    экономия (размер * доля экономии) и время (BASE_FILE_SECS + размер * сек/МБ).
+    Доля экономии: по истории всех файлов той же плотности (КБ/стр папки), уточненная по
+    отделу и затем по самой папке; сек/МБ - по отделу и папке. Чем меньше у группы
+    записей, тем ближе ее оценка к оценке уровня выше. Без истории порядок - по размеру,
+    крупные файлы первыми
+    """
+
+    def __init__(self):
+        self.directories = {}  # нормализованная папка -> GroupStats
+        self.departments = {}  # отдел -> GroupStats
+        self.total = GroupStats()
+        self.density_ratio = {}  # группа КБ/стр -> доля экономии
+
+    def fit(self, directory_rows, density_samples):
+        """
+        directory_rows - суммы по папкам (DBOperations.get_directory_saving_history),
+        density_samples - (исходный размер КБ, страниц, экономия КБ) последних файлов
+        """
+        for row in directory_rows:
+            self.directories.setdefault(row.dir_path, GroupStats()).add(row)
+            self.departments.setdefault(row.department, GroupStats()).add(row)
+            self.total.add(row)
+
+        buckets = {}  # группа -> [файлов, исходный КБ, экономия КБ]
+        for origin_kb, pages, saved_kb in density_samples:
+            if not origin_kb or not pages or pages <= 0:
+                continue
+            bucket = buckets.setdefault(density_bucket(origin_kb / pages), [0, 0.0, 0.0])
+            bucket[0] += 1
+            bucket[1] += origin_kb
+            bucket[2] += saved_kb or 0.0
+        self.density_ratio = {
+            key: saved / origin for key, (count, origin, saved) in buckets.items()
+            if count >= MIN_DENSITY_SAMPLES and origin > 0
+        }
+        return self
+
+    def estimate(self, dir_path, department, size_bytes):
+        """(ожидаемая экономия МБ, ожидаемое время, сек) для файла папки dir_path"""
+        size_mb = size_bytes / (1024.0 * 1024.0)
+        directory = self.directories.get(dir_path)
+        department_stats = self.departments.get(department)
+
+        kbytes_per_page = next((group.kbytes_per_page() for group in (directory, department_stats, self.total)
+                                if group is not None and group.pages), None)
+        ratio = self.density_ratio.get(density_bucket(kbytes_per_page)) if kbytes_per_page else None
+        if ratio is None:
+            ratio = self.total.saving_ratio(DEFAULT_SAVING_RATIO)
+        secs_per_mb = self.total.secs_per_mb(DEFAULT_SECS_PER_MB)
+        for group in (department_stats, directory):
+            if group is not None:
+                ratio = group.saving_ratio(ratio)
+                secs_per_mb = group.secs_per_mb(secs_per_mb)
+
+        if size_bytes < MIN_FILE_BYTES:
+            return 0.0, BASE_FILE_SECS
+        return size_mb * ratio, BASE_FILE_SECS + size_mb * secs_per_mb
+
+    def order(self, file_paths, normalized_paths, sizes):
+        """
+        Пути файлов по убыванию экономии на секунду (при равенстве - в исходном порядке).
+        sizes - размеры в байтах (None - файл недоступен, он уходит в конец очереди).
+        Возвращает (пути, ожидаемая экономия МБ в том же порядке)
+        """
+        scored = []
+        for index, (file_path, normalized, size) in enumerate(zip(file_paths, normalized_paths, sizes)):
+            if size is None:
+                scored.append((0.0, index, file_path, 0.0))
+                continue
+            saved_mb, seconds = self.estimate(normalized.rpartition('/')[0], classify_department(normalized), size)
+            scored.append((-saved_mb / seconds, index, file_path, saved_mb))
+        scored.sort()
+        return [item[2] for item in scored], [item[3] for item in scored]
+
+
+def file_sizes(file_paths, known_sizes=None):
+    """Размеры файлов: из known_sizes (собраны при сканировании), для остальных - stat"""
+    known_sizes = known_sizes or {}
+    sizes = []
+    for file_path in file_paths:
+        size = known_sizes.get(file_path)
+        if size is None:
+            try:
+                size = os.stat(file_path).st_size
+            except OSError:
+                size = None
+        sizes.append(size)
+    return sizes
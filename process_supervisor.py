@@ -0,0 +1,277 @@
+# process_supervisor.py
+import os
+import signal
+import subprocess
+import tempfile
+import time
+
+try:
+    import resource  # только POSIX: лимиты CPU/памяти для дочерних процессов
+except ImportError:
+    resource = None
+
+# Итоговые состояния процесса под наблюдением
+STATUS_OK = "ok"
+STATUS_FAILED = "failed"
+STATUS_TIMEOUT = "timeout"
+STATUS_OUTPUT_LIMIT = "output_limit"
+STATUS_CANCELLED = "cancelled"
+
+
+class ProcessResult:
+    """Результат выполнения процесса под наблюдением"""
+
+    def __init__(self, status, returncode=None, stderr="", elapsed=0.0, output_size=0,
+                 cpu_seconds=None, peak_rss_kb=None):
+        self.status = status
+        self.returncode = returncode
+        self.stderr = stderr
+        self.elapsed = elapsed
+        self.output_size = output_size
+        self.cpu_seconds = cpu_seconds  # user + system процесса (POSIX, по wait4)
+        self.peak_rss_kb = peak_rss_kb  # пик резидентной памяти процесса, КБ (POSIX)
+
+    @property
+    def ok(self):
+        return self.status == STATUS_OK
+
+
+def _make_limits_setter(cpu_limit_secs, memory_limit_mb):
+    """Возвращает preexec_fn, выставляющую rlimit'ы в дочернем процессе (POSIX)"""
+    if resource is None or (not cpu_limit_secs and not memory_limit_mb):
+        return None
+
+    def set_limits():
+        if cpu_limit_secs:
+            cpu = int(cpu_limit_secs)
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 5))
+        if memory_limit_mb:
+            memory = int(memory_limit_mb) * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+
+    return set_limits
+
+
+def _exit_code(wait_status):
+    """Код завершения из статуса wait (как Popen.returncode: -N при завершении сигналом N)"""
+    if os.WIFSIGNALED(wait_status):
+        return -os.WTERMSIG(wait_status)
+    if os.WIFEXITED(wait_status):
+        return os.WEXITSTATUS(wait_status)
+    return wait_status
+
+
+class SupervisedProcess:
+    """
+    Запущенный процесс, за которым следит супервизор.
+    Процесс стартует в отдельной группе, поэтому останавливается вместе со всеми дочерними.
+    Если выходной файл вырос больше max_output_size, процесс останавливается досрочно:
+    файл только растет, поэтому результат заведомо не уложится в лимит.
+    """
+
+    def __init__(self, command, output_path=None, max_output_size=None, cancel_check=None,
+                 cleanup_paths=None, cpu_limit_secs=None, memory_limit_mb=None, on_finish=None):
+        self.command = command
+        self.on_finish = on_finish
+        self.rusage = None
+        self.output_path = output_path
+        self.max_output_size = max_output_size
+        self.cancel_check = cancel_check
+        self.cpu_limit_secs = cpu_limit_secs
+        self.cleanup_paths = list(cleanup_paths or [])
+        if output_path:
+            self.cleanup_paths.append(output_path)
+        self.start_time = time.time()
+        # stderr пишем во временный файл, а не в PIPE - иначе переполнение буфера повесит процесс
+        self._stderr_file = tempfile.TemporaryFile()
+
+        popen_kwargs = {}
+        if os.name == 'nt':
+            popen_kwargs['creationflags'] = subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            popen_kwargs['start_new_session'] = True
+            preexec_fn = _make_limits_setter(cpu_limit_secs, memory_limit_mb)
+            if preexec_fn:
+                popen_kwargs['preexec_fn'] = preexec_fn
+
+        self.process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=self._stderr_file,
+                                        **popen_kwargs)
+        self.result = None
+
+    def output_size(self):
+        """Текущий размер выходного файла (0, если он еще не создан)"""
+        try:
+            if self.output_path and os.path.exists(self.output_path):
+                return os.path.getsize(self.output_path)
+        except OSError:
+            pass
+        return 0
+
+    def check(self):
+        """
+        Проверяет состояние процесса. Возвращает ProcessResult, если процесс завершен
+        (сам, по отмене или по лимиту размера), иначе None.
+        """
+        if self.result is not None:
+            return self.result
+
+        returncode = self._poll()
+        if returncode is not None:
+            if returncode == 0:
+                status = STATUS_OK
+            elif self._cpu_limit_exceeded(returncode):
+                status = STATUS_TIMEOUT
+            else:
+                status = STATUS_FAILED
+            return self._finish(status)
+
+        if self.cancel_check and self.cancel_check():
+            return self.stop(STATUS_CANCELLED)
+
+        if self.max_output_size is not None and self.output_size() > self.max_output_size:
+            return self.stop(STATUS_OUTPUT_LIMIT)
+
+        return None
+
+    def _cpu_limit_exceeded(self, returncode):
+        """
+        Процесс остановлен лимитом процессорного времени: SIGXCPU по мягкому лимиту или
+        SIGKILL по жесткому (когда израсходованное CPU-время дошло до лимита)
+        """
+        if not self.cpu_limit_secs or os.name == 'nt':
+            return False
+        if returncode == -signal.SIGXCPU:
+            return True
+        if returncode == -signal.SIGKILL and self.rusage is not None:
+            return self.rusage.ru_utime + self.rusage.ru_stime >= int(self.cpu_limit_secs)
+        return False
+
+    def kill(self):
+        """Немедленно останавливает процесс вместе со всеми его дочерними процессами"""
+        try:
+            if self.process.poll() is not None:
+                return
+            if os.name == 'nt':
+                subprocess.run(['taskkill', '/F', '/T', '/PID', str(self.process.pid)],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            else:
+                os.killpg(self.process.pid, signal.SIGKILL)
+        except Exception:
+            pass
+        try:
+            self.process.kill()
+        except Exception:
+            pass
+        try:
+            self._poll(block=True)
+        except Exception:
+            pass
+
+    def _poll(self, block=False):
+        """
+        Код завершения процесса или None. На POSIX процесс собирается через wait4,
+        чтобы получить его потребление ресурсов (CPU, пик памяти)
+        """
+        if self.process.returncode is not None:
+            return self.process.returncode
+        if not hasattr(os, 'wait4'):
+            return self.process.wait(timeout=5) if block else self.process.poll()
+        try:
+            pid, status, rusage = os.wait4(self.process.pid, 0 if block else os.WNOHANG)
+        except ChildProcessError:
+            return self.process.poll()
+        if pid == 0:
+            return None
+        self.process.returncode = _exit_code(status)
+        self.rusage = rusage
+        return self.process.returncode
+
+    def stop(self, status):
+        """Останавливает процесс, удаляет его временные файлы и фиксирует результат"""
+        if self.result is None:
+            self.kill()
+            self._finish(status)
+            self.remove_temp_files()
+        return self.result
+
+    def remove_temp_files(self):
+        """Удаляет выходной и прочие временные файлы задания"""
+        for path in self.cleanup_paths:
+            try:
+                if path and os.path.exists(path):
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def _finish(self, status):
+        stderr = ""
+        try:
+            self._stderr_file.seek(0)
+            stderr = self._stderr_file.read().decode('utf-8', errors='replace')
+            self._stderr_file.close()
+        except Exception:
+            pass
+
+        self.result = ProcessResult(
+            status=status,
+            returncode=self.process.returncode,
+            stderr=stderr,
+            elapsed=time.time() - self.start_time,
+            output_size=self.output_size(),
+            cpu_seconds=self.rusage.ru_utime + self.rusage.ru_stime if self.rusage else None,
+            peak_rss_kb=self.rusage.ru_maxrss if self.rusage else None
+        )
+        if self.on_finish:
+            self.on_finish(self.result)
+        return self.result
+
+
+class ProcessSupervisor:
+    """
+    Запуск внешних программ (Ghostscript, Tesseract, pdftoppm) с таймаутом, отменой,
+    контролем размера выходного файла и лимитами ресурсов (POSIX).
+    """
+
+    def __init__(self, poll_interval=0.02, memory_limit_mb=None):
+        self.poll_interval = poll_interval
+        self.memory_limit_mb = memory_limit_mb
+        self.on_finish = None  # вызывается с ProcessResult каждого завершенного процесса (замер этапов)
+
+    def start(self, command, output_path=None, max_output_size=None, cancel_check=None,
+              cleanup_paths=None, cpu_limit_secs=None):
+        """Запускает процесс и возвращает SupervisedProcess без ожидания"""
+        return SupervisedProcess(
+            command,
+            output_path=output_path,
+            max_output_size=max_output_size,
+            cancel_check=cancel_check,
+            cleanup_paths=cleanup_paths,
+            cpu_limit_secs=cpu_limit_secs,
+            memory_limit_mb=self.memory_limit_mb,
+            on_finish=self.on_finish
+        )
+
+    def run(self, command, timeout=None, output_path=None, max_output_size=None, cancel_check=None,
+            cleanup_paths=None, cpu_limit_secs=None):
+        """
+        Запускает процесс и ждет его завершения.
+        Процесс (со всеми дочерними) останавливается досрочно по таймауту, по отмене
+        (cancel_check вернул True) или когда выходной файл превысил max_output_size.
+        """
+        supervised = self.start(
+            command,
+            output_path=output_path,
+            max_output_size=max_output_size,
+            cancel_check=cancel_check,
+            cleanup_paths=cleanup_paths,
+            cpu_limit_secs=cpu_limit_secs
+        )
+        deadline = time.time() + timeout if timeout else None
+
+        while True:
+            result = supervised.check()
+            if result is not None:
+                return result
+            if deadline is not None and time.time() > deadline:
+                return supervised.stop(STATUS_TIMEOUT)
+            time.sleep(self.poll_interval)
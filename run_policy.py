@@ -0,0 +1,164 @@
+# run_policy.py
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Новый файл не начинается, если до конца окна или лимита времени осталось меньше средней
+# длительности файла, но не меньше этого запаса, сек
+POLICY_MIN_MARGIN_SECS = 60
+# Шаг ожидания окна обработки (проверка отмены), сек
+WINDOW_POLL_SECS = 5
+
+STOP_OUTSIDE_WINDOW = "вне окна обработки"
+STOP_WINDOW_ENDING = "окно обработки заканчивается"
+STOP_WALL_TIME = "исчерпан лимит времени"
+STOP_BYTES_READ = "исчерпан лимит чтения"
+STOP_CPU_TIME = "исчерпан лимит процессорного времени"
+
+
+def parse_clock(text):
+    """Время суток из строки "ЧЧ:ММ" (None для пустой строки); ValueError при неверном формате"""
+    text = (text or "").strip()
+    if not text:
+        return None
+    return datetime.strptime(text, "%H:%M").time()
+
+
+class RunPolicy:
+    """
+    Ограничения запуска: окно обработки (время суток начала и конца, через полночь - например,
+    22:00-06:00) и бюджеты: время, прочитанные с хранилища ГБ, процессорные часы внешних
+    процессов. 0 - без ограничения. С окном бюджеты действуют на каждое окно отдельно
+    """
+
+    def __init__(self, window_start=None, window_end=None, max_hours=0.0, max_read_gb=0.0, max_cpu_hours=0.0):
+        self.window_start = parse_clock(window_start) if isinstance(window_start, str) else window_start
+        self.window_end = parse_clock(window_end) if isinstance(window_end, str) else window_end
+        self.max_seconds = (max_hours or 0) * 3600
+        self.max_read_bytes = (max_read_gb or 0) * 1024 ** 3
+        self.max_cpu_seconds = (max_cpu_hours or 0) * 3600
+
+    @classmethod
+    def from_setting(cls, setting):
+        if setting is None:
+            return cls()
+        return cls(setting.run_window_start, setting.run_window_end, setting.run_max_hours,
+                   setting.run_max_read_gb, setting.run_max_cpu_hours)
+
+    def has_window(self):
+        return self.window_start is not None and self.window_end is not None
+
+    def is_limited(self):
+        return self.has_window() or bool(self.max_seconds or self.max_read_bytes or self.max_cpu_seconds)
+
+    def in_window(self, now):
+        if not self.has_window():
+            return True
+        current = now.time()
+        if self.window_start == self.window_end:
+            return True
+        if self.window_start < self.window_end:
+            return self.window_start <= current < self.window_end
+        return current >= self.window_start or current < self.window_end
+
+    def seconds_to_window_end(self, now):
+        """Сколько осталось до конца текущего окна, сек (None - окно не задано или круглосуточное)"""
+        if not self.has_window() or self.window_start == self.window_end:
+            return None
+        if not self.in_window(now):
+            return 0.0
+        end = datetime.combine(now.date(), self.window_end)
+        if end <= now:
+            end += timedelta(days=1)
+        return (end - now).total_seconds()
+
+    def next_window_start(self, now):
+        """Ближайшее начало окна после now"""
+        start = datetime.combine(now.date(), self.window_start)
+        if start <= now:
+            start += timedelta(days=1)
+        return start
+
+    def describe(self):
+        parts = []
+        if self.has_window():
+            parts.append(f"окно {self.window_start:%H:%M}-{self.window_end:%H:%M}")
+        if self.max_seconds:
+            parts.append(f"время {self.max_seconds / 3600:g} ч")
+        if self.max_read_bytes:
+            parts.append(f"чтение {self.max_read_bytes / 1024 ** 3:g} ГБ")
+        if self.max_cpu_seconds:
+            parts.append(f"CPU {self.max_cpu_seconds / 3600:g} ч")
+        return ", ".join(parts)
+
+
+class RunBudget:
+    """
+    Расход окна обработки: время с начала, прочитанные байты, процессорное время внешних процессов.
+    stop_reason() решает перед каждым файлом, можно ли его начать: файл не начинается, если
+    по средней длительности и расходу CPU прошлых файлов (и по размеру самого файла) он
+    не уложится в оставшийся бюджет. Начатые файлы доводятся до конца
+    """
+
+    def __init__(self, policy, clock=time.monotonic, now=datetime.now):
+        self.policy = policy
+        self.clock = clock
+        self.now = now
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Новое окно обработки - бюджеты заново"""
+        with self._lock:
+            self.started = self.clock()
+            self.bytes_read = 0
+            self.cpu_seconds = 0.0
+            self.jobs = 0
+            self.job_seconds = 0.0
+
+    def add_process(self, result):
+        """Учитывает завершенный внешний процесс (ProcessResult); без rusage (Windows) - по времени работы"""
+        seconds = result.cpu_seconds if result.cpu_seconds is not None else result.elapsed
+        with self._lock:
+            self.cpu_seconds += seconds or 0.0
+
+    def account_read(self, nbytes):
+        with self._lock:
+            self.bytes_read += nbytes
+
+    def job_finished(self, seconds):
+        with self._lock:
+            self.jobs += 1
+            self.job_seconds += seconds
+
+    def stop_reason(self, next_file_bytes=0):
+        """Причина не начинать следующий файл или None"""
+        policy = self.policy
+        with self._lock:
+            average_job = self.job_seconds / self.jobs if self.jobs else 0.0
+            average_cpu = self.cpu_seconds / self.jobs if self.jobs else 0.0
+            elapsed = self.clock() - self.started
+            bytes_read = self.bytes_read
+            cpu_seconds = self.cpu_seconds
+        margin = max(average_job, POLICY_MIN_MARGIN_SECS)
+
+        now = self.now()
+        if not policy.in_window(now):
+            return STOP_OUTSIDE_WINDOW
+        to_window_end = policy.seconds_to_window_end(now)
+        if to_window_end is not None and to_window_end < margin:
+            return STOP_WINDOW_ENDING
+        if policy.max_seconds and elapsed + margin > policy.max_seconds:
+            return STOP_WALL_TIME
+        # Файл больше всего лимита чтения начинается в новом окне - иначе он не начнется никогда
+        if policy.max_read_bytes and bytes_read and bytes_read + next_file_bytes > policy.max_read_bytes:
+            return STOP_BYTES_READ
+        if policy.max_cpu_seconds and cpu_seconds + average_cpu > policy.max_cpu_seconds:
+            return STOP_CPU_TIME
+        return None
+
+    def usage(self):
+        """Расход для журнала"""
+        with self._lock:
+            return (f"{(self.clock() - self.started) / 3600:.2f} ч, прочитано {self.bytes_read / 1024 ** 3:.2f} ГБ, "
+                    f"CPU {self.cpu_seconds / 3600:.2f} ч")
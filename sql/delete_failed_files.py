@@ -10,7 +10,8 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Теперь можно импортировать
 from models.database import SessionLocal
-from models.models import ProcessedFile
+from models.models import ProcessedFile, FileTiming
+from crud.operations import DBOperations
 
 def delete_failed_processed_files():
     """Удаляет записи о неудачно обработанных файлах"""
@@ -21,10 +22,17 @@ def delete_failed_processed_files():
         print(f"Найдено неудачных записей: {failed_count}")
         
         if failed_count > 0:
+            # Сначала замеры этапов удаляемых записей (file_timing ссылается на processed_files)
+            failed_ids = db.query(ProcessedFile.id).filter(ProcessedFile.is_successful == False)
+            timings_deleted = db.query(FileTiming).filter(
+                FileTiming.processed_file_id.in_(failed_ids.scalar_subquery())
+            ).delete(synchronize_session=False)
             # Удаляем записи
             deleted = db.query(ProcessedFile).filter(ProcessedFile.is_successful == False).delete()
             db.commit()
-            print(f"Удалено записей: {deleted}")
+            print(f"Удалено записей: {deleted} (замеров этапов: {timings_deleted})")
+            # Сводка окна статистики пересчитывается по оставшимся записям
+            DBOperations(db).rebuild_daily_stats()
         else:
             print("Неудачных записей не найдено")
             
@@ -17,6 +17,7 @@ sys.path.insert(0, str(project_root))
 
 from models.database import get_db, create_tables
 from models.models import Setting, ProcessedFile
+from crud.operations import DBOperations
 
 
 def fix_timezone_offset():
@@ -62,6 +63,10 @@ def fix_timezone_offset():
         print("3. Сохраняем изменения в базе...")
         db.commit()
 
+        # Сдвиг времени переносит записи между сутками - сводка окна статистики пересчитывается
+        print("   Пересчитываем суточную сводку статистики...")
+        DBOperations(db).rebuild_daily_stats()
+
         # 4. Выводим статистику
         print("\n=== РЕЗУЛЬТАТЫ КОРРЕКТИРОВКИ ===")
         print(f"Таблица Setting: {settings_updated} записей обновлено")
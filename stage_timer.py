@@ -0,0 +1,91 @@
+# stage_timer.py
+import time
+
+# Этапы обработки файла; совпадают с полями <этап>_secs таблицы file_timing
+STAGES = ("stat", "db_lookup", "page_count", "admission", "copy", "compress", "replace", "db_write")
+
+
+class _NullStage:
+    """Пустой контекст для выключенного замера: без вызовов таймера"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.monotonic()
+        return self
+
+    def __exit__(self, *exc):
+        stages = self.timer.stages
+        stages[self.name] = stages.get(self.name, 0.0) + time.monotonic() - self.start
+        return False
+
+
+class StageTimer:
+    """
+    Замер времени этапов обработки файла монотонными часами.
+    Последовательные этапы отмечаются lap(): время с предыдущей отметки относится к этапу.
+    Вложенные этапы (копирование внутри сжатия) замеряются через stage() и суммируются.
+    Ресурсы внешних процессов (CPU, пик памяти) приходят от супервизора через add_process.
+    Выключенный таймер сводится к проверке одного флага.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self):
+        self.stages = {}
+        self.child_cpu_secs = 0.0
+        self.child_peak_rss_kb = 0
+        self.child_processes = 0
+        self.recordable = False  # файл обрабатывается впервые - замер можно связать с новой записью
+        self.started = self.last_lap = time.monotonic() if self.enabled else 0.0
+
+    def lap(self, name):
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        self.stages[name] = self.stages.get(name, 0.0) + now - self.last_lap
+        self.last_lap = now
+
+    def stage(self, name):
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def add_process(self, result):
+        """Учитывает завершенный внешний процесс (ProcessResult)"""
+        if not self.enabled:
+            return
+        self.child_processes += 1
+        if result.cpu_seconds:
+            self.child_cpu_secs += result.cpu_seconds
+        if result.peak_rss_kb:
+            self.child_peak_rss_kb = max(self.child_peak_rss_kb, result.peak_rss_kb)
+
+    def total(self):
+        return time.monotonic() - self.started if self.enabled else 0.0
+
+    def as_record(self):
+        """Поля для FileTiming"""
+        record = {f"{name}_secs": self.stages.get(name) for name in STAGES}
+        record.update({
+            "total_secs": self.total(),
+            "child_cpu_secs": self.child_cpu_secs if self.child_processes else None,
+            "child_peak_rss_mb": self.child_peak_rss_kb / 1024.0 if self.child_peak_rss_kb else None,
+            "child_processes": self.child_processes
+        })
+        return record
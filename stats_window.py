@@ -5,7 +5,7 @@ from tkinter import ttk, messagebox
 from datetime import datetime
 from sqlalchemy import func, case
 from models.database import get_db
-from models.models import ProcessedFile, Setting
+from models.models import ProcessedFile, Setting, DailyStats
 
 
 class StatsWindow:
@@ -49,6 +49,12 @@ class StatsWindow:
             command=self.show_extended_stats
         ).pack(side=tk.RIGHT, padx=5)
 
+        ttk.Button(
+            header_frame,
+            text="🏢 Сводная по отделам",
+            command=self.show_department_pivot
+        ).pack(side=tk.RIGHT, padx=5)
+
         # Описание
         desc_frame = ttk.LabelFrame(self.window, text="Описание")
         desc_frame.pack(fill=tk.X, padx=10, pady=5)
@@ -186,52 +192,34 @@ class StatsWindow:
         except Exception as e:
             messagebox.showerror("Ошибка", f"Не удалось загрузить данные: {e}")
 
-    def calculate_saved_space_for_period(self, db, period, group_by):
-        """Расчет сэкономленного места за период"""
-        try:
-            # Получаем все успешно обработанные файлы за период
-            if group_by == "month":
-                date_filter = func.strftime("%Y-%m", ProcessedFile.processed_date) == period
-            else:  # day
-                date_filter = func.strftime("%Y-%m-%d", ProcessedFile.processed_date) == period
-
-            successful_files = db.query(ProcessedFile).filter(
-                ProcessedFile.is_successful == True,
-                date_filter
-            ).all()
-
-            total_saved_mb = 0
-
-            for pf in successful_files:
-                compressed_size_kb = pf.file_compression_kbites
-                if compressed_size_kb > 0:
-                    saved_mb = compressed_size_kb / 1024
-                    total_saved_mb += saved_mb
-
-            return total_saved_mb
-
-        except Exception as e:
-            print(f"Ошибка расчета экономии для периода {period}: {e}")
-            return 0
+    def query_totals(self, db):
+        """Итоги по всей истории одним запросом к суточной сводке"""
+        return db.query(
+            func.coalesce(func.sum(DailyStats.file_count), 0).label("total"),
+            func.coalesce(func.sum(case((DailyStats.is_successful == True, DailyStats.file_count), else_=0)), 0)
+            .label("success_count"),
+            func.coalesce(func.sum(DailyStats.saved_kbytes), 0.0).label("saved_kbytes"),
+            func.min(DailyStats.first_time).label("first_time"),
+            func.max(DailyStats.last_time).label("last_time")
+        ).one()
 
     def load_table_data(self, db):
         """Загрузка данных для таблицы"""
         # Определяем формат группировки
         if self.group_by_var.get() == "month":
-            date_format = "%Y-%m"
-            date_display = func.strftime("%Y-%m", ProcessedFile.processed_date)
+            date_display = func.strftime("%Y-%m", DailyStats.day)
         else:  # day
-            date_format = "%Y-%m-%d"
-            date_display = func.strftime("%Y-%m-%d", ProcessedFile.processed_date)
+            date_display = func.strftime("%Y-%m-%d", DailyStats.day)
 
-        # Запрос для группировки данных
+        # Все метрики периода - одним запросом к суточной сводке (daily_stats)
         query = db.query(
             date_display.label("period"),
-            func.count(ProcessedFile.id).label("total"),
-            func.sum(case((ProcessedFile.is_successful == True, 1), else_=0)).label("success_count"),
-            func.sum(case((ProcessedFile.is_successful == False, 1), else_=0)).label("fail_count"),
-            func.min(ProcessedFile.processed_date).label("first_time"),
-            func.max(ProcessedFile.processed_date).label("last_time")
+            func.sum(DailyStats.file_count).label("total"),
+            func.sum(case((DailyStats.is_successful == True, DailyStats.file_count), else_=0)).label("success_count"),
+            func.sum(case((DailyStats.is_successful == False, DailyStats.file_count), else_=0)).label("fail_count"),
+            func.sum(DailyStats.saved_kbytes).label("saved_kbytes"),
+            func.min(DailyStats.first_time).label("first_time"),
+            func.max(DailyStats.last_time).label("last_time")
         ).group_by("period").order_by("period")
 
         results = query.all()
@@ -249,8 +237,7 @@ class StatsWindow:
             success_ratio = (success_count / total * 100) if total > 0 else 0
             fail_ratio = (fail_count / total * 100) if total > 0 else 0
 
-            # Расчет сэкономленного места
-            saved_space_mb = self.calculate_saved_space_for_period(db, row.period, self.group_by_var.get())
+            saved_space_mb = (row.saved_kbytes or 0) / 1024
 
             # Форматируем время
             start_time = row.first_time.strftime("%H:%M:%S") if row.first_time else "N/A"
@@ -278,27 +265,16 @@ class StatsWindow:
     def load_quick_stats(self, db):
         """Загрузка краткой статистики"""
         # Основные метрики
-        total_files = db.query(ProcessedFile).count()
-        success_files = db.query(ProcessedFile).filter(ProcessedFile.is_successful == True).count()
+        totals = self.query_totals(db)
+        total_files = totals.total
+        success_files = totals.success_count
         settings_count = db.query(Setting).count()
-
-        # Расчет общей экономии места
-        total_saved_mb = 0
-        successful_files = db.query(ProcessedFile).filter(ProcessedFile.is_successful == True).all()
-
-        for pf in successful_files:
-            compressed_size_kb = pf.file_compression_kbites
-            if compressed_size_kb > 0:
-                saved_mb = compressed_size_kb / 1024
-                total_saved_mb += saved_mb
+        total_saved_mb = totals.saved_kbytes / 1024
 
         # Временные метрики
-        first_record = db.query(ProcessedFile).order_by(ProcessedFile.processed_date).first()
-        last_record = db.query(ProcessedFile).order_by(ProcessedFile.processed_date.desc()).first()
-
         usage_period = "N/A"
-        if first_record and last_record:
-            delta = last_record.processed_date - first_record.processed_date
+        if totals.first_time and totals.last_time:
+            delta = totals.last_time - totals.first_time
             years = delta.days // 365
             months = (delta.days % 365) // 30
             days = (delta.days % 365) % 30
@@ -306,9 +282,9 @@ class StatsWindow:
 
         # Самая популярная настройка
         popular_setting = db.query(
-            ProcessedFile.setting_id,
-            func.count(ProcessedFile.id).label("usage_count")
-        ).group_by(ProcessedFile.setting_id).order_by(func.count(ProcessedFile.id).desc()).first()
+            DailyStats.setting_id,
+            func.sum(DailyStats.file_count).label("usage_count")
+        ).group_by(DailyStats.setting_id).order_by(func.sum(DailyStats.file_count).desc()).first()
 
         popular_setting_info = "N/A"
         if popular_setting:
@@ -321,7 +297,7 @@ class StatsWindow:
         stats_text = f"""📊 ОБЩАЯ СТАТИСТИКА:
 
 • Всего файлов в базе: {total_files}
-• Успешно сжато: {success_files} ({success_files / total_files * 100:.1f}% если total_files > 0 else 0%)
+• Успешно сжато: {success_files} ({success_files / total_files * 100 if total_files > 0 else 0:.1f}%)
 • Общая экономия места: {total_saved_mb:.2f} МБ ({total_saved_mb / 1024:.2f} ГБ)
 • Количество настроек: {settings_count}
 • Срок использования: {usage_period}
@@ -370,32 +346,24 @@ class StatsWindow:
             db = next(get_db())
 
             # Расширенные метрики
-            total_files = db.query(ProcessedFile).count()
-            success_files = db.query(ProcessedFile).filter(ProcessedFile.is_successful == True).count()
-
-            # Расчет общей экономии места
-            total_saved_mb = 0
-            successful_files_list = db.query(ProcessedFile).filter(ProcessedFile.is_successful == True).all()
-
-            for pf in successful_files_list:
-                compressed_size_kb = pf.file_compression_kbites
-                if compressed_size_kb > 0:
-                    saved_mb = compressed_size_kb / 1024
-                    total_saved_mb += saved_mb
+            totals = self.query_totals(db)
+            total_files = totals.total
+            success_files = totals.success_count
+            total_saved_mb = totals.saved_kbytes / 1024
 
             # Статистика по настройкам
             settings_stats = db.query(
                 Setting.id,
                 Setting.compression_level,
                 Setting.need_replace,
-                func.count(ProcessedFile.id).label("usage_count")
-            ).join(ProcessedFile).group_by(Setting.id).all()
+                func.sum(DailyStats.file_count).label("usage_count")
+            ).join(DailyStats, DailyStats.setting_id == Setting.id).group_by(Setting.id).all()
 
             # Статистика по ошибкам
             error_stats = db.query(
-                ProcessedFile.fail_reason_id,
-                func.count(ProcessedFile.id).label("error_count")
-            ).filter(ProcessedFile.is_successful == False).group_by(ProcessedFile.fail_reason_id).all()
+                DailyStats.fail_reason_id,
+                func.sum(DailyStats.file_count).label("error_count")
+            ).filter(DailyStats.is_successful == False).group_by(DailyStats.fail_reason_id).all()
 
             # Формируем расширенную статистику
             extended_text = "📈 РАСШИРЕННАЯ СТАТИСТИКА\n\n"
@@ -437,3 +405,80 @@ class StatsWindow:
 
         ttk.Button(ext_window, text="Закрыть",
                    command=ext_window.destroy).pack(pady=10)
+
+    def show_department_pivot(self):
+        """Сводная по отделам: GROUP BY по индексированному полю department"""
+        try:
+            db = next(get_db())
+            kbytes_per_page = case(
+                (ProcessedFile.file_pages > 0, ProcessedFile.file_origin_size_kbytes * 1.0 / ProcessedFile.file_pages),
+                else_=None
+            )
+            rows = db.query(
+                func.coalesce(ProcessedFile.department, "не определен").label("department"),
+                func.count(ProcessedFile.id).label("total"),
+                func.sum(case((ProcessedFile.is_successful == True, 1), else_=0)).label("success_count"),
+                func.sum(ProcessedFile.file_compression_kbites).label("saved_kbytes"),
+                func.avg(ProcessedFile.file_compression_kbites).label("avg_saved_kbytes"),
+                func.max(ProcessedFile.file_compression_kbites).label("max_saved_kbytes"),
+                func.sum(ProcessedFile.file_pages).label("pages"),
+                func.avg(ProcessedFile.file_pages).label("avg_pages"),
+                func.avg(kbytes_per_page).label("avg_kbytes_per_page")
+            ).group_by(ProcessedFile.department).order_by(ProcessedFile.department).all()
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось построить сводную по отделам: {e}")
+            return
+
+        pivot_window = tk.Toplevel(self.window)
+        pivot_window.title("Сводная по отделам")
+        pivot_window.geometry("1100x500")
+
+        columns = {
+            "department": ("Отдел", 170),
+            "total": ("Файлов", 80),
+            "success_count": ("+n, шт.", 80),
+            "success_ratio": ("+доля,%", 80),
+            "saved_mb": ("Экономия, МБ", 110),
+            "avg_saved_mb": ("Сред. экономия, МБ", 120),
+            "max_saved_mb": ("Макс. экономия, МБ", 120),
+            "pages": ("Страниц", 90),
+            "avg_pages": ("Сред. страниц", 100),
+            "avg_kbytes_per_page": ("Сред. КБ/стр.", 100)
+        }
+        tree = ttk.Treeview(pivot_window, columns=list(columns), show="headings")
+        for column, (title, width) in columns.items():
+            tree.heading(column, text=title)
+            tree.column(column, width=width, anchor=tk.CENTER)
+        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        def fmt(value, pattern="{:.3f}"):
+            return pattern.format(value) if value is not None else "-"
+
+        for row in rows:
+            tree.insert("", tk.END, values=(
+                row.department,
+                row.total,
+                row.success_count or 0,
+                f"{(row.success_count or 0) / row.total * 100:.1f}%" if row.total else "-",
+                fmt((row.saved_kbytes or 0) / 1024),
+                fmt(row.avg_saved_kbytes / 1024 if row.avg_saved_kbytes is not None else None),
+                fmt(row.max_saved_kbytes / 1024 if row.max_saved_kbytes is not None else None),
+                row.pages or 0,
+                fmt(row.avg_pages, "{:.1f}"),
+                fmt(row.avg_kbytes_per_page)
+            ))
+
+        total = sum(row.total for row in rows)
+        success_count = sum(row.success_count or 0 for row in rows)
+        tree.insert("", tk.END, values=(
+            "ИТОГО:",
+            total,
+            success_count,
+            f"{success_count / total * 100:.1f}%" if total else "-",
+            fmt(sum(row.saved_kbytes or 0 for row in rows) / 1024),
+            "-", "-",
+            sum(row.pages or 0 for row in rows),
+            "-", "-"
+        ))
+
+        ttk.Button(pivot_window, text="Закрыть", command=pivot_window.destroy).pack(pady=10)
@@ -0,0 +1,78 @@
+# timeout_model.py
+import statistics
+
+# Границы адаптивного таймаута, сек (верхняя совпадает с ограничением procession_timeout в БД)
+TIMEOUT_FLOOR_SECS = 10
+TIMEOUT_CEILING_SECS = 3600
+# Запас относительно прогноза и постоянная часть (запуск процесса, копирование)
+TIMEOUT_SAFETY_FACTOR = 3.0
+TIMEOUT_BASE_SECS = 5.0
+# Минимум успешных записей по движку, чтобы доверять модели
+MIN_HISTORY_SAMPLES = 20
+
+
+def engine_of_tier(compression_tier):
+    """Группа движка по ступени/стратегии из processed_files.compression_tier"""
+    if not compression_tier:
+        return None
+    if compression_tier.startswith("ocr-gs"):
+        return "ocr-gs"
+    if compression_tier.startswith("ocr"):
+        return "ocr"
+    return "gs"
+
+
+class AdaptiveTimeoutModel:
+    """
+    Модель таймаута файла по истории обработки: для каждого движка считаются
+    медианные секунды на страницу и секунды на МБ. Таймаут = прогноз * запас + база,
+    ограниченный снизу и сверху. Без достаточной истории используется фиксированный таймаут.
+    """
+
+    def __init__(self, fallback_timeout):
+        self.fallback_timeout = fallback_timeout
+        self.secs_per_page = {}  # движок -> медиана сек/стр
+        self.secs_per_mb = {}    # движок -> медиана сек/МБ
+        self.samples = {}        # движок -> количество записей
+
+    def fit(self, history):
+        """
+        Обучает модель на истории: итерируемое (compression_tier, processing_seconds,
+        file_origin_size_kbytes, file_pages) успешно обработанных файлов.
+        """
+        per_page = {}
+        per_mb = {}
+        for tier, seconds, size_kbytes, pages in history:
+            engine = engine_of_tier(tier)
+            if not engine or not seconds or seconds <= 0:
+                continue
+            if size_kbytes and size_kbytes > 0:
+                per_mb.setdefault(engine, []).append(seconds / (size_kbytes / 1024.0))
+            if pages and pages > 0:
+                per_page.setdefault(engine, []).append(seconds / pages)
+
+        self.secs_per_mb = {engine: statistics.median(values) for engine, values in per_mb.items()}
+        self.secs_per_page = {engine: statistics.median(values) for engine, values in per_page.items()}
+        self.samples = {engine: len(values) for engine, values in per_mb.items()}
+        return self
+
+    def is_trained(self, engine):
+        return self.samples.get(engine, 0) >= MIN_HISTORY_SAMPLES
+
+    def predict_seconds(self, engine, size_mb, pages=None):
+        """Ожидаемое время обработки, сек (None - если по движку мало истории)"""
+        if not self.is_trained(engine):
+            return None
+        estimate = self.secs_per_mb[engine] * size_mb
+        if pages and engine in self.secs_per_page:
+            # Берем большую из оценок: скан на 300 страниц медленнее, чем подсказывает размер
+            estimate = max(estimate, self.secs_per_page[engine] * pages)
+        return estimate
+
+    def timeout_for(self, engine, size_mb, pages=None):
+        """Таймаут для файла, сек"""
+        estimate = self.predict_seconds(engine, size_mb, pages)
+        if estimate is None:
+            return self.fallback_timeout
+        timeout = estimate * TIMEOUT_SAFETY_FACTOR + TIMEOUT_BASE_SECS
+        return int(min(max(timeout, TIMEOUT_FLOOR_SECS), TIMEOUT_CEILING_SECS))
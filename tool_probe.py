@@ -0,0 +1,67 @@
+# tool_probe.py
+import json
+import os
+import shutil
+import subprocess
+import threading
+
+# Результаты проверки внешних программ (gs, tesseract) между запусками программы
+TOOL_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tool_cache.json")
+
+_lock = threading.Lock()
+_cache = None
+
+
+def _load_cache():
+    global _cache
+    if _cache is None:
+        try:
+            with open(TOOL_CACHE_FILE, encoding="utf-8") as f:
+                _cache = json.load(f)
+        except (OSError, ValueError):
+            _cache = {}
+    return _cache
+
+
+def _save_cache():
+    temp_path = TOOL_CACHE_FILE + ".tmp"
+    try:
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(_cache, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, TOOL_CACHE_FILE)
+    except OSError:
+        pass  # кэш необязателен: при следующем запуске программа будет проверена заново
+
+
+def probe_tool(command, args=("--version",), timeout=5):
+    """
+    Находит программу (имя в PATH или полный путь) и возвращает (путь, вывод команды с args)
+    или (None, None), если программы нет или она завершилась с ошибкой.
+    Результат запуска хранится в TOOL_CACHE_FILE по пути к программе; пока размер и время
+    изменения файла программы те же, она повторно не запускается
+    """
+    path = shutil.which(command)
+    if not path:
+        return None, None
+    path = os.path.abspath(path)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None, None
+    stamp = [stat.st_mtime, stat.st_size, list(args)]
+
+    with _lock:
+        entry = _load_cache().get(path)
+        if entry and entry.get("stamp") == stamp:
+            return (path, entry["output"]) if entry["output"] is not None else (None, None)
+
+    try:
+        result = subprocess.run([path, *args], capture_output=True, text=True, timeout=timeout)
+        output = result.stdout.strip() if result.returncode == 0 else None
+    except (OSError, subprocess.SubprocessError):
+        output = None
+
+    with _lock:
+        _load_cache()[path] = {"stamp": stamp, "output": output}
+        _save_cache()
+    return (path, output) if output is not None else (None, None)
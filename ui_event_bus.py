@@ -0,0 +1,84 @@
+# ui_event_bus.py
+import queue
+import tkinter as tk
+
+DRAIN_INTERVAL_MS = 100     # ~10 Гц
+MAX_LOG_LINES = 5000        # журнал в окне - кольцевой буфер последних строк
+MAX_EVENTS_PER_TICK = 5000  # чтобы всплеск сообщений не заморозил окно за один тик
+
+
+class UIEventBus:
+    """
+    Обновление интерфейса из рабочих потоков. Потоки только публикуют события в очередь,
+    Tk-поток разбирает ее по таймеру after(): строки журнала вставляются пачкой,
+    из обновлений статистики применяется только последнее, окно журнала хранит
+    не больше max_log_lines строк.
+    """
+
+    def __init__(self, root, log_widget, apply_stats, drain_interval_ms=DRAIN_INTERVAL_MS,
+                 max_log_lines=MAX_LOG_LINES):
+        self.root = root
+        self.log_widget = log_widget
+        self.apply_stats = apply_stats
+        self.drain_interval_ms = drain_interval_ms
+        self.max_log_lines = max_log_lines
+        self._events = queue.Queue()
+        self._pending_stats = None
+        self.root.after(self.drain_interval_ms, self._drain)
+
+    def publish_log(self, line, tag):
+        self._events.put(("log", line, tag))
+
+    def publish_stats(self, stats):
+        """Последний снимок статистики; промежуточные снимки между тиками отбрасываются"""
+        self._pending_stats = stats
+
+    def call(self, func, *args, **kwargs):
+        """Выполняет func в Tk-потоке (например, смена состояния кнопки)"""
+        self._events.put(("call", func, (args, kwargs)))
+
+    def _drain(self):
+        try:
+            lines = []
+            for _ in range(MAX_EVENTS_PER_TICK):
+                try:
+                    kind, first, second = self._events.get_nowait()
+                except queue.Empty:
+                    break
+                if kind == "log":
+                    lines.append((first, second))
+                else:
+                    args, kwargs = second
+                    try:
+                        first(*args, **kwargs)
+                    except Exception as e:
+                        print(f"Ошибка обновления интерфейса: {e}")
+
+            if lines:
+                self._insert_lines(lines)
+
+            stats, self._pending_stats = self._pending_stats, None
+            if stats is not None:
+                self.apply_stats(stats)
+        finally:
+            self.root.after(self.drain_interval_ms, self._drain)
+
+    def _insert_lines(self, lines):
+        widget = self.log_widget
+        widget.config(state=tk.NORMAL)
+        # Подряд идущие строки с одним тегом вставляются одним вызовом
+        chunk, chunk_tag = [], None
+        for line, tag in lines[-self.max_log_lines:]:
+            if tag != chunk_tag and chunk:
+                widget.insert(tk.END, "".join(chunk), chunk_tag)
+                chunk = []
+            chunk.append(line + "\n")
+            chunk_tag = tag
+        if chunk:
+            widget.insert(tk.END, "".join(chunk), chunk_tag)
+
+        line_count = int(widget.index('end-1c').split('.')[0])
+        if line_count > self.max_log_lines:
+            widget.delete('1.0', f'{line_count - self.max_log_lines + 1}.0')
+        widget.see(tk.END)
+        widget.config(state=tk.DISABLED)